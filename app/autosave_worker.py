@@ -0,0 +1,107 @@
+"""
+Defines the background write-behind worker used by AutoSaveObserver.
+"""
+from __future__ import annotations
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+from app.exceptions import HistoryError
+
+if TYPE_CHECKING:
+    from app.calculation import Calculation
+    from app.history import History
+
+class AutoSaveWorker:
+    """
+    Writes history changes to disk on a background thread.
+    Pending changes are coalesced: any number of appended rows are written
+    in one go, and a full rewrite replaces everything queued before it.
+    The queue is flushed every ``flush_interval`` seconds, or as soon as
+    ``max_pending`` changes are waiting.
+    """
+    def __init__(
+        self,
+        history_manager: History,
+        flush_interval: float = 1.0,
+        max_pending: int = 100,
+        logger: Optional[logging.Logger] = None,
+        on_error: Optional[Callable[[], None]] = None,
+    ):
+        self._history_manager = history_manager
+        self._flush_interval = flush_interval
+        self._max_pending = max(1, max_pending)
+        self._logger = logger or logging.getLogger('app')
+        self._on_error = on_error
+
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock() # Serializes flushes from any thread
+        self._rewrite: Optional[Sequence[Calculation]] = None
+        self._rows: list[Calculation] = []
+        self._pending = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="autosave-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Number of changes queued since the last flush."""
+        return self._pending
+
+    def submit_append(self, calcs: Sequence[Calculation]):
+        """Queues rows to be appended to the file."""
+        with self._cond:
+            self._rows.extend(calcs)
+            self._queued()
+
+    def submit_rewrite(self, calcs: Sequence[Calculation]):
+        """Queues a full rewrite of the file with an immutable snapshot."""
+        with self._cond:
+            self._rewrite = calcs
+            self._rows = [] # Already part of the snapshot
+            self._queued()
+
+    def _queued(self):
+        """Counts a queued change and wakes the worker when the batch is full."""
+        self._pending += 1
+        if self._pending >= self._max_pending:
+            self._cond.notify()
+
+    def _run(self):
+        """Worker loop: waits for a full batch or the flush interval."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._pending >= self._max_pending,
+                    timeout=self._flush_interval,
+                )
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Writes all queued changes now, in the calling thread."""
+        with self._io_lock:
+            with self._cond:
+                rewrite, rows = self._rewrite, self._rows
+                self._rewrite, self._rows, self._pending = None, [], 0
+            if rewrite is None and not rows:
+                return
+            try:
+                if rewrite is not None:
+                    self._history_manager.save_history_to_csv(rewrite)
+                if rows:
+                    self._history_manager.append_to_csv(rows)
+            except HistoryError as e:
+                # Never crash the worker; the next change triggers a full rewrite
+                self._logger.error(f"Failed to auto-save history: {e}")
+                if self._on_error:
+                    self._on_error()
+
+    def close(self):
+        """Stops the worker thread and flushes everything still queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
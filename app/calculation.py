@@ -1,21 +1,120 @@
 """
 Defines the data structure for a single calculation.
 """
-import dataclasses
-from dataclasses import dataclass
-from datetime import datetime
+import time
+from dataclasses import FrozenInstanceError
+from datetime import datetime, timedelta
+from typing import Optional, Union
 from app.operations import Command
 
-@dataclass
+_EPOCH = datetime(1970, 1, 1)
+
+def datetime_to_ns(timestamp: datetime) -> int:
+    """
+    Converts a naive, local wall-clock datetime to integer nanoseconds since
+    the epoch. Aware datetimes are converted to local wall-clock time first,
+    like the timestamps the calculator records.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    delta = timestamp - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+def ns_to_datetime(ns: int) -> datetime:
+    """Converts integer nanoseconds since the epoch back to a naive datetime."""
+    return _EPOCH + timedelta(microseconds=int(ns) // 1000)
+
+# UTC offsets only change on quarter-hour boundaries, so the local offset
+# is looked up once per 15-minute window: [window, offset in microseconds]
+_OFFSET_WINDOW_NS = 900 * 10**9
+_offset_cache = [None, 0]
+
+def now_ns() -> int:
+    """
+    The current local wall-clock time as ``datetime_to_ns(datetime.now())``
+    would return it (microsecond precision), without creating a datetime.
+    """
+    ns = time.time_ns()
+    window = ns // _OFFSET_WINDOW_NS
+    if window != _offset_cache[0]:
+        _offset_cache[:] = window, time.localtime(ns // 10**9).tm_gmtoff * 10**6
+    return (ns // 1000 + _offset_cache[1]) * 1000
+
 class Calculation:
     """
-    A data class (struct) to hold the details of a single calculation.
+    An immutable record of a single calculation.
+    Frozen so that history snapshots can share records safely. The record
+    is slotted and keeps its timestamp as integer nanoseconds since the
+    epoch (``timestamp_ns``); the ``timestamp`` datetime is only built when
+    it is read. Commands are stateless flyweights: copies of a record share
+    its command, and copying a record returns the record itself.
     """
+    __slots__ = ('operand_a', 'operand_b', 'command', 'result', 'timestamp_ns')
+
     operand_a: float
     operand_b: float
     command: Command
     result: float
-    timestamp: datetime = dataclasses.field(default_factory=datetime.now)
+    timestamp_ns: int
+
+    def __init__(
+        self,
+        operand_a: float,
+        operand_b: float,
+        command: Command,
+        result: float,
+        timestamp: Optional[Union[datetime, int]] = None,
+    ):
+        """``timestamp`` is a datetime or epoch nanoseconds; it defaults to now."""
+        if timestamp is None:
+            timestamp = now_ns()
+        elif isinstance(timestamp, datetime):
+            timestamp = datetime_to_ns(timestamp)
+        else:
+            timestamp = int(timestamp)
+        # The slot setters bypass the frozen __setattr__
+        _set_operand_a(self, operand_a)
+        _set_operand_b(self, operand_b)
+        _set_command(self, command)
+        _set_result(self, result)
+        _set_timestamp_ns(self, timestamp)
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+    def _fields(self) -> tuple:
+        return self.operand_a, self.operand_b, self.command, self.result, self.timestamp_ns
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash((self.operand_a, self.operand_b, self.command.name, self.result, self.timestamp_ns))
+
+    def __repr__(self) -> str:
+        return (
+            f"Calculation(operand_a={self.operand_a!r}, operand_b={self.operand_b!r}, "
+            f"command={self.command!r}, result={self.result!r}, timestamp={self.timestamp!r})"
+        )
+
+    def __reduce__(self):
+        return self.__class__, self._fields()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def timestamp(self) -> datetime:
+        """When the calculation was performed, as a naive local datetime."""
+        return ns_to_datetime(self.timestamp_ns)
 
     @property
     def command_name(self) -> str:
@@ -37,4 +136,10 @@ class Calculation:
             "OperandB": self.operand_b,
             "Command": self.command_name,
             "Result": self.result
-        }
\ No newline at end of file
+        }
+
+_set_operand_a = Calculation.operand_a.__set__
+_set_operand_b = Calculation.operand_b.__set__
+_set_command = Calculation.command.__set__
+_set_result = Calculation.result.__set__
+_set_timestamp_ns = Calculation.timestamp_ns.__set__
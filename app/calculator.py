@@ -2,12 +2,41 @@
 The main 'Calculator' class.
 This is the 'Subject' in the Observer pattern.
 """
-from typing import Optional
+from __future__ import annotations
+import math
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, TextIO, Union
+from app.events import (
+    BatchPerformed, CacheStatsReported, CalculationPerformed, ErrorOccurred, Event,
+    HistoryCleared, HistoryLoaded, HistorySaved, RedoPerformed, UndoPerformed,
+)
 from app.operations import CommandFactory
 from app.history import History
-from app.calculation import Calculation
-from app.exceptions import OperationError
+from app.calculation import Calculation, now_ns
+from app.exceptions import InputValidationError, OperationError
 from app.observers import Observer
+from app.observer_dispatch import BACKPRESSURE_POLICIES, ObserverQueue
+from app.expression import ExpressionCompiler, Operation, TableRange, UserFunction
+from app.reductions import chunk_values, read_numbers, reduce_chunks
+from app.result_cache import CacheStats, ResultCache
+from app.stream_stats import DEFAULT_QUANTILES, StatisticsSummary, summarize
+
+if TYPE_CHECKING:
+    import numpy as np
+
+@dataclass
+class BatchResult:
+    """The outcome of ``Calculator.execute_batch``."""
+    results: np.ndarray # NaN where the element failed
+    errors: np.ndarray # Boolean mask of failed elements
+    calculations: list[Calculation] # Successful elements, as recorded in history
+
+    @property
+    def error_count(self) -> int:
+        """Number of elements that failed."""
+        return int(self.errors.sum())
 
 class Calculator:
     """
@@ -15,81 +44,359 @@ class Calculator:
     This is the 'Subject' (Observable) for the Observer pattern.
     """
     
-    def __init__(self, factory: CommandFactory, history_manager: History):
+    def __init__(
+        self,
+        factory: CommandFactory,
+        history_manager: History,
+        result_cache: Optional[ResultCache] = None,
+        dispatch: str = 'sync',
+        queue_size: int = 1000,
+        backpressure: str = 'block',
+        expression_cache_size: int = 256,
+        reduction_chunk_size: int = 65536,
+        quantile_accuracy: float = 0.01,
+        max_value: float = math.inf,
+    ):
+        """
+        With ``dispatch='async'`` every observer gets its own bounded queue
+        and worker thread (see ObserverQueue for the backpressure policies).
+        ``expression_cache_size`` compiled expressions are kept for reuse.
+        Reductions and statistics read their input ``reduction_chunk_size``
+        numbers at a time; quantiles are estimated within ``quantile_accuracy``.
+        Number literals in expressions and the value of an expression may not
+        exceed ``max_value`` in magnitude.
+        """
+        if dispatch not in ('sync', 'async'):
+            raise ValueError(f"Unknown observer dispatch mode: '{dispatch}'")
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: '{backpressure}'")
+        if reduction_chunk_size < 1:
+            raise ValueError("The reduction chunk size must be at least 1.")
+        if not 0 < quantile_accuracy < 1:
+            raise ValueError("The quantile accuracy must be between 0 and 1.")
         self._factory = factory
         self._history_manager = history_manager
+        self._result_cache = result_cache
+        self._max_value = max_value
+        self._expressions = ExpressionCompiler(factory, expression_cache_size, max_value)
+        self._reduction_chunk_size = reduction_chunk_size
+        self._quantile_accuracy = quantile_accuracy
         self._observers: list[Observer] = []
+        # Event types each observer subscribed to, and the resulting dispatch
+        # table of event type -> interested observers (filled on first use)
+        self._subscriptions: dict[Observer, tuple[type[Event], ...]] = {}
+        self._dispatch: dict[type[Event], tuple[Observer, ...]] = {}
+        self._async = dispatch == 'async'
+        self._queue_size = queue_size
+        self._backpressure = backpressure
+        self._queues: dict[Observer, ObserverQueue] = {}
 
     # --- Observer Pattern Methods ---
 
-    def attach(self, observer: Observer):
-        """Attach an observer."""
+    def attach(
+        self,
+        observer: Observer,
+        events: Optional[Iterable[type[Event]]] = None,
+        asynchronous: Optional[bool] = None,
+    ):
+        """
+        Attach an observer for the given event types, which default to its
+        ``subscriptions``; a base class covers all of its subclasses.
+        ``asynchronous`` overrides the dispatch mode for this observer;
+        observers that read the calculator's state when they get an event
+        (like AutoSaveObserver) should stay synchronous.
+        """
         if observer not in self._observers:
             self._observers.append(observer)
+            self._subscriptions[observer] = tuple(observer.subscriptions if events is None else events)
+            self._dispatch.clear()
+            if self._async if asynchronous is None else asynchronous:
+                self._queues[observer] = ObserverQueue(observer, self._queue_size, self._backpressure)
 
     def detach(self, observer: Observer):
-        """Detach an observer."""
+        """Detach an observer, delivering the events already queued for it."""
         try:
             self._observers.remove(observer)
         except ValueError:
             pass # pragma: no cover
+        self._subscriptions.pop(observer, None)
+        self._dispatch.clear()
+        queue = self._queues.pop(observer, None)
+        if queue:
+            queue.close()
 
-    def _notify(self, event: str, data: any = None):
-        """Notify all observers about an event."""
-        for observer in self._observers:
-            observer.update(self, event, data)
+    def _subscribers(self, event_type: type[Event]) -> tuple[Observer, ...]:
+        """Returns the observers subscribed to an event type, in attach order."""
+        observers = self._dispatch.get(event_type)
+        if observers is None:
+            observers = tuple(
+                observer for observer in self._observers
+                if issubclass(event_type, self._subscriptions[observer])
+            )
+            self._dispatch[event_type] = observers
+        return observers
+
+    def _notify(self, event_type: type[Event], *args):
+        """
+        Notify the observers subscribed to ``event_type`` with an event built
+        from ``args``. The event is not created when nobody is interested.
+        """
+        observers = self._subscribers(event_type)
+        if not observers:
+            return
+        event = event_type(*args)
+        queues = self._queues
+        for observer in observers:
+            queue = queues.get(observer)
+            if queue:
+                queue.put(self, event)
+            else:
+                observer.update(self, event)
+
+    def flush(self):
+        """Waits until asynchronous observers have handled every queued event."""
+        for queue in list(self._queues.values()):
+            queue.flush()
+
+    def close(self):
+        """
+        Delivers the queued events and stops the asynchronous observer
+        workers. Observers still attached are notified synchronously after.
+        """
+        for queue in self._queues.values():
+            queue.close()
+        self._queues.clear()
 
     # --- Core Functionality ---
 
     def execute_command(self, command_name: str, a: float, b: float) -> float:
         """
         Executes a calculation, stores it, and notifies observers.
+        With a result cache, repeated evaluations are answered from it.
         """
         try:
             command = self._factory.get_command(command_name)
-            result = command.execute(a, b)
+            if self._result_cache is not None:
+                result = self._result_cache.execute(command, a, b)
+            else:
+                result = command.execute(a, b)
             
             calc = Calculation(a, b, command, result)
             self._history_manager.add_calculation(calc)
             
             # Notify observers about the new calculation
-            self._notify("calculation_performed", data=calc)
+            self._notify(CalculationPerformed, calc)
             
             return result
         except OperationError as e:
             # Notify observers about the error
-            self._notify("error_occurred", data=e)
+            self._notify(ErrorOccurred, e)
             raise # Re-raise the exception to be caught by the REPL
 
-    def get_history(self) -> list[Calculation]:
-        """Gets the full calculation history."""
+    def evaluate_expression(self, source: str) -> float:
+        """
+        Evaluates an infix expression such as ``3 + 4 * 2 ^ 0.5``.
+        The outermost operation is stored as a single calculation (with the
+        values of its two sides as operands) and observers are notified
+        once; a bare number is returned without touching the history.
+        A value outside ``max_value`` raises OperationError and is not recorded.
+        """
+        try:
+            root = self._expressions.compile(source).root
+            if not isinstance(root, Operation):
+                return root.evaluate()
+            a, b = root.left.evaluate(), root.right.evaluate()
+            result = root.command.execute(a, b)
+            if not -self._max_value <= result <= self._max_value:
+                raise OperationError(
+                    f"Result {result} is out of range ({-self._max_value} to {self._max_value})."
+                )
+        except OperationError as e:
+            self._notify(ErrorOccurred, e)
+            raise
+
+        calc = Calculation(a, b, root.command, result)
+        self._history_manager.add_calculation(calc)
+        self._notify(CalculationPerformed, calc)
+        return result
+
+    def _chunks(self, numbers: Union[Iterable[float], TextIO]) -> Iterable[np.ndarray]:
+        """Reads a text stream or groups an iterable of floats into chunks."""
+        if hasattr(numbers, 'read'):
+            return read_numbers(numbers, self._reduction_chunk_size)
+        return chunk_values(numbers, self._reduction_chunk_size)
+
+    def reduce(self, name: str, numbers: Union[Iterable[float], TextIO]) -> float:
+        """
+        Reduces any number of values with 'sum', 'product', 'min', 'max' or
+        'mean' in one streaming pass. ``numbers`` is an iterable of floats or
+        a text stream of numbers separated by whitespace or commas.
+        The final step is stored as a single calculation, e.g. a sum is
+        recorded as ``add(<sum of all but the last value>, <last value>)``.
+        """
+        try:
+            outcome = reduce_chunks(name, self._chunks(numbers))
+            command = self._factory.get_recorded_command(outcome.command)
+        except OperationError as e:
+            self._notify(ErrorOccurred, e)
+            raise
+
+        calc = Calculation(outcome.operand_a, outcome.operand_b, command, outcome.value)
+        self._history_manager.add_calculation(calc)
+        self._notify(CalculationPerformed, calc)
+        return outcome.value
+
+    def describe(
+        self, numbers: Union[Iterable[float], TextIO], quantiles: Iterable[float] = DEFAULT_QUANTILES
+    ) -> StatisticsSummary:
+        """
+        Computes count, mean, variance, min/max and approximate quantiles of
+        any number of values in one pass and bounded memory. ``numbers`` is
+        an iterable of floats or a text stream, as for ``reduce``.
+        Statistics are read-only: nothing is added to history.
+        """
+        return summarize(self._chunks(numbers), quantiles, self._quantile_accuracy)
+
+    def describe_history(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> StatisticsSummary:
+        """Computes the statistics of the results in the current history."""
+        return summarize(
+            self._history_manager.results(self._reduction_chunk_size), quantiles, self._quantile_accuracy
+        )
+
+    def define_function(self, source: str) -> UserFunction:
+        """Defines a function from ``name(params) = body`` for 'eval' and 'table'."""
+        return self._expressions.define(source)
+
+    def get_functions(self) -> list[UserFunction]:
+        """Gets the user-defined functions."""
+        return self._expressions.functions
+
+    def tabulate(
+        self, name: str, table_range: TableRange, fixed: Optional[dict[str, float]] = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluates a user-defined function over a range of one parameter in a
+        single vectorized pass; the other parameters take the ``fixed`` values.
+        Returns the range values, the results and the mask of failed elements.
+        Tables are read-only: nothing is added to history.
+        """
+        import numpy as np
+        function = self._expressions.function(name)
+        fixed = dict(fixed or {})
+        params = set(function.params)
+        unknown = ({table_range.variable} | set(fixed)) - params
+        if unknown:
+            raise InputValidationError(f"Function '{function.name}' has no parameter '{sorted(unknown)[0]}'.")
+        missing = params - {table_range.variable} - set(fixed)
+        if missing:
+            raise InputValidationError(f"Missing a value for parameter '{sorted(missing)[0]}'.")
+
+        values = table_range.values()
+        arguments = [
+            values if param == table_range.variable else np.full(len(values), fixed[param])
+            for param in function.params
+        ]
+        results, errors = function.evaluate_array(*arguments)
+        return values, results, errors
+
+    def execute_batch(
+        self,
+        commands: Union[str, Iterable[str]],
+        a: Iterable[float],
+        b: Iterable[float],
+    ) -> BatchResult:
+        """
+        Executes many calculations at once with vectorized kernels.
+        ``commands`` is one command name for the whole batch or one name per
+        element. Successful elements are recorded in history as a single
+        undoable action and observers get a single BatchPerformed event.
+        Failing elements are reported in the result's error mask.
+        """
+        import numpy as np
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        if a.shape != b.shape or a.ndim != 1:
+            raise OperationError("Batch operands must be one-dimensional and of equal length.")
+        names = np.full(len(a), commands, dtype=object) if isinstance(commands, str) else np.asarray(commands, dtype=object)
+        if names.shape != a.shape:
+            raise OperationError("Batch needs one command name per operand pair.")
+
+        try:
+            # Resolve every distinct command before evaluating anything
+            groups = [(self._factory.get_command(name), names == name) for name in dict.fromkeys(names.tolist())]
+        except OperationError as e:
+            self._notify(ErrorOccurred, e)
+            raise
+
+        results = np.empty(len(a), dtype=np.float64)
+        errors = np.zeros(len(a), dtype=bool)
+        row_commands = np.empty(len(a), dtype=object)
+        for command, mask in groups:
+            results[mask], errors[mask] = command.execute_array(a[mask], b[mask])
+            row_commands[mask] = command
+
+        ok = ~errors
+        timestamp = now_ns() # One timestamp for the whole batch
+        calcs = [
+            Calculation(x, y, command, result, timestamp)
+            for x, y, command, result in zip(
+                a[ok].tolist(), b[ok].tolist(), row_commands[ok].tolist(), results[ok].tolist()
+            )
+        ]
+        self._history_manager.add_calculations(calcs)
+
+        batch = BatchResult(results, errors, calcs)
+        self._notify(BatchPerformed, batch)
+        return batch
+
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        """Counters of the result cache, or None without one."""
+        return self._result_cache.stats if self._result_cache is not None else None
+
+    def report_cache_stats(self):
+        """Sends the result cache counters to observers as a CacheStatsReported event."""
+        if self._result_cache is not None:
+            self._notify(CacheStatsReported, self._result_cache.stats)
+
+    def get_history(self) -> Sequence[Calculation]:
+        """Gets a read-only sequence of the calculation history that stays usable after later changes."""
         return self._history_manager.get_history()
 
+    def count_history(self, command: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """Counts the calculations in history matching a filter."""
+        return self._history_manager.count(command, since, until)
+
+    def query_history(self, command: Optional[str] = None, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None, offset: int = 0, limit: Optional[int] = None) -> list[Calculation]:
+        """Returns one page of the calculations in history matching a filter, oldest first."""
+        return self._history_manager.query(command, since, until, offset, limit)
+
     def clear_history(self):
         """Clears the calculation history."""
         self._history_manager.clear_history()
-        self._notify("history_cleared")
+        self._notify(HistoryCleared)
 
     def undo(self):
         """Undoes the last operation."""
         self._history_manager.undo()
-        self._notify("undo")
+        self._notify(UndoPerformed)
 
     def redo(self):
         """Redoes the last undone operation."""
         self._history_manager.redo()
-        self._notify("redo")
+        self._notify(RedoPerformed)
 
     def save_history(self):
         """Manually saves the history log."""
         self._history_manager.save_history_to_csv()
-        self._notify("history_saved")
+        self._notify(HistorySaved)
         
     def load_history(self):
         """Manually loads the history log."""
         # The history manager needs the factory to rebuild command objects
         self._history_manager.load_history_from_csv(self._factory)
-        self._notify("history_loaded")
+        self._notify(HistoryLoaded)
 
     def get_available_commands(self) -> list[str]:
         """Gets list of command names from the factory."""
@@ -55,6 +55,11 @@ class ConfigLoader:
         return Path(log_dir) / 'app.log'
 
     def get_history_file_path(self) -> Path:
-        """Constructs the full path for the history CSV file."""
+        """
+        Constructs the full path for the history file: history.csv, or
+        history.bin with CALCULATOR_HISTORY_FORMAT=binary.
+        """
         history_dir = self.get_setting('CALCULATOR_HISTORY_DIR', 'data')
+        if str(self.get_setting('CALCULATOR_HISTORY_FORMAT', 'csv')).lower() == 'binary':
+            return Path(history_dir) / 'history.bin'
         return Path(history_dir) / 'history.csv'
\ No newline at end of file
@@ -3,22 +3,20 @@ Defines the Memento class for saving the calculator's state.
 Part of the Memento Design Pattern.
 """
 from __future__ import annotations
-import copy
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from app.calculation import Calculation
+    from app.persistent_history import PersistentHistory
 
 class CalculatorMemento:
     """
     The Memento class.
     It stores a snapshot of the History's state (the list of calculations).
     """
-    def __init__(self, history: list[Calculation]):
-        # Use deepcopy to ensure the state is fully independent
-        self._state = copy.deepcopy(history)
+    def __init__(self, history: PersistentHistory):
+        # The history is immutable, so keeping a reference is a full snapshot
+        self._state = history
 
-    def get_state(self) -> list[Calculation]:
+    def get_state(self) -> PersistentHistory:
         """Returns the stored state."""
-        # Return a deepcopy to prevent mutation of the stored state
-        return copy.deepcopy(self._state)
\ No newline at end of file
+        return self._state
@@ -0,0 +1,163 @@
+"""
+Defines a columnar history store that keeps calculations in typed NumPy
+arrays instead of one Python object per record.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Sequence
+import numpy as np
+from app.calculation import Calculation, datetime_to_ns
+from app.ring_buffer import RingBuffer
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from app.operations import Command
+
+class ColumnarHistory(RingBuffer):
+    """
+    A ring buffer of calculations stored column by column: float64 operands
+    and results, int64 epoch-nanosecond timestamps and uint8 command codes
+    into a small table of shared Command instances. Calculation objects are
+    only created when a record is read.
+    """
+    def __init__(self, capacity: int, items: Iterable[Calculation] = ()):
+        self._commands: list[Command] = []
+        self._codes: dict[str, int] = {}
+        super().__init__(capacity, items)
+
+    @classmethod
+    def from_columns(
+        cls,
+        capacity: int,
+        timestamps_ns: np.ndarray,
+        operand_a: np.ndarray,
+        operand_b: np.ndarray,
+        codes: np.ndarray,
+        commands: Sequence[Command],
+        results: np.ndarray,
+    ) -> ColumnarHistory:
+        """
+        Builds a store directly from column arrays, keeping the newest
+        ``capacity`` rows. ``codes`` index into ``commands``.
+        """
+        store = cls(capacity)
+        for command in commands:
+            store._code(command)
+        if capacity == 0:
+            return store
+        size = min(len(results), capacity)
+        rows = slice(len(results) - size, None)
+        # Re-map the caller's codes onto this store's command table
+        remap = np.array([store._codes[command.name] for command in commands], dtype=np.uint8)
+        store._timestamps[:size] = timestamps_ns[rows]
+        store._operand_a[:size] = operand_a[rows]
+        store._operand_b[:size] = operand_b[rows]
+        store._results[:size] = results[rows]
+        store._command_codes[:size] = remap[np.asarray(codes[rows], dtype=np.intp)] if size else 0
+        store._size = size
+        return store
+
+    def _reset_storage(self):
+        capacity = self._capacity
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._operand_a = np.zeros(capacity, dtype=np.float64)
+        self._operand_b = np.zeros(capacity, dtype=np.float64)
+        self._results = np.zeros(capacity, dtype=np.float64)
+        self._command_codes = np.zeros(capacity, dtype=np.uint8)
+
+    def _code(self, command: Command) -> int:
+        """Returns the code for a command, registering it on first use."""
+        code = self._codes.get(command.name)
+        if code is None:
+            if len(self._commands) > np.iinfo(np.uint8).max:
+                raise ValueError("Too many distinct commands for a columnar history.")
+            code = len(self._commands)
+            self._commands.append(command)
+            self._codes[command.name] = code
+        return code
+
+    def _load(self, slot: int) -> Calculation:
+        return Calculation(
+            operand_a=float(self._operand_a[slot]),
+            operand_b=float(self._operand_b[slot]),
+            command=self._commands[self._command_codes[slot]],
+            result=float(self._results[slot]),
+            timestamp=int(self._timestamps[slot]),
+        )
+
+    def _store(self, slot: int, item: Any):
+        if item is None:
+            return # Nothing to release; the slot is simply overwritten later
+        self._timestamps[slot] = item.timestamp_ns
+        self._operand_a[slot] = item.operand_a
+        self._operand_b[slot] = item.operand_b
+        self._results[slot] = item.result
+        self._command_codes[slot] = self._code(item.command)
+
+    def _order(self) -> np.ndarray:
+        """Physical slot indices of the live records, oldest first."""
+        if not self._size:
+            return np.zeros(0, dtype=np.intp)
+        return (self._head + np.arange(self._size)) % self._capacity
+
+    def columns(self) -> tuple:
+        """
+        Returns ``(timestamps_ns, operand_a, operand_b, codes, commands, results)``
+        oldest first, in the argument order of ``from_columns``.
+        """
+        order = self._order()
+        return (
+            self._timestamps[order],
+            self._operand_a[order],
+            self._operand_b[order],
+            self._command_codes[order],
+            list(self._commands),
+            self._results[order],
+        )
+
+    def copy(self) -> ColumnarHistory:
+        return ColumnarHistory.from_columns(self._capacity, *self.columns())
+
+    def match(self, command: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> list[int]:
+        """
+        Returns the logical positions (0 = oldest) of the records matching
+        a filter, computed on the columns without creating any records.
+        """
+        order = self._order()
+        mask = np.ones(len(order), dtype=bool)
+        if command is not None:
+            code = self._codes.get(command)
+            if code is None:
+                return []
+            mask &= self._command_codes[order] == code
+        if since is not None:
+            mask &= self._timestamps[order] >= datetime_to_ns(since)
+        if until is not None:
+            mask &= self._timestamps[order] <= datetime_to_ns(until)
+        return mask.nonzero()[0].tolist()
+
+    def results(self) -> np.ndarray:
+        """Returns the result column, oldest first."""
+        return self._results[self._order()]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the history as a DataFrame with the CSV schema, formatted
+        exactly like ``Calculation.to_dict`` without creating any records.
+        """
+        import pandas as pd
+        order = self._order()
+        micros = self._timestamps[order] // 1000
+        seconds = (micros // 1_000_000).astype('datetime64[s]')
+        stamps = np.datetime_as_string(seconds, unit='s')
+        # datetime.isoformat() only shows microseconds when they are non-zero
+        fraction = micros % 1_000_000
+        stamps = np.where(fraction != 0, np.char.add(stamps, np.char.mod('.%06d', fraction)), stamps)
+        names = np.array([command.name for command in self._commands] or [''], dtype=object)
+        return pd.DataFrame({
+            "Timestamp": stamps,
+            "OperandA": self._operand_a[order],
+            "OperandB": self._operand_b[order],
+            "Command": names[self._command_codes[order]],
+            "Result": self._results[order],
+        })
@@ -0,0 +1,113 @@
+"""
+Crash-safe file writing helpers for history persistence: atomic
+write-to-temp-and-rename, an fsync policy, and detection of a truncated
+trailing line left by an interrupted append.
+"""
+from __future__ import annotations
+import os
+import stat
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from app.exceptions import ConfigError
+
+FSYNC_POLICIES = ('none', 'flush', 'every_n')
+
+class FsyncPolicy:
+    """
+    Decides which writes are followed by an fsync.
+    'none' never syncs and leaves durability to the OS, 'flush' syncs
+    every write, and 'every_n' syncs every ``every_n``-th write.
+    """
+    def __init__(self, mode: str = 'none', every_n: int = 1):
+        mode = str(mode).lower()
+        if mode not in FSYNC_POLICIES:
+            raise ConfigError(f"Invalid CALCULATOR_FSYNC_POLICY: '{mode}'")
+        if every_n < 1:
+            raise ConfigError("CALCULATOR_FSYNC_EVERY_N must be at least 1.")
+        self._mode = mode
+        self._every_n = every_n
+        self._writes = 0
+
+    @property
+    def mode(self) -> str:
+        """The configured policy name."""
+        return self._mode
+
+    def should_sync(self) -> bool:
+        """Records a write and returns whether it must be synced."""
+        self._writes += 1
+        if self._mode == 'flush':
+            return True
+        return self._mode == 'every_n' and self._writes % self._every_n == 0
+
+def fsync_path(path: Path):
+    """Flushes a file's data to stable storage."""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+def _fsync_dir(directory: Path):
+    """Makes a rename inside ``directory`` durable (POSIX only)."""
+    if os.name != 'posix':
+        return # pragma: no cover
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _create_temp(path: Path) -> Path:
+    """
+    Creates an empty, uniquely named file next to ``path``. Unlike mkstemp
+    (always 0600) it is created with 0666 minus the process umask, exactly
+    like a file opened for writing, without reading or changing the umask.
+    """
+    while True:
+        tmp = path.with_name(f".{path.name}.{os.urandom(6).hex()}.tmp")
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except FileExistsError: # pragma: no cover (48 random bits)
+            continue
+        os.close(fd)
+        return tmp
+
+@contextmanager
+def atomic_path(path: Path, fsync: bool = False) -> Iterator[Path]:
+    """
+    Yields a temporary path next to ``path`` to write the new contents to.
+    On success the temporary file replaces ``path`` in a single rename, so
+    readers see either the old or the new file, never a partial one. With
+    ``fsync`` the data and the rename are synced before returning. On error
+    the temporary file is removed and ``path`` is left untouched.
+    The new file keeps the permissions of the one it replaces, or those of
+    any newly created file (0666 minus the umask).
+    """
+    tmp = _create_temp(path)
+    try:
+        yield tmp
+        if fsync:
+            fsync_path(tmp)
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass # A new file: the mode it was created with is right
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+def ends_mid_line(path: Path) -> bool:
+    """
+    Returns True if ``path`` is non-empty and does not end with a newline,
+    e.g. after a crash during an append. Missing files count as empty.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if not f.seek(0, os.SEEK_END):
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+    except FileNotFoundError:
+        return False
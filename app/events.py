@@ -0,0 +1,99 @@
+"""
+Defines the typed events the Calculator sends to its observers.
+Observers subscribe to event classes; subscribing to a base class
+(e.g. HistoryChanged, or Event for everything) covers its subclasses.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, ClassVar
+
+if TYPE_CHECKING:
+    from app.calculation import Calculation
+    from app.calculator import BatchResult
+    from app.result_cache import CacheStats
+
+@dataclass(frozen=True)
+class Event:
+    """Base class of every calculator event."""
+    name: ClassVar[str] = "event" # Short identifier, used in logs
+
+@dataclass(frozen=True)
+class HistoryChanged(Event):
+    """Base class of the events that modify the calculation history."""
+    name: ClassVar[str] = "history_changed"
+
+@dataclass(frozen=True)
+class CalculationPerformed(HistoryChanged):
+    """A calculation was performed and added to history."""
+    name: ClassVar[str] = "calculation_performed"
+    calculation: Calculation
+
+    def __str__(self) -> str:
+        return f"New Calculation: {self.calculation}"
+
+@dataclass(frozen=True)
+class BatchPerformed(HistoryChanged):
+    """A batch was evaluated; its successful elements were added to history."""
+    name: ClassVar[str] = "batch_performed"
+    batch: BatchResult
+
+    def __str__(self) -> str:
+        return f"Batch of {len(self.batch.results)} calculations performed ({self.batch.error_count} failed)."
+
+@dataclass(frozen=True)
+class HistoryCleared(HistoryChanged):
+    """The history was cleared."""
+    name: ClassVar[str] = "history_cleared"
+
+    def __str__(self) -> str:
+        return "Calculation history cleared."
+
+@dataclass(frozen=True)
+class HistoryLoaded(HistoryChanged):
+    """The history was replaced by the contents of the history file."""
+    name: ClassVar[str] = "history_loaded"
+
+    def __str__(self) -> str:
+        return "Calculation history loaded from file."
+
+@dataclass(frozen=True)
+class UndoPerformed(HistoryChanged):
+    """The last action was undone."""
+    name: ClassVar[str] = "undo"
+
+    def __str__(self) -> str:
+        return "Undo operation performed."
+
+@dataclass(frozen=True)
+class RedoPerformed(HistoryChanged):
+    """The last undone action was redone."""
+    name: ClassVar[str] = "redo"
+
+    def __str__(self) -> str:
+        return "Redo operation performed."
+
+@dataclass(frozen=True)
+class HistorySaved(Event):
+    """The whole history was written to the history file."""
+    name: ClassVar[str] = "history_saved"
+
+    def __str__(self) -> str:
+        return "Calculation history saved to file."
+
+@dataclass(frozen=True)
+class ErrorOccurred(Event):
+    """An operation failed."""
+    name: ClassVar[str] = "error_occurred"
+    error: Exception
+
+    def __str__(self) -> str:
+        return f"Operation Error: {self.error}"
+
+@dataclass(frozen=True)
+class CacheStatsReported(Event):
+    """The result cache counters were reported."""
+    name: ClassVar[str] = "cache_stats"
+    stats: CacheStats
+
+    def __str__(self) -> str:
+        return f"Result cache: {self.stats}"
@@ -0,0 +1,624 @@
+"""
+Defines the infix expression engine behind the REPL 'eval', 'def' and
+'table' commands. Source text is tokenized and parsed by precedence into a
+tree whose operators are the existing Command objects. Compiled trees are
+cached by source text, so evaluating a repeated expression skips parsing
+entirely. User-defined functions are compiled into Python closures for
+single values and into chains of the commands' NumPy kernels for ranges;
+very deep ones into flat lists of those calls, run in a loop.
+"""
+from __future__ import annotations
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Optional
+from app.exceptions import InputValidationError
+from app.operations import Command, CommandFactory
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# --- Tokenizer ---
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>//|\*\*|[-+*/^%(),])
+    )""", re.VERBOSE)
+
+def tokenize(source: str) -> list[tuple[str, str]]:
+    """Splits source text into ``(kind, text)`` tokens; kind is number, name or op."""
+    tokens = []
+    position, end = 0, len(source.rstrip())
+    while position < end:
+        match = _TOKEN.match(source, position)
+        if not match:
+            rest = source[position:]
+            position += len(rest) - len(rest.lstrip())
+            raise InputValidationError(f"Unexpected character '{source[position]}' at position {position + 1}.")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+# --- Evaluation Tree ---
+
+class Node:
+    """A node of a compiled expression."""
+    __slots__ = ()
+
+    def evaluate(self) -> float:
+        raise NotImplementedError # pragma: no cover
+
+class Number(Node):
+    """A literal (or constant-folded) value."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def evaluate(self) -> float:
+        return self.value
+
+    def __repr__(self) -> str:
+        return f"Number({self.value!r})"
+
+class Variable(Node):
+    """A parameter of a user-defined function."""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def evaluate(self) -> float:
+        raise InputValidationError(f"Unknown name: '{self.name}'") # pragma: no cover
+
+    def __repr__(self) -> str:
+        return f"Variable({self.name!r})"
+
+class Operation(Node):
+    """A Command applied to the values of two sub-expressions."""
+    __slots__ = ('command', 'left', 'right')
+
+    def __init__(self, command: Command, left: Node, right: Node):
+        self.command = command
+        self.left = left
+        self.right = right
+
+    def evaluate(self) -> float:
+        # Iterative, so deep trees (e.g. long chains of '+') cannot exhaust the stack
+        values: dict[int, float] = {}
+        for node in _postorder(self):
+            values[id(node)] = (
+                node.command.execute(values[id(node.left)], values[id(node.right)])
+                if isinstance(node, Operation) else node.evaluate()
+            )
+        return values[id(self)]
+
+    def __repr__(self) -> str:
+        return f"Operation({self.command.name}, {self.left!r}, {self.right!r})"
+
+def fold_constants(node: Node) -> Node:
+    """Replaces every operation whose operands are constants by its value."""
+    folded: dict[int, Node] = {}
+    for item in _postorder(node):
+        if isinstance(item, Operation):
+            left, right = folded[id(item.left)], folded[id(item.right)]
+            if isinstance(left, Number) and isinstance(right, Number):
+                folded[id(item)] = Number(item.command.execute(left.value, right.value))
+            else:
+                folded[id(item)] = Operation(item.command, left, right)
+        else:
+            folded[id(item)] = item
+    return folded[id(node)]
+
+def substitute(node: Node, values: dict[str, Node]) -> Node:
+    """Replaces the variables of a tree by the given sub-trees."""
+    replaced: dict[int, Node] = {}
+    for item in _postorder(node):
+        if isinstance(item, Operation):
+            replaced[id(item)] = Operation(item.command, replaced[id(item.left)], replaced[id(item.right)])
+        elif isinstance(item, Variable):
+            replaced[id(item)] = values[item.name]
+        else:
+            replaced[id(item)] = item
+    return replaced[id(node)]
+
+def _postorder(root: Node) -> list[Node]:
+    """
+    Returns the distinct nodes of a tree, every node after its operands
+    (left before right). Inlined function arguments are shared sub-trees;
+    each is listed once. Uses an explicit stack, so deep trees are fine.
+    """
+    order: list[Node] = []
+    seen: set[int] = set()
+    stack: list[tuple[Node, bool]] = [(root, False)]
+    while stack:
+        node, operands_done = stack.pop()
+        if operands_done:
+            order.append(node)
+        elif id(node) not in seen:
+            seen.add(id(node))
+            if isinstance(node, Operation):
+                stack += ((node, True), (node.right, False), (node.left, False))
+            else:
+                order.append(node)
+    return order
+
+def expanded_size(node: Node) -> int:
+    """
+    Returns the number of operations in a tree once shared sub-trees are
+    counted at every place they occur. Inlined function arguments are
+    shared, so this can grow exponentially with nesting while the tree
+    itself stays small; each distinct node is visited once.
+    """
+    sizes: dict[int, int] = {}
+    for item in _postorder(node):
+        sizes[id(item)] = (
+            1 + sizes[id(item.left)] + sizes[id(item.right)] if isinstance(item, Operation) else 0
+        )
+    return sizes[id(node)]
+
+class Expression:
+    """
+    A compiled expression. The outermost operation is kept apart from its
+    operands so the Calculator can record it as a single calculation;
+    everything below it is constant-folded at compile time.
+    """
+    __slots__ = ('source', 'root')
+
+    def __init__(self, source: str, root: Node):
+        self.source = source
+        if isinstance(root, Operation):
+            root = Operation(root.command, fold_constants(root.left), fold_constants(root.right))
+        self.root = root
+
+    def evaluate(self) -> float:
+        """Returns the value of the expression."""
+        return self.root.evaluate()
+
+# --- Parser ---
+
+# Binary operators by precedence level (lowest first) -> command name
+_BINARY_LEVELS = (
+    {'+': 'add', '-': 'subtract'},
+    {'*': 'multiply', '/': 'divide', '//': 'int_divide', '%': 'modulus'},
+)
+_POWER_OPERATORS = ('^', '**')
+
+# Parentheses, signs and powers nest recursive parser calls
+MAX_NESTING = 100
+
+# Evaluation, constant folding and compilation walk the expanded tree;
+# the size is checked before any of them runs
+MAX_EXPANDED_OPERATIONS = 10_000
+
+class Parser:
+    """
+    A recursive-descent precedence parser:
+
+        expression := term (('+' | '-') term)*
+        term       := unary (('*' | '/' | '//' | '%') unary)*
+        unary      := ('-' | '+') unary | power
+        power      := primary (('^' | '**') unary)?     (right-associative)
+        primary    := NUMBER | NAME | NAME '(' [expression (',' expression)*] ')' | '(' expression ')'
+
+    Called names are the two-operand commands of the factory, e.g.
+    ``root(27, 3)``, or user-defined functions, whose bodies are inlined.
+    Bare names are the ``variables`` (a function's parameters). Input
+    nested deeper than MAX_NESTING, or trees that expand to more than
+    MAX_EXPANDED_OPERATIONS operations, are rejected, as are numbers
+    whose magnitude exceeds ``max_value``.
+    """
+    def __init__(
+        self,
+        factory: CommandFactory,
+        source: str,
+        functions: Optional[dict[str, UserFunction]] = None,
+        variables: tuple[str, ...] = (),
+        max_value: float = math.inf,
+    ):
+        self._factory = factory
+        self._max_value = max_value
+        self._functions = functions or {}
+        self._variables = variables
+        self._tokens = tokenize(source)
+        self._position = 0
+        self._depth = 0
+
+    def parse(self) -> Node:
+        """Parses the whole source into a tree."""
+        if not self._tokens:
+            raise InputValidationError("Empty expression.")
+        node = self._level(0)
+        if self._position < len(self._tokens):
+            raise InputValidationError(f"Unexpected '{self._tokens[self._position][1]}' in expression.")
+        if expanded_size(node) > MAX_EXPANDED_OPERATIONS:
+            raise InputValidationError(
+                f"Expression is too large: it has more than {MAX_EXPANDED_OPERATIONS} "
+                "operations once functions are inlined."
+            )
+        return node
+
+    def _peek(self) -> Optional[str]:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position][1]
+        return None
+
+    def _next(self) -> tuple[str, str]:
+        if self._position >= len(self._tokens):
+            raise InputValidationError("Unexpected end of expression.")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def _expect(self, text: str):
+        kind, found = self._next()
+        if found != text:
+            raise InputValidationError(f"Expected '{text}' but found '{found}'.")
+
+    def _command(self, name: str) -> Command:
+        return self._factory.get_command(name)
+
+    def _level(self, level: int) -> Node:
+        if level == len(_BINARY_LEVELS):
+            return self._unary()
+        operators = _BINARY_LEVELS[level]
+        node = self._level(level + 1)
+        while self._peek() in operators:
+            command = self._command(operators[self._next()[1]])
+            node = Operation(command, node, self._level(level + 1))
+        return node
+
+    def _unary(self) -> Node:
+        # Every nested construct (parentheses, call arguments, signs and
+        # power exponents) comes back through here
+        if self._depth >= MAX_NESTING:
+            raise InputValidationError(f"Expression is nested more than {MAX_NESTING} levels deep.")
+        self._depth += 1
+        try:
+            return self._signed()
+        finally:
+            self._depth -= 1
+
+    def _signed(self) -> Node:
+        if self._peek() == '+':
+            self._next()
+            return self._unary()
+        if self._peek() == '-':
+            self._next()
+            operand = self._unary()
+            if isinstance(operand, Number):
+                return Number(-operand.value)
+            return Operation(self._command('subtract'), Number(0.0), operand)
+        return self._power()
+
+    def _power(self) -> Node:
+        base = self._primary()
+        if self._peek() in _POWER_OPERATORS:
+            self._next()
+            return Operation(self._command('power'), base, self._unary())
+        return base
+
+    def _primary(self) -> Node:
+        kind, text = self._next()
+        if kind == 'number':
+            value = float(text)
+            if value > self._max_value:
+                raise InputValidationError(
+                    f"Input value {value} is out of range ({-self._max_value} to {self._max_value})."
+                )
+            return Number(value)
+        if text == '(':
+            node = self._level(0)
+            self._expect(')')
+            return node
+        if kind == 'name':
+            name = text.lower()
+            if self._peek() == '(':
+                return self._call(name)
+            if name in self._variables:
+                return Variable(name)
+            raise InputValidationError(f"Unknown name: '{name}'")
+        raise InputValidationError(f"Unexpected '{text}' in expression.")
+
+    def _arguments(self) -> list[Node]:
+        self._expect('(')
+        if self._peek() == ')':
+            self._next()
+            return []
+        arguments = [self._level(0)]
+        while self._peek() == ',':
+            self._next()
+            arguments.append(self._level(0))
+        self._expect(')')
+        return arguments
+
+    def _call(self, name: str) -> Node:
+        function = self._functions.get(name)
+        if function is None and name not in self._factory.get_available_commands():
+            raise InputValidationError(f"Unknown function: '{name}'")
+        arguments = self._arguments()
+        expected = len(function.params) if function else 2
+        if len(arguments) != expected:
+            raise InputValidationError(f"Function '{name}' takes {expected} argument(s), got {len(arguments)}.")
+        if function:
+            return substitute(function.body, dict(zip(function.params, arguments)))
+        return Operation(self._command(name), *arguments)
+
+# --- User-Defined Functions ---
+
+_SIGNATURE = re.compile(r"^\s*([A-Za-z_]\w*)\s*\(\s*((?:[A-Za-z_]\w*\s*(?:,\s*[A-Za-z_]\w*\s*)*)?)\)\s*$")
+
+def _scalar_closure(node: Node, params: tuple[str, ...]) -> Callable[[tuple], float]:
+    """Compiles a tree into a function of the argument tuple."""
+    if isinstance(node, Number):
+        value = node.value
+        return lambda args: value
+    if isinstance(node, Variable):
+        return itemgetter(params.index(node.name))
+    execute = node.command.execute
+    left, right = node.left, node.right
+    # Constants are bound directly instead of through a closure call
+    if isinstance(right, Number):
+        b, left_fn = right.value, _scalar_closure(left, params)
+        return lambda args: execute(left_fn(args), b)
+    if isinstance(left, Number):
+        a, right_fn = left.value, _scalar_closure(right, params)
+        return lambda args: execute(a, right_fn(args))
+    left_fn, right_fn = _scalar_closure(left, params), _scalar_closure(right, params)
+    return lambda args: execute(left_fn(args), right_fn(args))
+
+def _vector_closure(node: Node, params: tuple[str, ...]) -> Callable:
+    """
+    Compiles a tree into a function of ``(argument arrays, length)``
+    returning ``(results, errors)``, where errors is a boolean mask or None.
+    Each operation is one call to its command's NumPy kernel.
+    """
+    import numpy as np
+    if isinstance(node, Number):
+        value = node.value
+        return lambda args, n: (np.full(n, value), None)
+    if isinstance(node, Variable):
+        index = params.index(node.name)
+        return lambda args, n: (args[index], None)
+    execute_array = node.command.execute_array
+    left_fn, right_fn = _vector_closure(node.left, params), _vector_closure(node.right, params)
+
+    def run(args, n):
+        a, left_errors = left_fn(args, n)
+        b, right_errors = right_fn(args, n)
+        results, errors = execute_array(a, b)
+        # Elements that failed further down stay failed
+        for upstream in (left_errors, right_errors):
+            if upstream is not None:
+                errors |= upstream
+        return results, errors
+    return run
+
+# Deeper trees are compiled into flat steps: nested closures call each
+# other once per level and would exhaust the stack
+MAX_CLOSURE_DEPTH = 50
+
+def tree_depth(node: Node) -> int:
+    """Returns the number of operations on the longest path from the root."""
+    depths: dict[int, int] = {}
+    for item in _postorder(node):
+        depths[id(item)] = (
+            1 + max(depths[id(item.left)], depths[id(item.right)]) if isinstance(item, Operation) else 0
+        )
+    return depths[id(node)]
+
+def _compile_steps(node: Node, params: tuple[str, ...], method: str) -> tuple[list, list, int]:
+    """
+    Flattens a tree into register steps. Registers hold the arguments,
+    then the constants, then one result per step; each step is
+    ``(function, left register, right register, registers to release)``,
+    where ``function`` is the named method of the operation's command and
+    the released registers are not read by any later step.
+    Returns the constants, the steps and the register of the result.
+    """
+    order = _postorder(node)
+    registers: dict[int, int] = {}
+    constants: list[float] = []
+    operations: list[Operation] = []
+    for item in order:
+        if isinstance(item, Number):
+            registers[id(item)] = len(params) + len(constants)
+            constants.append(item.value)
+        elif isinstance(item, Variable):
+            registers[id(item)] = params.index(item.name)
+    first_result = len(params) + len(constants)
+    for item in order:
+        if isinstance(item, Operation):
+            registers[id(item)] = first_result + len(operations)
+            operations.append(item)
+
+    last_use: dict[int, int] = {}
+    for index, item in enumerate(operations):
+        last_use[registers[id(item.left)]] = last_use[registers[id(item.right)]] = index
+    steps = [
+        (
+            getattr(item.command, method), registers[id(item.left)], registers[id(item.right)],
+            tuple(register for register in {registers[id(item.left)], registers[id(item.right)]}
+                  if last_use[register] == index),
+        )
+        for index, item in enumerate(operations)
+    ]
+    return constants, steps, registers[id(node)]
+
+def _scalar_program(node: Node, params: tuple[str, ...]) -> Callable[[tuple], float]:
+    """Compiles a tree into a function of the argument tuple that runs its steps in a loop."""
+    constants, steps, _ = _compile_steps(node, params, 'execute')
+    steps = [(execute, left, right) for execute, left, right, _ in steps]
+
+    def run(args):
+        registers = [*args, *constants]
+        append = registers.append
+        for execute, left, right in steps:
+            append(execute(registers[left], registers[right]))
+        return registers[-1]
+    return run
+
+def _vector_program(node: Node, params: tuple[str, ...]) -> Callable:
+    """
+    Compiles a tree into a function of ``(argument arrays, length)``
+    returning ``(results, errors)``, where errors is a boolean mask or None.
+    Each operation is one call to its command's NumPy kernel; intermediate
+    arrays are dropped as soon as no later step reads them.
+    """
+    import numpy as np
+    constants, steps, result = _compile_steps(node, params, 'execute_array')
+
+    def run(args, n):
+        registers: list = [(array, None) for array in args]
+        registers += [(np.full(n, value), None) for value in constants]
+        for execute_array, left, right, release in steps:
+            (a, left_errors), (b, right_errors) = registers[left], registers[right]
+            results, errors = execute_array(a, b)
+            # Elements that failed further down stay failed
+            for upstream in (left_errors, right_errors):
+                if upstream is not None:
+                    errors |= upstream
+            registers.append((results, errors))
+            for register in release:
+                registers[register] = None
+        return registers[result]
+    return run
+
+class UserFunction:
+    """
+    A function defined with ``name(params) = body``. Calls return a single
+    value (raising OperationError like the commands do); ``evaluate_array``
+    evaluates whole arrays of arguments in one vectorized pass.
+    """
+    def __init__(self, name: str, params: tuple[str, ...], body: Node, source: str):
+        self.name = name
+        self.params = params
+        self.body = fold_constants(body)
+        self.source = source
+        self._shallow = tree_depth(self.body) <= MAX_CLOSURE_DEPTH
+        self._scalar = (_scalar_closure if self._shallow else _scalar_program)(self.body, params)
+        self._vector: Optional[Callable] = None # Compiled on first use
+
+    def __call__(self, *args: float) -> float:
+        if len(args) != len(self.params):
+            raise InputValidationError(f"Function '{self.name}' takes {len(self.params)} argument(s), got {len(args)}.")
+        return self._scalar(args)
+
+    def evaluate_array(self, *arrays: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluates the function element-wise over equally long arrays (one per
+        parameter). Returns the results and a mask of the elements that failed.
+        """
+        import numpy as np
+        arrays = tuple(np.asarray(array, dtype=np.float64) for array in arrays)
+        n = len(arrays[0]) if arrays else 1
+        if len(arrays) != len(self.params) or any(array.shape != (n,) for array in arrays):
+            raise InputValidationError(f"Function '{self.name}' needs {len(self.params)} one-dimensional arrays of equal length.")
+        if self._vector is None:
+            compile_vector = _vector_closure if self._shallow else _vector_program
+            self._vector = compile_vector(self.body, self.params)
+        results, errors = self._vector(arrays, n)
+        if any(results is array for array in arrays):
+            results = results.copy() # Never hand out an argument array
+        return results, np.zeros(n, dtype=bool) if errors is None else errors
+
+    def __str__(self) -> str:
+        return self.source
+
+@dataclass(frozen=True)
+class TableRange:
+    """The values of one variable for the 'table' command: start..stop (inclusive) by step."""
+    variable: str
+    start: float
+    stop: float
+    step: float = 1.0
+
+    @property
+    def count(self) -> int:
+        """Number of values in the range."""
+        # The small tolerance keeps stop itself despite rounding (0..1 step 0.1)
+        return int((self.stop - self.start) / self.step + 1e-9) + 1
+
+    def values(self) -> np.ndarray:
+        """The values of the range."""
+        import numpy as np
+        return self.start + self.step * np.arange(self.count, dtype=np.float64)
+
+# --- Compiler ---
+
+class ExpressionCompiler:
+    """
+    Compiles source text into Expressions, keeping the ``cache_size`` most
+    recently used ones by source text (0 disables the cache), and holds the
+    user-defined functions expressions can call. Number literals may not
+    exceed ``max_value`` in magnitude.
+    """
+    def __init__(self, factory: CommandFactory, cache_size: int = 256, max_value: float = math.inf):
+        self._factory = factory
+        self._max_value = max_value
+        self._functions: dict[str, UserFunction] = {}
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, Expression] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source: str) -> Expression:
+        """Returns the compiled form of ``source``, from the cache when possible."""
+        source = source.strip()
+        expression = self._cache.get(source)
+        if expression is not None:
+            self.hits += 1
+            self._cache.move_to_end(source)
+            return expression
+
+        self.misses += 1
+        expression = Expression(source, Parser(self._factory, source, self._functions, max_value=self._max_value).parse())
+        if self._cache_size > 0:
+            self._cache[source] = expression
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return expression
+
+    def clear(self):
+        """Drops every cached expression."""
+        self._cache.clear()
+
+    def define(self, source: str) -> UserFunction:
+        """
+        Defines (or replaces) a function from ``name(params) = body``.
+        The body may use the parameters, commands and earlier functions.
+        """
+        signature, separator, body = source.partition('=')
+        match = _SIGNATURE.match(signature)
+        if not separator or not match:
+            raise InputValidationError("Expected a definition like 'f(x, y) = power(x, 2) + y'.")
+        name = match.group(1).lower()
+        params = tuple(param.strip().lower() for param in match.group(2).split(',') if param.strip())
+        if name in self._factory.get_available_commands():
+            raise InputValidationError(f"'{name}' is a built-in command and cannot be redefined.")
+        if len(set(params)) != len(params):
+            raise InputValidationError(f"Function '{name}' has duplicate parameters.")
+
+        tree = Parser(self._factory, body, self._functions, params, self._max_value).parse()
+        function = UserFunction(name, params, tree, f"{name}({', '.join(params)}) = {body.strip()}")
+        self._functions[name] = function
+        # Cached expressions may have inlined an older definition
+        self._cache.clear()
+        return function
+
+    def function(self, name: str) -> UserFunction:
+        """Returns a user-defined function by name."""
+        function = self._functions.get(name.lower())
+        if function is None:
+            raise InputValidationError(f"Unknown function: '{name}'")
+        return function
+
+    @property
+    def functions(self) -> list[UserFunction]:
+        """The user-defined functions, in definition order."""
+        return list(self._functions.values())
@@ -1,74 +1,272 @@
 """
 Manages the history of calculations, including undo/redo and CSV persistence.
 This class acts as the 'Caretaker' and 'Originator' in the Memento pattern.
+pandas and NumPy are imported on first use, not when the module loads.
 """
-import pandas as pd
+from __future__ import annotations
+import csv
+import logging
+import threading
+from collections.abc import Sequence
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
 from app.calculator_config import ConfigLoader
-from app.calculation import Calculation
+from app.calculation import Calculation, datetime_to_ns
 from app.calculator_memento import CalculatorMemento
-from app.exceptions import HistoryError, OperationError
+from app.persistent_history import PersistentHistory
+from app.history_journal import AppendEntry, ClearEntry, ExtendEntry, LoadEntry, UndoStack
+from app.ring_buffer import RingBuffer
+from app.history_csv import CSV_COLUMNS, read_history_csv, write_history_csv
+from app.durable_io import FsyncPolicy, atomic_path, fsync_path
+from app.exceptions import ConfigError, HistoryError
 from app.operations import CommandFactory # Needed for loading from CSV
+from app.reductions import chunk_values
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 class History:
     """
     Manages calculation history, undo/redo stacks, and CSV persistence.
     Acts as the 'Caretaker' (Memento) and 'Originator' (Memento)
     by creating and restoring its own state.
+
+    In 'snapshot' undo mode the stacks hold mementos; in 'journal' mode
+    they hold entries that record only the change each action made.
+    Journal mode keeps the live history in a ring buffer, or in NumPy
+    columns with CALCULATOR_HISTORY_BACKEND=columnar.
     """
     
     def __init__(self, config: ConfigLoader):
         self._config = config
-        self._history: list[Calculation] = []
-        self._undo_stack: list[CalculatorMemento] = []
-        self._redo_stack: list[CalculatorMemento] = []
+        self._undo_mode = str(config.get_setting('CALCULATOR_UNDO_MODE', 'snapshot')).lower()
+        if self._undo_mode not in ('snapshot', 'journal'):
+            raise ConfigError(f"Invalid CALCULATOR_UNDO_MODE: '{self._undo_mode}'")
+        self._journal = self._undo_mode == 'journal'
+        self._backend = str(config.get_setting('CALCULATOR_HISTORY_BACKEND', 'ring')).lower()
+        if self._backend == 'sqlite':
+            raise ConfigError("The sqlite history backend is provided by SQLiteHistory; use create_history().")
+        if self._backend not in ('ring', 'columnar'):
+            raise ConfigError(f"Invalid CALCULATOR_HISTORY_BACKEND: '{self._backend}'")
+        if self._backend == 'columnar' and not self._journal:
+            raise ConfigError("The columnar history backend requires CALCULATOR_UNDO_MODE=journal.")
         self._max_history_size = int(config.get_setting('CALCULATOR_MAX_HISTORY_SIZE', 20))
+        self._history = self._new_store()
+        # Journal mode: an immutable copy of the store that get_history hands
+        # out. Adds extend it in place; other changes drop it until next needed.
+        self._view: Optional[PersistentHistory] = None
+        self._eviction_count = 0
+        self._last_load_skipped = 0
+
+        max_undo_depth = int(config.get_setting('CALCULATOR_MAX_UNDO_DEPTH', 0))
+        memory_budget = int(config.get_setting('CALCULATOR_UNDO_MEMORY_BUDGET', 0))
+        self._undo_stack = UndoStack(max_undo_depth, memory_budget)
+        self._redo_stack = UndoStack(max_undo_depth, memory_budget)
         self._history_file_path = config.get_history_file_path()
         self._encoding = config.get_setting('CALCULATOR_DEFAULT_ENCODING', 'utf-8')
+        self._csv_engine = str(config.get_setting('CALCULATOR_CSV_ENGINE', 'pandas')).lower()
+        if self._csv_engine not in ('pandas', 'native'):
+            raise ConfigError(f"Invalid CALCULATOR_CSV_ENGINE: '{self._csv_engine}'")
+        self._format = str(config.get_setting('CALCULATOR_HISTORY_FORMAT', 'csv')).lower()
+        if self._format not in ('csv', 'binary'):
+            raise ConfigError(f"Invalid CALCULATOR_HISTORY_FORMAT: '{self._format}'")
+        self._fsync_policy = FsyncPolicy(
+            config.get_setting('CALCULATOR_FSYNC_POLICY', 'none'),
+            int(config.get_setting('CALCULATOR_FSYNC_EVERY_N', 1)),
+        )
+        # Serializes file writes from the REPL and the autosave worker
+        self._file_lock = threading.Lock()
+
+    def _new_store(self, calcs=()):
+        """Creates the container that holds the live history."""
+        if self._backend == 'columnar':
+            from app.columnar_history import ColumnarHistory
+            return ColumnarHistory(self._max_history_size, calcs)
+        if self._journal:
+            return RingBuffer(self._max_history_size, calcs)
+        return PersistentHistory(calcs)
+
+    def close(self):
+        """Releases resources held by the store. Nothing to do in memory."""
+
+    @property
+    def max_history_size(self) -> int:
+        """Maximum number of calculations kept in the history."""
+        return self._max_history_size
+
+    @property
+    def eviction_count(self) -> int:
+        """Number of calculations evicted so far to respect the max size."""
+        return self._eviction_count
 
     def add_calculation(self, calc: Calculation):
         """Adds a new calculation, saves state for undo, and clears redo."""
-        # Save current state for undo
-        self._undo_stack.append(self.create_memento())
-        
-        # Add new calculation
-        self._history.append(calc)
-        
-        # Enforce max history size
-        if len(self._history) > self._max_history_size:
-            self._history.pop(0) # Remove the oldest entry
+        if self._journal:
+            # The ring buffer evicts the oldest entry past max history size in O(1)
+            evicted = self._history.append(calc)
+            if self._view is not None:
+                self._view = self._view.append(calc, self._max_history_size)
+            self._undo_stack.append(AppendEntry(calc, evicted))
+            if evicted is not None:
+                self._eviction_count += 1
+        else:
+            # Save current state for undo
+            self._undo_stack.append(self.create_memento())
+            
+            # Add new calculation, evicting the oldest entry past max history size
+            if len(self._history) >= self._max_history_size:
+                self._eviction_count += 1
+            self._history = self._history.append(calc, self._max_history_size)
             
         # A new action clears the redo stack
         self._redo_stack.clear()
 
-    def get_history(self) -> list[Calculation]:
-        """Returns a copy of the current history."""
-        return self.create_memento().get_state()
+    def add_calculations(self, calcs: Sequence[Calculation]):
+        """Adds a batch of calculations as a single undoable action."""
+        if not calcs:
+            return
+        if self._journal:
+            size_before = len(self._history)
+            evicted = [e for e in map(self._history.append, calcs) if e is not None]
+            if self._view is not None:
+                self._view = self._view.extend(calcs, self._max_history_size)
+            # Evictions beyond the pre-existing records removed part of the batch itself
+            previous = evicted[:size_before]
+            kept = len(calcs) - (len(evicted) - len(previous))
+            self._undo_stack.append(ExtendEntry(tuple(calcs), previous, kept))
+            self._eviction_count += len(evicted)
+        else:
+            self._undo_stack.append(self.create_memento())
+            self._eviction_count += max(0, len(self._history) + len(calcs) - self._max_history_size)
+            self._history = self._history.extend(calcs, self._max_history_size)
+
+        self._redo_stack.clear()
+
+    def get_history(self) -> Sequence[Calculation]:
+        """
+        Returns an immutable sequence of the current history that callers
+        can keep: the persistent store itself in snapshot mode, a window over
+        a PersistentHistory kept in step with the store in journal mode. Both
+        are O(1); in journal mode the first call after an undo, redo, clear
+        or load copies the store once.
+        """
+        if self._journal:
+            if self._view is None:
+                self._view = PersistentHistory(self._history)
+            return self._view
+        return self._history
+
+    def snapshot(self) -> Sequence[Calculation]:
+        """
+        Returns an immutable copy of the current history that stays valid
+        after later changes. O(1) in snapshot mode, O(n) in journal mode.
+        """
+        if self._journal:
+            return self._history.copy()
+        return self._history
+
+    def results(self, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+        """
+        Yields the results of the current history, oldest first, as float64
+        arrays of up to ``chunk_size`` values. The columnar backend slices
+        its result column without creating any records.
+        """
+        if self._backend == 'columnar':
+            results = self._history.results()
+            for start in range(0, len(results), chunk_size):
+                yield results[start:start + chunk_size]
+        else:
+            yield from chunk_values((calc.result for calc in self._history), chunk_size)
+
+    def _matches(self, command: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> Sequence[int]:
+        """
+        Positions of the records matching a filter, oldest first. Without a
+        filter this is a range, so nothing is copied; columnar stores are
+        filtered on their columns without creating records.
+        """
+        history = self._history
+        if command is None and since is None and until is None:
+            return range(len(history))
+        if self._backend == 'columnar':
+            return self._history.match(command, since, until)
+        since_ns = None if since is None else datetime_to_ns(since)
+        until_ns = None if until is None else datetime_to_ns(until)
+        return [
+            i for i, calc in enumerate(history)
+            if (command is None or calc.command_name == command)
+            and (since_ns is None or calc.timestamp_ns >= since_ns)
+            and (until_ns is None or calc.timestamp_ns <= until_ns)
+        ]
+
+    def count(self, command: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """Counts the calculations matching a filter."""
+        return len(self._matches(command, since, until))
+
+    def query(
+        self,
+        command: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> list[Calculation]:
+        """
+        Returns one page of the calculations matching a filter, oldest first
+        unless ``newest_first``. Only the records on the page are read.
+        """
+        matches = self._matches(command, since, until)
+        if newest_first:
+            matches = matches[::-1]
+        stop = None if limit is None else offset + limit
+        history = self._history
+        return [history[i] for i in matches[offset:stop]]
 
     def clear_history(self):
         """Clears all history, saving state for undo."""
         if not self._history:
             return # Nothing to clear
             
-        self._undo_stack.append(self.create_memento())
-        self._history.clear()
+        if self._journal:
+            # Hand the current store over to the journal instead of copying it
+            cleared = self._new_store()
+            self._undo_stack.append(ClearEntry(self._history, cleared))
+            self._history = cleared
+            self._view = None
+        else:
+            self._undo_stack.append(self.create_memento())
+            self._history = self._history.cleared()
         self._redo_stack.clear()
 
     # --- Memento Pattern Methods ---
 
     def create_memento(self) -> CalculatorMemento:
         """Saves the current history list into a memento."""
-        return CalculatorMemento(self._history)
+        return CalculatorMemento(self.get_history())
 
     def restore_memento(self, memento: CalculatorMemento):
         """Restores the history list from a memento."""
-        self._history = memento.get_state()
+        if self._journal:
+            self._history = self._new_store(memento.get_state())
+            self._view = None
+        else:
+            self._history = memento.get_state()
 
     def undo(self):
         """Performs an undo operation."""
         if not self._undo_stack:
             raise HistoryError("Nothing to undo.")
+
+        if self._journal:
+            entry = self._undo_stack.pop()
+            self._history = entry.undo(self._history)
+            self._view = None
+            self._redo_stack.append(entry)
+            return
         
         # Save current state for redo
         self._redo_stack.append(self.create_memento())
@@ -80,6 +278,13 @@ class History:
         """Performs a redo operation."""
         if not self._redo_stack:
             raise HistoryError("Nothing to redo.")
+
+        if self._journal:
+            entry = self._redo_stack.pop()
+            self._history = entry.redo(self._history)
+            self._view = None
+            self._undo_stack.append(entry)
+            return
             
         # Save current state for undo
         self._undo_stack.append(self.create_memento())
@@ -89,71 +294,231 @@ class History:
 
     # --- Persistence Methods (Pandas) ---
 
-    def save_history_to_csv(self):
-        """Saves the current calculation history to a CSV file using pandas."""
-        if not self._history:
+    def save_history_to_csv(self, calcs: Optional[Sequence[Calculation]] = None):
+        """
+        Saves the current calculation history to a CSV file using pandas
+        (or the native writer with CALCULATOR_CSV_ENGINE=native, or the
+        binary format with CALCULATOR_HISTORY_FORMAT=binary).
+        If ``calcs`` is given (e.g. a snapshot), it is saved instead.
+        The file is written to a temporary file and renamed over the old
+        one, so a crash mid-save never leaves a partial file behind.
+        """
+        if calcs is None:
+            calcs = self._history
+        target = "binary file" if self._format == 'binary' else "CSV"
+        try:
+            self._history_file_path.parent.mkdir(parents=True, exist_ok=True)
+            sync = self._fsync_policy.should_sync()
+            with self._file_lock, atomic_path(self._history_file_path, sync) as tmp:
+                if self._format == 'binary':
+                    from app.history_binary import write_history_binary
+                    write_history_binary(tmp, calcs)
+                elif self._csv_engine == 'native':
+                    write_history_csv(tmp, calcs, self._encoding)
+                else:
+                    self._write_frame(tmp, calcs)
+        except (IOError, OSError, ValueError) as e:
+            raise HistoryError(f"Failed to save history to {target}: {e}")
+
+    def _write_frame(self, path: Path, calcs: Sequence[Calculation]):
+        """Writes calculations to ``path`` with pandas."""
+        import pandas as pd
+        from app.columnar_history import ColumnarHistory
+        if not calcs:
             # If history is empty, we should write an empty file (or empty the existing one)
             # This ensures that loading an empty history works correctly.
-            empty_df = pd.DataFrame(columns=["Timestamp", "OperandA", "OperandB", "Command", "Result"])
-            try:
-                self._history_file_path.parent.mkdir(parents=True, exist_ok=True)
-                empty_df.to_csv(self._history_file_path, index=False, encoding=self._encoding)
-            except (IOError, OSError) as e:
-                raise HistoryError(f"Failed to save empty history to CSV: {e}")
+            df = pd.DataFrame(columns=list(CSV_COLUMNS))
+        elif isinstance(calcs, ColumnarHistory):
+            # Columns go straight into the frame, no per-record objects
+            df = calcs.to_frame()
+        else:
+            # Convert list of Calculation objects to list of dicts
+            df = pd.DataFrame([calc.to_dict() for calc in calcs])
+        df.to_csv(path, index=False, encoding=self._encoding)
+
+    def append_to_csv(self, calcs: Iterable[Calculation]):
+        """
+        Appends calculations to the end of an existing CSV file without
+        rewriting it. Rows are formatted the same way pandas writes them.
+        In binary format fixed-width records are appended instead.
+        """
+        target = "binary file" if self._format == 'binary' else "CSV"
+        try:
+            with self._file_lock:
+                if self._format == 'binary':
+                    from app.history_binary import write_history_binary
+                    write_history_binary(self._history_file_path, calcs, append=True)
+                else:
+                    write_history_csv(self._history_file_path, calcs, self._encoding, append=True)
+                if self._fsync_policy.should_sync():
+                    fsync_path(self._history_file_path)
+        except (IOError, OSError, ValueError) as e:
+            raise HistoryError(f"Failed to append history to {target}: {e}")
+
+    @property
+    def last_load_skipped(self) -> int:
+        """Number of malformed rows skipped by the last load."""
+        return self._last_load_skipped
+
+    def _store_from_frame(self, df: pd.DataFrame, command_factory: CommandFactory):
+        """
+        Converts a history DataFrame into a new store column by column.
+        Malformed rows are dropped with a mask and counted; file-level errors
+        (like a missing column, KeyError) bubble up.
+        """
+        import pandas as pd
+        commands = command_factory.get_command_table()
+        timestamps = pd.to_datetime(df["Timestamp"], errors="coerce", format="ISO8601")
+        operand_a = pd.to_numeric(df["OperandA"], errors="coerce")
+        operand_b = pd.to_numeric(df["OperandB"], errors="coerce")
+        results = pd.to_numeric(df["Result"], errors="coerce")
+        command_col = df["Command"].map(commands)
+
+        valid = (
+            timestamps.notna() & operand_a.notna() & operand_b.notna()
+            & results.notna() & command_col.notna()
+        )
+        self._last_load_skipped = int((~valid).sum())
+        if self._last_load_skipped:
+            logger.warning(f"Skipped {self._last_load_skipped} malformed row(s) while loading history.")
+
+        # Older rows past the max size may remain after incremental saves;
+        # drop them before building any objects
+        keep = valid.to_numpy().nonzero()[0][-self._max_history_size:] if self._max_history_size else []
+
+        if self._backend == 'columnar':
+            from app.columnar_history import ColumnarHistory
+            codes, names = pd.factorize(df["Command"].iloc[keep])
+            return ColumnarHistory.from_columns(
+                self._max_history_size,
+                timestamps.iloc[keep].to_numpy(dtype='datetime64[ns]').view('int64'),
+                operand_a.iloc[keep].to_numpy(dtype='float64'),
+                operand_b.iloc[keep].to_numpy(dtype='float64'),
+                codes,
+                [commands[name] for name in names],
+                results.iloc[keep].to_numpy(dtype='float64'),
+            )
+
+        return self._new_store([
+            Calculation(operand_a=a, operand_b=b, command=command, result=result, timestamp=timestamp)
+            for a, b, command, result, timestamp in zip(
+                operand_a.iloc[keep].tolist(),
+                operand_b.iloc[keep].tolist(),
+                command_col.iloc[keep].tolist(),
+                results.iloc[keep].tolist(),
+                pd.DatetimeIndex(timestamps.iloc[keep]).to_pydatetime(),
+            )
+        ])
+
+    def _replace_with_loaded(self, new_history):
+        """Swaps in a loaded store, saving the current state for undo."""
+        if self._journal:
+            self._undo_stack.append(LoadEntry(self._history, new_history))
+        else:
+            self._undo_stack.append(self.create_memento())
+        self._history = new_history
+        self._view = None
+        self._redo_stack.clear()
+
+    def _load_empty(self):
+        """
+        Replaces the history with an empty one when the file holds no rows.
+        Like any load this is an undoable action, unless nothing changes.
+        """
+        if len(self._history):
+            self._replace_with_loaded(self._new_store())
+
+    def _load_native(self, command_factory: CommandFactory):
+        """Loads the history with the native streaming CSV reader."""
+        try:
+            calcs, skipped, rows = read_history_csv(
+                self._history_file_path, command_factory.get_command_table(),
+                self._max_history_size, self._encoding,
+            )
+        except (csv.Error, KeyError) as e:
+            raise HistoryError(f"Failed to parse history file (malformed CSV?): {e}")
+        except Exception as e:
+            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
+
+        if not rows:
+            self._load_empty()
             return
+        self._last_load_skipped = skipped
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed row(s) while loading history.")
+        self._replace_with_loaded(self._new_store(calcs))
 
+    def _load_binary(self, command_factory: CommandFactory):
+        """
+        Loads the history from a memory-mapped binary file. Only the newest
+        ``max_history_size`` records are read, so the load time does not
+        grow with the file. Records with an unknown command are skipped.
+        """
+        from app.history_binary import BinaryHistoryFile
         try:
-            # Convert list of Calculation objects to list of dicts
-            data = [calc.to_dict() for calc in self._history]
-            df = pd.DataFrame(data)
-            
-            # Ensure directory exists
-            self._history_file_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            df.to_csv(self._history_file_path, index=False, encoding=self._encoding)
-            
-        except (pd.errors.EmptyDataError, IOError, OSError) as e:
-            raise HistoryError(f"Failed to save history to CSV: {e}")
+            source = BinaryHistoryFile(self._history_file_path, command_factory.get_command_table())
+            if not len(source):
+                self._load_empty()
+                return
+            records, skipped = source.newest(self._max_history_size)
+            if self._backend == 'columnar':
+                from app.columnar_history import ColumnarHistory
+                new_history = ColumnarHistory.from_columns(self._max_history_size, *source.columns(records))
+            else:
+                new_history = self._new_store(source.calculations(records))
+        except ValueError as e:
+            raise HistoryError(f"Failed to parse history file (not a binary history?): {e}")
+        except Exception as e:
+            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
+
+        self._last_load_skipped = skipped
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed row(s) while loading history.")
+        self._replace_with_loaded(new_history)
 
     def load_history_from_csv(self, command_factory: CommandFactory):
-        """Loads calculation history from a CSV file using pandas."""
+        """
+        Loads calculation history from a CSV file using pandas
+        (or the native reader with CALCULATOR_CSV_ENGINE=native, or the
+        binary format with CALCULATOR_HISTORY_FORMAT=binary).
+        Loading never modifies the file: a torn last row left by a crash
+        during an append is skipped like any other malformed row.
+        """
         if not self._history_file_path.exists():
             # If the file doesn't exist, just start with an empty history.
-            self._history = []
+            self._load_empty()
+            return
+        if self._format == 'binary':
+            self._load_binary(command_factory)
+            return
+        if self._csv_engine == 'native':
+            self._load_native(command_factory)
             return
 
+        import pandas as pd
         try:
             df = pd.read_csv(self._history_file_path, encoding=self._encoding)
             
             if df.empty:
-                self._history = []
+                self._load_empty()
                 return
 
-            new_history = []
-            for _, row in df.iterrows():
-                try:
-                    command = command_factory.get_command(row["Command"])
-                    calc = Calculation(
-                        operand_a=float(row["OperandA"]),
-                        operand_b=float(row["OperandB"]),
-                        command=command,
-                        result=float(row["Result"]),
-                        timestamp=pd.to_datetime(row["Timestamp"]).to_pydatetime()
-                    )
-                    new_history.append(calc)
-                except (ValueError, OperationError):
-                    # Skip malformed data rows, but let file-level errors (like KeyError) bubble up
-                    continue # pragma: no cover
-
-            # Save current state for undo, then load
-            self._undo_stack.append(self.create_memento())
-            self._history = new_history
-            self._redo_stack.clear()
+            self._replace_with_loaded(self._store_from_frame(df, command_factory))
             
         except pd.errors.EmptyDataError:
             # File is empty, just start with empty history
-            self._history = []
+            self._load_empty()
         except (pd.errors.ParserError, KeyError) as e:
             raise HistoryError(f"Failed to parse history file (malformed CSV?): {e}")
         except Exception as e:
-            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
\ No newline at end of file
+            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
+
+def create_history(config: ConfigLoader) -> History:
+    """
+    Builds the history manager selected by CALCULATOR_HISTORY_BACKEND:
+    ``History`` for the in-memory backends, ``SQLiteHistory`` for sqlite.
+    """
+    if str(config.get_setting('CALCULATOR_HISTORY_BACKEND', 'ring')).lower() == 'sqlite':
+        from app.sqlite_history import SQLiteHistory
+        return SQLiteHistory(config)
+    return History(config)
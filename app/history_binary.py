@@ -0,0 +1,239 @@
+"""
+Compact binary history format that can be memory-mapped and read lazily.
+
+A file starts with a fixed-size header (magic, version, record size and the
+table of command names) followed by fixed-width little-endian records:
+int64 epoch-nanosecond timestamp, float64 operands and result, and a uint8
+code into the command table. Because records never move, the newest ones
+can be located by offset without parsing the rest of the file.
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Mapping, Optional
+import numpy as np
+from app.calculation import Calculation
+from app.history_csv import read_history_csv, write_history_csv
+
+if TYPE_CHECKING:
+    from app.operations import Command
+
+MAGIC = b"CALCHIST"
+VERSION = 1
+HEADER_SIZE = 4096
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("operand_a", "<f8"),
+    ("operand_b", "<f8"),
+    ("result", "<f8"),
+    ("command", "u1"),
+])
+_HEADER = struct.Struct("<8sHHH") # magic, version, record size, number of command names
+
+# Records are scanned backwards in chunks of at least this many rows
+_CHUNK_ROWS = 4096
+
+def _encode_header(names: Sequence[str]) -> bytes:
+    """Packs the header, padded to ``HEADER_SIZE`` bytes."""
+    header = bytearray(_HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, len(names)))
+    for name in names:
+        encoded = name.encode("utf-8")
+        header += bytes([len(encoded)]) + encoded
+    if len(header) > HEADER_SIZE:
+        raise ValueError("Too many command names for a binary history header.")
+    return bytes(header.ljust(HEADER_SIZE, b"\0"))
+
+def _decode_header(header: bytes) -> list[str]:
+    """Returns the command names stored in a header. Raises ValueError if it is invalid."""
+    if len(header) < HEADER_SIZE:
+        raise ValueError("File is too short to be a binary history.")
+    magic, version, record_size, count = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError("Not a binary history file.")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported binary history version {version}.")
+    names, offset = [], _HEADER.size
+    for _ in range(count):
+        length = header[offset]
+        names.append(header[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    return names
+
+def _to_records(calcs: Iterable[Calculation], names: list[str]) -> np.ndarray:
+    """
+    Packs calculations into a record array, adding unseen command names
+    to ``names`` in place.
+    """
+    from app.columnar_history import ColumnarHistory
+    codes = {name: code for code, name in enumerate(names)}
+
+    def code(name: str) -> int:
+        if name not in codes:
+            if len(names) > np.iinfo(np.uint8).max:
+                raise ValueError("Too many distinct commands for a binary history.")
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    if isinstance(calcs, ColumnarHistory):
+        # Columns are copied as they are, no per-record objects
+        timestamps, operand_a, operand_b, store_codes, commands, results = calcs.columns()
+        remap = np.array([code(command.name) for command in commands] or [0], dtype=np.uint8)
+        records = np.empty(len(results), dtype=RECORD_DTYPE)
+        records["timestamp"] = timestamps
+        records["operand_a"] = operand_a
+        records["operand_b"] = operand_b
+        records["result"] = results
+        records["command"] = remap[store_codes]
+        return records
+
+    calcs = list(calcs)
+    records = np.empty(len(calcs), dtype=RECORD_DTYPE)
+    records["timestamp"] = [calc.timestamp_ns for calc in calcs]
+    records["operand_a"] = [calc.operand_a for calc in calcs]
+    records["operand_b"] = [calc.operand_b for calc in calcs]
+    records["result"] = [calc.result for calc in calcs]
+    records["command"] = [code(calc.command_name) for calc in calcs]
+    return records
+
+def write_history_binary(path: Path, calcs: Iterable[Calculation], append: bool = False):
+    """
+    Writes calculations to ``path`` in the binary format.
+    ``append=True`` adds records to an existing file (creating it if needed)
+    and only rewrites the header when new command names appear.
+    """
+    if not append or not os.path.exists(path):
+        names: list[str] = []
+        records = _to_records(calcs, names)
+        with open(path, "wb") as f:
+            f.write(_encode_header(names))
+            f.write(records.tobytes())
+        return
+
+    with open(path, "r+b") as f:
+        names = _decode_header(f.read(HEADER_SIZE))
+        known = len(names)
+        records = _to_records(calcs, names)
+        if len(names) != known:
+            f.seek(0)
+            f.write(_encode_header(names))
+        # Drop any partial record left at the end of the file by an interrupted write
+        count = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        f.seek(HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+        f.write(records.tobytes())
+        f.truncate()
+
+class BinaryHistoryFile(Sequence):
+    """
+    A read-only, memory-mapped view of a binary history file.
+    Only the pages that are actually read are loaded from disk, and
+    Calculation objects are created on access. Records whose command is
+    not in ``commands`` come back with a ``None`` command.
+    """
+    def __init__(self, path: Path, commands: Mapping[str, Command]):
+        with open(path, "rb") as f:
+            self._names = _decode_header(f.read(HEADER_SIZE))
+            size = os.fstat(f.fileno()).st_size
+        # A partial record at the end (an interrupted append) is ignored
+        count = (size - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        self._commands: list[Optional[Command]] = [commands.get(name) for name in self._names]
+        # Indexed by every possible code, so stray codes in a damaged file read as unknown
+        self._known = np.zeros(256, dtype=bool)
+        self._known[:len(self._commands)] = [command is not None for command in self._commands]
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    @property
+    def commands(self) -> list[Optional[Command]]:
+        """The command table; ``records['command']`` indexes into it."""
+        return self._commands
+
+    def newest(self, count: int) -> tuple[np.ndarray, int]:
+        """
+        Returns ``(records, skipped)``: an in-memory copy of the newest
+        ``count`` records with a known command, oldest first, and the number
+        of unknown-command records in the part of the file that was scanned.
+        Only the end of the file is read.
+        """
+        kept: list[np.ndarray] = []
+        found = skipped = 0
+        stop = len(self.records)
+        chunk = max(count, _CHUNK_ROWS)
+        while found < count and stop > 0:
+            start = max(0, stop - chunk)
+            block = np.array(self.records[start:stop])
+            valid = self._known[block["command"]]
+            block = block[valid][-(count - found):]
+            skipped += int((~valid).sum())
+            kept.append(block)
+            found += len(block)
+            stop = start
+        if not kept:
+            return np.zeros(0, dtype=RECORD_DTYPE), skipped
+        return np.concatenate(kept[::-1]), skipped
+
+    def calculations(self, records: np.ndarray) -> list[Calculation]:
+        """Builds Calculation objects from records of this file."""
+        commands = self._commands
+        return [
+            Calculation(a, b, commands[code], result, ns)
+            for ns, a, b, result, code in zip(
+                records["timestamp"].tolist(), records["operand_a"].tolist(),
+                records["operand_b"].tolist(), records["result"].tolist(),
+                records["command"].tolist(),
+            )
+        ]
+
+    def columns(self, records: np.ndarray) -> tuple:
+        """
+        Splits records of this file into the arguments of
+        ``ColumnarHistory.from_columns`` (after the capacity), leaving
+        unknown commands out of the command table.
+        """
+        known = [code for code, command in enumerate(self._commands) if command is not None]
+        remap = np.zeros(256, dtype=np.uint8)
+        remap[known] = np.arange(len(known))
+        return (
+            records["timestamp"],
+            records["operand_a"],
+            records["operand_b"],
+            remap[records["command"]],
+            [self._commands[code] for code in known],
+            records["result"],
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.calculations(self.records[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("binary history index out of range")
+        return self.calculations(self.records[index:index + 1])[0]
+
+def csv_to_binary(csv_path: Path, binary_path: Path, commands: Mapping[str, Command], encoding: str = "utf-8") -> int:
+    """
+    Converts a history CSV into the binary format.
+    Returns the number of malformed CSV rows that were skipped.
+    """
+    calcs, skipped, _ = read_history_csv(csv_path, commands, sys.maxsize, encoding)
+    write_history_binary(binary_path, calcs)
+    return skipped
+
+def binary_to_csv(binary_path: Path, csv_path: Path, commands: Mapping[str, Command], encoding: str = "utf-8") -> int:
+    """
+    Converts a binary history into the CSV format written by pandas.
+    Returns the number of records skipped because their command is unknown.
+    """
+    source = BinaryHistoryFile(binary_path, commands)
+    records, skipped = source.newest(len(source))
+    write_history_csv(csv_path, source.calculations(records), encoding)
+    return skipped
@@ -0,0 +1,87 @@
+"""
+Native, pandas-free reader and writer for the history CSV schema.
+Files are byte-compatible with the ones pandas writes for the same history.
+"""
+from __future__ import annotations
+import csv
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Mapping
+from app.calculation import Calculation
+from app.durable_io import ends_mid_line
+
+if TYPE_CHECKING:
+    from app.operations import Command
+
+CSV_COLUMNS = ("Timestamp", "OperandA", "OperandB", "Command", "Result")
+
+# Large buffers keep the number of system calls low for big histories
+_BUFFER_SIZE = 1 << 20
+
+def calc_to_row(calc: Calculation) -> tuple:
+    """Formats a calculation as a CSV row, the way pandas writes it."""
+    # pandas stores the numeric columns as float64, so 3 is written as 3.0
+    return (
+        calc.timestamp.isoformat(),
+        float(calc.operand_a),
+        float(calc.operand_b),
+        calc.command_name,
+        float(calc.result),
+    )
+
+def write_history_csv(path: Path, calcs: Iterable[Calculation], encoding: str = 'utf-8', append: bool = False):
+    """
+    Writes calculations to ``path``, streaming one row at a time.
+    A new file gets a header row; ``append=True`` only adds rows, starting
+    on a new line if the file ends mid-line (a torn row is then skipped on
+    load and dropped by the next full save).
+    """
+    new_line = append and ends_mid_line(path)
+    with open(path, 'a' if append else 'w', newline='', encoding=encoding, buffering=_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        if new_line:
+            f.write(os.linesep)
+        if not append:
+            writer.writerow(CSV_COLUMNS)
+        writer.writerows(map(calc_to_row, calcs))
+
+def read_history_csv(
+    path: Path,
+    commands: Mapping[str, Command],
+    max_rows: int,
+    encoding: str = 'utf-8',
+) -> tuple[list[Calculation], int, int]:
+    """
+    Streams a history CSV and returns ``(calculations, skipped, rows)``:
+    the newest ``max_rows`` valid calculations, the number of malformed rows
+    skipped and the number of data rows read. Raises KeyError if a column
+    is missing and csv.Error if the file cannot be parsed.
+    """
+    # Parsed rows are only turned into Calculation objects once we know
+    # they are among the newest ``max_rows``
+    kept: deque = deque(maxlen=max_rows)
+    skipped = rows = 0
+    parse_timestamp = datetime.fromisoformat
+    with open(path, newline='', encoding=encoding, buffering=_BUFFER_SIZE) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return [], 0, 0 # Empty file
+        missing = [column for column in CSV_COLUMNS if column not in header]
+        if missing:
+            raise KeyError(missing[0])
+        timestamp_i, a_i, b_i, command_i, result_i = (header.index(column) for column in CSV_COLUMNS)
+        for row in reader:
+            if not row:
+                continue # Blank lines are ignored, as in pandas
+            rows += 1
+            try:
+                a, b, result = float(row[a_i]), float(row[b_i]), float(row[result_i])
+                if a != a or b != b or result != result:
+                    raise ValueError("NaN counts as a missing value, like in pandas")
+                kept.append((a, b, commands[row[command_i]], result, parse_timestamp(row[timestamp_i])))
+            except (IndexError, KeyError, ValueError):
+                skipped += 1
+    return [Calculation(*fields) for fields in kept], skipped, rows
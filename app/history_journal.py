@@ -0,0 +1,157 @@
+"""
+Defines the undo/redo journal used by History.
+In journal mode each entry records only the change an action made,
+instead of a full snapshot of the history. Undoing or redoing an entry
+returns the store that holds the resulting history: appends are reverted
+in place, while clear and load simply swap whole stores.
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    from app.calculation import Calculation
+    from app.ring_buffer import RingBuffer
+
+class JournalEntry(ABC):
+    """Abstract base class for a reversible change to the history store."""
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """Number of calculation records held by this entry."""
+        pass # pragma: no cover
+
+    @abstractmethod
+    def undo(self, store: RingBuffer) -> RingBuffer:
+        """Reverts the change and returns the resulting store."""
+        pass # pragma: no cover
+
+    @abstractmethod
+    def redo(self, store: RingBuffer) -> RingBuffer:
+        """Re-applies the change and returns the resulting store."""
+        pass # pragma: no cover
+
+class AppendEntry(JournalEntry):
+    """A calculation was appended, possibly evicting the oldest one."""
+    def __init__(self, calc: Calculation, evicted: Optional[Calculation] = None):
+        self.calc = calc
+        self.evicted = evicted
+
+    @property
+    def size(self) -> int:
+        return 1 if self.evicted is None or self.dropped else 2
+
+    @property
+    def dropped(self) -> bool:
+        """True if a zero-capacity store rejected the calculation itself."""
+        return self.evicted is self.calc
+
+    def undo(self, store: RingBuffer) -> RingBuffer:
+        if self.dropped:
+            return store
+        store.pop()
+        if self.evicted is not None:
+            store.appendleft(self.evicted)
+        return store
+
+    def redo(self, store: RingBuffer) -> RingBuffer:
+        if self.dropped:
+            return store
+        if self.evicted is not None:
+            store.popleft()
+        store.append(self.calc)
+        return store
+
+class ExtendEntry(JournalEntry):
+    """
+    A batch of calculations was appended. Only the evicted calculations
+    that were in the history before the batch need to be kept.
+    """
+    def __init__(self, calcs: Sequence[Calculation], evicted: Sequence[Calculation], kept: int):
+        self.calcs = calcs
+        self.evicted = evicted
+        self.kept = kept # How many of the batch are still in the store
+
+    @property
+    def size(self) -> int:
+        return len(self.calcs) + len(self.evicted)
+
+    def undo(self, store: RingBuffer) -> RingBuffer:
+        for _ in range(self.kept):
+            store.pop()
+        for calc in reversed(self.evicted):
+            store.appendleft(calc)
+        return store
+
+    def redo(self, store: RingBuffer) -> RingBuffer:
+        store.extend(self.calcs)
+        return store
+
+class ReplaceEntry(JournalEntry):
+    """The whole store was swapped for another one."""
+    def __init__(self, previous: RingBuffer, current: RingBuffer):
+        self.previous = previous
+        self.current = current
+
+    @property
+    def size(self) -> int:
+        return len(self.previous)
+
+    def undo(self, store: RingBuffer) -> RingBuffer:
+        return self.previous
+
+    def redo(self, store: RingBuffer) -> RingBuffer:
+        return self.current
+
+class ClearEntry(ReplaceEntry):
+    """The history was cleared; keeps the cleared block."""
+
+class LoadEntry(ReplaceEntry):
+    """The history was replaced by a loaded block."""
+
+    @property
+    def size(self) -> int:
+        return len(self.previous) + len(self.current)
+
+class UndoStack:
+    """
+    A stack of undo (or redo) entries bounded by depth and memory budget.
+    The oldest entries are dropped first; the newest entry is always kept.
+    A limit of 0 means unbounded.
+    """
+    def __init__(self, max_depth: int = 0, memory_budget: int = 0):
+        self._entries: deque = deque()
+        self._max_depth = max_depth
+        self._memory_budget = memory_budget
+        self._records = 0
+
+    @property
+    def records(self) -> int:
+        """Number of calculation records held by journal entries."""
+        return self._records
+
+    def append(self, entry):
+        """Pushes an entry, dropping the oldest ones past the limits."""
+        self._entries.append(entry)
+        self._records += getattr(entry, 'size', 0)
+        while len(self._entries) > 1 and (
+            (self._max_depth and len(self._entries) > self._max_depth)
+            or (self._memory_budget and self._records > self._memory_budget)
+        ):
+            self._records -= getattr(self._entries.popleft(), 'size', 0)
+
+    def pop(self):
+        """Pops the newest entry."""
+        entry = self._entries.pop()
+        self._records -= getattr(entry, 'size', 0)
+        return entry
+
+    def clear(self):
+        """Removes all entries."""
+        self._entries.clear()
+        self._records = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
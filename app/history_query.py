@@ -0,0 +1,38 @@
+"""
+Defines the options of the REPL 'history' command: which records to show
+(filters) and which part of the result to show (a page or the tail).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+@dataclass(frozen=True)
+class HistoryQuery:
+    """A filtered, paged request for history records."""
+    command: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    page: int = 1
+    page_size: Optional[int] = None # None shows every matching record
+    tail: Optional[int] = None # Show only the newest N matching records
+
+    @property
+    def is_filtered(self) -> bool:
+        """Whether any filter is set."""
+        return self.command is not None or self.since is not None or self.until is not None
+
+    def window(self, total: int) -> tuple[int, int]:
+        """Returns ``(offset, limit)`` of the requested records among ``total`` matches."""
+        if self.tail is not None:
+            limit = min(self.tail, total)
+            return total - limit, limit
+        if self.page_size is None:
+            return 0, total
+        offset = (self.page - 1) * self.page_size
+        return offset, max(0, min(self.page_size, total - offset))
+
+    def page_count(self, total: int) -> int:
+        """Number of pages needed to show ``total`` matches."""
+        if self.page_size is None or self.tail is not None:
+            return 1
+        return max(1, -(-total // self.page_size))
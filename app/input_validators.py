@@ -1,8 +1,12 @@
 """
 Provides validation functions for user input.
 """
+from datetime import datetime
 from typing import Optional
 from app.exceptions import InputValidationError
+from app.history_query import HistoryQuery
+from app.expression import TableRange
+from app.reductions import REDUCTIONS
 
 class InputHelper:
     """Contains static methods for validating and parsing user input."""
@@ -30,7 +34,7 @@ class InputHelper:
             
         return value
 
-    def parse_command_input(self, user_input: str) -> tuple[str, list[float]]:
+    def parse_command_input(self, user_input: str) -> tuple[str, list]:
         """
         Parses the full REPL input string into a command and numeric operands.
         """
@@ -41,8 +45,38 @@ class InputHelper:
         command = parts[0].lower()
         args_str = parts[1:]
         
+        # 'history' keeps its options as strings for parse_history_args
+        if command == 'history':
+            return command, args_str
+
+        # 'table' keeps its arguments as strings for parse_table_args
+        if command == 'table':
+            return command, args_str
+
+        # 'eval' and 'def' take the rest of the line as one expression
+        if command in ('eval', 'def'):
+            if not args_str:
+                raise InputValidationError(f"Command '{command}' requires an expression.")
+            return command, [' '.join(args_str)]
+
+        # Reductions take one or more numbers, or '--file PATH' ('-' for stdin)
+        if command in REDUCTIONS:
+            if args_str and args_str[0] == '--file':
+                if len(args_str) != 2:
+                    raise InputValidationError(f"Usage: {command} --file <path|->")
+                return command, args_str
+            if not args_str:
+                raise InputValidationError(f"Command '{command}' requires at least 1 numeric argument.")
+            return command, [self.parse_operand(arg) for arg in args_str]
+
+        # 'stats' takes a file path, '-' for stdin or 'history'
+        if command == 'stats':
+            if len(args_str) != 1:
+                raise InputValidationError("Usage: stats <path|-|history>")
+            return command, args_str
+
         # Commands that don't need operands
-        if command in ('history', 'clear', 'undo', 'redo', 'save', 'load', 'help', 'exit'):
+        if command in ('clear', 'undo', 'redo', 'save', 'load', 'functions', 'help', 'exit'):
             if args_str:
                 raise InputValidationError(f"Command '{command}' does not take any arguments.")
             return command, []
@@ -59,4 +93,100 @@ class InputHelper:
             operands = [self.parse_operand(arg) for arg in args_str]
             return command, operands
 
-        raise InputValidationError(f"Unknown command: '{command}'")
\ No newline at end of file
+        raise InputValidationError(f"Unknown command: '{command}'")
+
+    @staticmethod
+    def _parse_count(option: str, value: str) -> int:
+        """Parses a positive integer option value."""
+        try:
+            count = int(value)
+        except ValueError:
+            count = 0
+        if count < 1:
+            raise InputValidationError(f"'{option}' expects a positive whole number, got '{value}'.")
+        return count
+
+    @staticmethod
+    def _parse_timestamp(option: str, value: str) -> datetime:
+        """Parses an ISO 8601 timestamp option value."""
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise InputValidationError(f"'{option}' expects an ISO timestamp (e.g. 2024-01-31T09:30), got '{value}'.")
+
+    def parse_history_args(self, args: list[str], default_page_size: int = 20) -> HistoryQuery:
+        """
+        Parses the options of the 'history' command:
+        ``[N] [--page P] [--tail N] [--command NAME] [--since TS] [--until TS]``.
+        A bare N sets the page size; --page without N uses ``default_page_size``.
+        """
+        options: dict = {}
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if not arg.startswith('--'):
+                if 'page_size' in options:
+                    raise InputValidationError(f"Unexpected history argument: '{arg}'")
+                options['page_size'] = self._parse_count('history', arg)
+                continue
+            if not args:
+                raise InputValidationError(f"Option '{arg}' requires a value.")
+            value = args.pop(0)
+            if arg == '--page':
+                options['page'] = self._parse_count(arg, value)
+            elif arg == '--tail':
+                options['tail'] = self._parse_count(arg, value)
+            elif arg == '--command':
+                options['command'] = value.lower()
+            elif arg in ('--since', '--until'):
+                options[arg[2:]] = self._parse_timestamp(arg, value)
+            else:
+                raise InputValidationError(f"Unknown history option: '{arg}'")
+        if 'page' in options and 'page_size' not in options:
+            options['page_size'] = default_page_size
+        if 'tail' in options and ('page' in options or 'page_size' in options):
+            raise InputValidationError("'--tail' cannot be combined with paging.")
+        return HistoryQuery(**options)
+
+    def parse_table_args(self, args: list[str], max_rows: int = 100_000) -> tuple[str, TableRange, dict[str, float]]:
+        """
+        Parses the arguments of the 'table' command:
+        ``NAME VAR=START..STOP [step S] [PARAM=VALUE ...]``.
+        Returns the function name, the range and the fixed parameter values.
+        """
+        if not args:
+            raise InputValidationError("Usage: table <function> <var>=<start>..<stop> [step <s>] [<param>=<value> ...]")
+        name, args = args[0].lower(), list(args[1:])
+        table_range: Optional[tuple[str, float, float]] = None
+        step = 1.0
+        fixed: dict[str, float] = {}
+        while args:
+            arg = args.pop(0)
+            if arg.lower() == 'step':
+                if not args:
+                    raise InputValidationError("Option 'step' requires a value.")
+                step = self.parse_operand(args.pop(0))
+                continue
+            param, separator, value = arg.partition('=')
+            param = param.lower()
+            if not separator or not param:
+                raise InputValidationError(f"Unexpected table argument: '{arg}'")
+            if param in fixed or (table_range and table_range[0] == param):
+                raise InputValidationError(f"Parameter '{param}' is given twice.")
+            if '..' in value:
+                if table_range:
+                    raise InputValidationError("Only one parameter can be given a range.")
+                start, _, stop = value.partition('..')
+                table_range = (param, self.parse_operand(start), self.parse_operand(stop))
+            else:
+                fixed[param] = self.parse_operand(value)
+        if table_range is None:
+            raise InputValidationError("Give one parameter a range, e.g. x=0..10.")
+        if step <= 0:
+            raise InputValidationError("'step' must be positive.")
+        if table_range[2] < table_range[1]:
+            raise InputValidationError("The range must not end before it starts.")
+        result = TableRange(*table_range, step)
+        if result.count > max_rows:
+            raise InputValidationError(f"The table would have {result.count} rows (limit {max_rows}).")
+        return name, result, fixed
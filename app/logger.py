@@ -1,21 +1,68 @@
 """
 Configures the Python logging module for the application.
+In 'queue' mode (the default) the 'app' logger only puts records on a
+queue; a QueueListener thread formats them and does the file I/O.
 """
+import atexit
+import copy
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 from app.calculator_config import ConfigLoader
+from app.exceptions import ConfigError
+
+LOG_MODES = ('queue', 'direct')
+
+# The listener of the 'queue' mode pipeline, if one is running
+_listener: Optional[QueueListener] = None
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that leaves formatting to the listener thread.
+    Records are queued with their message template and arguments, so
+    building the message (e.g. ``str(calculation)``) happens off the
+    calling thread. Arguments must therefore not change after logging.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks reference the caller's frames; render them now
+            record = copy.copy(record)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def stop_logging():
+    """Writes the queued records and stops the listener thread, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Registered after logging's own shutdown hook, so it runs before it
+atexit.register(stop_logging)
 
 def setup_logging(config: ConfigLoader) -> logging.Logger:
     """
     Configures and returns a logger instance.
+    Raises ConfigError for an unknown log mode or level; other failures
+    (e.g. an unwritable log file) fall back to basic logging.
     """
+    global _listener
     try:
         log_file_path = config.get_log_file_path()
-        
+        mode = config.get_setting('CALCULATOR_LOG_MODE', 'queue').lower()
+        if mode not in LOG_MODES:
+            raise ConfigError(f"Unknown log mode: '{mode}' (expected one of {', '.join(LOG_MODES)})")
+        level_name = config.get_setting('CALCULATOR_LOG_LEVEL', 'INFO').upper()
+        level = logging.getLevelName(level_name)
+        if not isinstance(level, int):
+            raise ConfigError(f"Unknown log level: '{level_name}'")
+
         # Use a name specific to the app module
         logger = logging.getLogger('app')
-        logger.setLevel(logging.INFO) # Set base level
+        logger.setLevel(level) # Set base level
 
         # Prevent logs from propagating to the root logger
         logger.propagate = False
@@ -28,11 +75,11 @@ def setup_logging(config: ConfigLoader) -> logging.Logger:
 
         # File Handler (for all info-level logs and above)
         file_handler = RotatingFileHandler(
-            log_file_path, 
-            maxBytes=10*1024*1024, # 10 MB
-            backupCount=5
+            log_file_path,
+            maxBytes=int(config.get_setting('CALCULATOR_LOG_MAX_BYTES', 10*1024*1024)), # 10 MB
+            backupCount=int(config.get_setting('CALCULATOR_LOG_BACKUP_COUNT', 5))
         )
-        file_handler.setLevel(logging.INFO)
+        file_handler.setLevel(level)
         file_format = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
@@ -40,15 +87,25 @@ def setup_logging(config: ConfigLoader) -> logging.Logger:
 
         # Add handlers only if they haven't been added before
         if not logger.handlers:
-            logger.addHandler(console_handler)
-            logger.addHandler(file_handler)
+            if mode == 'queue':
+                stop_logging()
+                records: queue.SimpleQueue = queue.SimpleQueue()
+                logger.addHandler(DeferredQueueHandler(records))
+                _listener = QueueListener(records, console_handler, file_handler, respect_handler_level=True)
+                _listener.start()
+            else:
+                logger.addHandler(console_handler)
+                logger.addHandler(file_handler)
 
-        logger.info(f"Logging configured. Log file at: {log_file_path}")
+        logger.info("Logging configured (%s mode). Log file at: %s", mode, log_file_path)
         return logger
-        
+
+    except ConfigError:
+        # Invalid settings must stop startup, not be logged and ignored
+        raise
     except Exception as e:
         # Fallback basic logging if setup fails
         logging.basicConfig(level=logging.INFO)
         logger = logging.getLogger('app')
         logger.error(f"Failed to configure logging: {e}", exc_info=True)
-        return logger
\ No newline at end of file
+        return logger
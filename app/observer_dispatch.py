@@ -0,0 +1,103 @@
+"""
+Defines the per-observer queues used for asynchronous observer dispatch.
+"""
+from __future__ import annotations
+import logging
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from app.events import Event
+    from app.observers import Observable, Observer
+
+BACKPRESSURE_POLICIES = ('block', 'drop_oldest', 'coalesce')
+
+class ObserverQueue:
+    """
+    Delivers events to one observer on its own worker thread, in the order
+    they were sent. The queue holds at most ``max_size`` events; when it is
+    full the ``policy`` decides what happens to a new one:
+
+    - 'block' waits until the worker has made room,
+    - 'drop_oldest' discards the oldest queued event,
+    - 'coalesce' replaces the newest queued event if it has the same type
+      (so bursts collapse into their latest event), and blocks otherwise.
+    """
+    def __init__(
+        self,
+        observer: Observer,
+        max_size: int = 1000,
+        policy: str = 'block',
+        logger: Optional[logging.Logger] = None,
+    ):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: '{policy}'")
+        self.observer = observer
+        self._max_size = max(1, max_size)
+        self._policy = policy
+        self._logger = logger or logging.getLogger('app')
+
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._unfinished = 0 # Queued events plus the one being delivered
+        self._closed = False
+        self.dropped = 0
+        self.coalesced = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"observer-{type(observer).__name__}", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, subject: Observable, event: Event):
+        """Queues an event, applying the backpressure policy if the queue is full."""
+        item = (subject, event)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("observer queue is closed")
+            while len(self._queue) >= self._max_size:
+                if self._policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self._unfinished -= 1
+                    self.dropped += 1
+                elif self._policy == 'coalesce' and type(self._queue[-1][1]) is type(event):
+                    self._queue[-1] = item
+                    self.coalesced += 1
+                    return
+                else:
+                    self._cond.wait()
+            self._queue.append(item)
+            self._unfinished += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return # Closed and drained
+                item = self._queue.popleft()
+                self._cond.notify_all() # Wake producers waiting for room
+            try:
+                self.observer.update(*item)
+            except Exception as e:
+                # A failing observer must not stop delivery to it
+                self._logger.error(f"Observer {type(self.observer).__name__} failed: {e}", exc_info=True)
+            with self._cond:
+                self._unfinished -= 1
+                self._cond.notify_all()
+
+    def flush(self):
+        """Waits until every queued event has been delivered."""
+        with self._cond:
+            while self._unfinished:
+                self._cond.wait()
+
+    def close(self):
+        """Delivers the remaining events and stops the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
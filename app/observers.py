@@ -4,9 +4,12 @@ Defines the Observer Design Pattern components.
 from __future__ import annotations
 import logging
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Protocol
+from typing import TYPE_CHECKING, ClassVar, Iterable, Optional, Protocol
+from app.autosave_worker import AutoSaveWorker
+from app.events import (
+    BatchPerformed, CalculationPerformed, ErrorOccurred, Event, HistoryChanged, HistorySaved,
+)
 from app.exceptions import HistoryError
-from app.calculation import Calculation
 
 if TYPE_CHECKING:
     from app.calculation import Calculation
@@ -17,25 +20,29 @@ if TYPE_CHECKING:
 class Observable(Protocol):
     """Protocol for the Subject (Observable) side of the pattern."""
     
-    def attach(self, observer: Observer):
-        """Attach an observer."""
+    def attach(self, observer: Observer, events: Optional[Iterable[type[Event]]] = None):
+        """Attach an observer for the given event types (default: its subscriptions)."""
         ... # pragma: no cover
 
     def detach(self, observer: Observer):
         """Detach an observer."""
         ... # pragma: no cover
 
-    def notify(self, event: str, data: any = None):
-        """Notify all observers about an event."""
+    def notify(self, event: Event):
+        """Notify the observers subscribed to the event's type."""
         ... # pragma: no cover
 
 # --- Observer Interface ---
 class Observer(ABC):
     """
     The Observer abstract base class.
+    ``subscriptions`` lists the event types the observer is attached for
+    by default; the subject only calls it for events of those types.
     """
+    subscriptions: ClassVar[tuple[type[Event], ...]] = (Event,)
+
     @abstractmethod
-    def update(self, subject: Observable, event: str, data: any = None):
+    def update(self, subject: Observable, event: Event):
         """
         Receive update from subject.
         """
@@ -46,41 +53,112 @@ class Observer(ABC):
 class LoggingObserver(Observer):
     """
     An observer that logs events, especially new calculations.
+    Errors are logged as warnings, everything else as info. The event is
+    passed as a logging argument, so its message is only built if the
+    record is emitted (on the listener thread with queued logging).
     """
     def __init__(self, logger: logging.Logger):
         self._logger = logger
 
-    def update(self, subject: Observable, event: str, data: any = None):
+    def update(self, subject: Observable, event: Event):
         """Logs the event."""
-        if event == "calculation_performed" and isinstance(data, Calculation):
-            self._logger.info(f"New Calculation: {data}")
-        elif event == "error_occurred" and isinstance(data, Exception):
-            self._logger.warning(f"Operation Error: {data}")
-        elif event == "history_cleared":
-            self._logger.info("Calculation history cleared.")
-        elif event == "history_loaded":
-            self._logger.info("Calculation history loaded from file.")
-        elif event == "history_saved":
-            self._logger.info("Calculation history saved to file.")
-        elif event == "undo":
-            self._logger.info("Undo operation performed.")
-        elif event == "redo":
-            self._logger.info("Redo operation performed.")
+        if isinstance(event, ErrorOccurred):
+            self._logger.warning("%s", event)
+        else:
+            self._logger.info("%s", event)
 
 class AutoSaveObserver(Observer):
     """
     An observer that auto-saves the history to CSV.
+    In incremental mode a new calculation is appended as a single row;
+    only structural changes (undo, redo, clear, load) rewrite the file.
+    Rows of evicted calculations are left at the top of the file until
+    they outnumber the max history size, then the file is compacted.
+    With ``write_behind`` the writes happen on a background worker.
     """
-    def __init__(self, history_manager: History):
+    def __init__(
+        self,
+        history_manager: History,
+        incremental: bool = False,
+        write_behind: bool = False,
+        flush_interval: float = 1.0,
+        max_pending: int = 100,
+        logger: Optional[logging.Logger] = None,
+    ):
         self._history_manager = history_manager
+        self._incremental = incremental
+        self._logger = logger or logging.getLogger('app')
+        # Whether the file mirrors the history, apart from stale leading rows
+        self._in_sync = False
+        self._stale_rows = 0
+        self._evictions_seen = history_manager.eviction_count
+        self._worker: Optional[AutoSaveWorker] = None
+        if write_behind:
+            self._worker = AutoSaveWorker(
+                history_manager, flush_interval, max_pending, self._logger, on_error=self._mark_unsynced
+            )
+
+    # Only events that modify the history, plus manual saves
+    subscriptions = (HistoryChanged, HistorySaved)
 
-    def update(self, subject: Observable, event: str, data: any = None):
+    def update(self, subject: Observable, event: Event):
         """Saves history on relevant events."""
-        # We only care about events that modify the history
-        if event in ("calculation_performed", "history_loaded", "undo", "redo"):
-            try:
-                self._history_manager.save_history_to_csv()
-            except HistoryError as e:
-                # We should not crash the app if auto-save fails
-                # Log this error (ideally using the logger, but print for safety)
-                print(f"[AutoSave Error] Failed to auto-save history: {e}") # pragma: no cover
\ No newline at end of file
+        if isinstance(event, HistorySaved):
+            # A manual save just rewrote the whole file
+            self._mark_synced()
+            return
+        if not isinstance(event, HistoryChanged):
+            return
+
+        try:
+            if isinstance(event, CalculationPerformed) and self._incremental and self._in_sync:
+                self._append([event.calculation])
+            elif isinstance(event, BatchPerformed) and self._incremental and self._in_sync:
+                self._append(event.batch.calculations)
+            else:
+                self._rewrite()
+        except HistoryError as e:
+            # We should not crash the app if auto-save fails
+            self._mark_unsynced()
+            self._logger.error(f"Failed to auto-save history: {e}")
+
+    def flush(self):
+        """Writes any changes still queued by the write-behind worker."""
+        if self._worker:
+            self._worker.flush()
+
+    def close(self):
+        """Stops the write-behind worker after a final flush."""
+        if self._worker:
+            self._worker.close()
+            self._worker = None
+
+    def _mark_synced(self):
+        """Records that the file now matches the history exactly."""
+        self._in_sync = True
+        self._stale_rows = 0
+        self._evictions_seen = self._history_manager.eviction_count
+
+    def _mark_unsynced(self):
+        """Forces the next save to rewrite the whole file."""
+        self._in_sync = False
+
+    def _rewrite(self):
+        """Rewrites the whole file from the current history."""
+        if self._worker:
+            self._worker.submit_rewrite(self._history_manager.snapshot())
+        else:
+            self._history_manager.save_history_to_csv()
+        self._mark_synced()
+
+    def _append(self, calcs: list[Calculation]):
+        """Appends new rows, compacting the file once stale rows pile up."""
+        evictions = self._history_manager.eviction_count
+        self._stale_rows += evictions - self._evictions_seen
+        self._evictions_seen = evictions
+        if self._stale_rows > self._history_manager.max_history_size:
+            self._rewrite()
+        elif self._worker:
+            self._worker.submit_append(calcs)
+        else:
+            self._history_manager.append_to_csv(calcs)
@@ -1,10 +1,52 @@
 """
 Defines arithmetic operations using the Factory Pattern.
+NumPy is only imported by the array kernels, so the scalar path starts fast.
 """
+from __future__ import annotations
 import math
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
 from app.exceptions import OperationError
 
+if TYPE_CHECKING:
+    import numpy as np
+
+def _nonzero_divisor(a: np.ndarray, b: np.ndarray, kernel) -> tuple[np.ndarray, np.ndarray]:
+    """Applies a division-like kernel, flagging elements where b == 0."""
+    import numpy as np
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    errors = b == 0
+    with np.errstate(all='ignore'):
+        results = kernel(a, np.where(errors, 1.0, b))
+    results[errors] = np.nan
+    return results, errors
+
+def _pow_array(a: np.ndarray, exponent: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Element-wise power with the error rules of ``PowerCommand.execute``:
+    a finite negative base with a finite non-integer exponent, zero to a
+    finite negative power, or an overflow of finite inputs. Values match
+    ``math.pow`` to within 1 ULP (NumPy's SIMD pow rounds differently).
+    """
+    import numpy as np
+    a, exponent = np.asarray(a, dtype=np.float64), np.asarray(exponent, dtype=np.float64)
+    with np.errstate(all='ignore'):
+        finite = np.isfinite(a) & np.isfinite(exponent)
+        errors = finite & (
+            ((a < 0) & (np.floor(exponent) != exponent))
+            | ((a == 0) & (exponent < 0))
+        )
+        results = np.power(np.where(errors, 1.0, a), np.where(errors, 1.0, exponent))
+    errors |= np.isinf(results) & finite
+    results[errors] = np.nan
+    return results, errors
+
+def _elementwise(kernel, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Applies a kernel that cannot fail; overflows give inf, as with Python floats."""
+    import numpy as np
+    with np.errstate(all='ignore'):
+        return kernel(a, b), np.zeros(len(a), dtype=bool)
+
 class Command(ABC):
     """Abstract base class for all commands."""
     
@@ -12,6 +54,25 @@ class Command(ABC):
     def execute(self, a: float, b: float) -> float:
         """Executes the command with two operands."""
         pass # pragma: no cover
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Executes the command element-wise over two operand arrays.
+        Returns the results and a boolean mask of elements that failed
+        (their result is NaN) instead of raising OperationError.
+        This fallback calls ``execute`` per element; subclasses override it
+        with vectorized kernels.
+        """
+        import numpy as np
+        results = np.empty(len(a), dtype=np.float64)
+        errors = np.zeros(len(a), dtype=bool)
+        for i, (x, y) in enumerate(zip(np.asarray(a).tolist(), np.asarray(b).tolist())):
+            try:
+                results[i] = self.execute(x, y)
+            except OperationError:
+                results[i] = np.nan
+                errors[i] = True
+        return results, errors
     
     @property
     @abstractmethod
@@ -22,6 +83,13 @@ class Command(ABC):
     def __eq__(self, other):
         """Commands are equal if they are of the same type."""
         return isinstance(other, self.__class__)
+
+    def __copy__(self):
+        """Commands are stateless flyweights: copies share the instance."""
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
     # --- END OF ADDITION ---
 # --- Core Operations ---
 
@@ -33,6 +101,10 @@ class AddCommand(Command):
     def execute(self, a: float, b: float) -> float:
         return a + b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _elementwise(np.add, a, b)
+
 class SubtractCommand(Command):
     """Subtracts the second number from the first."""
     @property
@@ -41,6 +113,10 @@ class SubtractCommand(Command):
     def execute(self, a: float, b: float) -> float:
         return a - b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _elementwise(np.subtract, a, b)
+
 class MultiplyCommand(Command):
     """Multiplies two numbers."""
     @property
@@ -49,6 +125,10 @@ class MultiplyCommand(Command):
     def execute(self, a: float, b: float) -> float:
         return a * b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _elementwise(np.multiply, a, b)
+
 class DivideCommand(Command):
     """Divides the first number by the second."""
     @property
@@ -59,6 +139,10 @@ class DivideCommand(Command):
             raise OperationError("Cannot divide by zero.")
         return a / b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _nonzero_divisor(a, b, np.true_divide)
+
 # --- New Mandatory Operations ---
 
 class PowerCommand(Command):
@@ -69,10 +153,13 @@ class PowerCommand(Command):
     def execute(self, a: float, b: float) -> float:
         try:
             return math.pow(a, b)
-        except ValueError as e:
-            # Handle cases like math.pow(-1, 0.5)
+        except (ValueError, OverflowError) as e:
+            # Handle cases like math.pow(-1, 0.5) or math.pow(10, 400)
             raise OperationError(f"Math error during power operation: {e}")
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return _pow_array(a, b)
+
 class RootCommand(Command):
     """Calculates the nth root of a number (a = number, b = root)."""
     @property
@@ -86,8 +173,18 @@ class RootCommand(Command):
         try:
             # b-th root of a is a^(1/b)
             return math.pow(a, 1/b)
-        except ValueError as e:
-            raise OperationError(f"Math error during root operation: {e}") # pragma: no cover
+        except (ValueError, OverflowError) as e:
+            raise OperationError(f"Math error during root operation: {e}")
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        with np.errstate(all='ignore'):
+            invalid = (b == 0) | ((a < 0) & (np.mod(b, 2) == 0))
+            results, errors = _pow_array(a, 1 / np.where(invalid, 1.0, b))
+        errors |= invalid
+        results[errors] = np.nan
+        return results, errors
 
 class ModulusCommand(Command):
     """Computes the remainder of a division."""
@@ -99,6 +196,11 @@ class ModulusCommand(Command):
             raise OperationError("Cannot perform modulus by zero.")
         return a % b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        # np.mod follows Python's sign rules for %
+        return _nonzero_divisor(a, b, np.mod)
+
 class IntDivideCommand(Command):
     """Performs integer division."""
     @property
@@ -109,6 +211,10 @@ class IntDivideCommand(Command):
             raise OperationError("Cannot perform integer division by zero.")
         return a // b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _nonzero_divisor(a, b, np.floor_divide)
+
 class PercentageCommand(Command):
     """Calculates the percentage of one number with respect to another (a / b) * 100."""
     @property
@@ -119,6 +225,10 @@ class PercentageCommand(Command):
             raise OperationError("Cannot calculate percentage with respect to zero.")
         return (a / b) * 100
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _nonzero_divisor(a, b, lambda x, y: np.true_divide(x, y) * 100)
+
 class AbsDiffCommand(Command):
     """Calculates the absolute difference between two numbers."""
     @property
@@ -127,6 +237,26 @@ class AbsDiffCommand(Command):
     def execute(self, a: float, b: float) -> float:
         return abs(a - b)
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import numpy as np
+        return _elementwise(lambda x, y: np.abs(np.subtract(x, y)), a, b)
+
+class MinCommand(Command):
+    """Returns the smaller of two numbers (the final step of the 'min' reduction)."""
+    @property
+    def name(self) -> str: return "min"
+
+    def execute(self, a: float, b: float) -> float:
+        return min(a, b)
+
+class MaxCommand(Command):
+    """Returns the larger of two numbers (the final step of the 'max' reduction)."""
+    @property
+    def name(self) -> str: return "max"
+
+    def execute(self, a: float, b: float) -> float:
+        return max(a, b)
+
 # --- Factory ---
 
 class CommandFactory:
@@ -144,6 +274,9 @@ class CommandFactory:
                 PercentageCommand(), AbsDiffCommand()
             ]
         }
+        # Final steps of the min/max reductions: recorded in the history, so
+        # loaders must know them, but not offered as two-operand commands
+        self._reduction_steps = {cmd.name: cmd for cmd in [MinCommand(), MaxCommand()]}
 
     def get_command(self, command_name: str) -> Command:
         """
@@ -156,4 +289,18 @@ class CommandFactory:
 
     def get_available_commands(self) -> list[str]:
         """Returns a list of all registered command names."""
-        return list(self._commands.keys())
\ No newline at end of file
+        return list(self._commands.keys())
+
+    def get_recorded_command(self, command_name: str) -> Command:
+        """
+        Retrieves any command a history record can name: the two-operand
+        commands and the final steps of the reductions.
+        """
+        command = self._commands.get(command_name) or self._reduction_steps.get(command_name)
+        if not command:
+            raise OperationError(f"Unknown command: '{command_name}'")
+        return command
+
+    def get_command_table(self) -> dict[str, Command]:
+        """Maps every command name a history record can use to its shared Command instance."""
+        return {**self._commands, **self._reduction_steps}
\ No newline at end of file
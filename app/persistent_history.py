@@ -0,0 +1,98 @@
+"""
+Defines an immutable, structurally shared sequence of calculations.
+Used by History and CalculatorMemento so that snapshots cost O(1).
+"""
+from __future__ import annotations
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from app.calculation import Calculation
+
+# Dead entries at the front of a shared log are only dropped once there are
+# at least this many of them (and more than there are live entries).
+_COMPACT_MIN = 32
+
+class PersistentHistory(Sequence):
+    """
+    An immutable window ``[start, end)`` over an append-only log.
+    Appending to the newest version extends the shared log in place, so
+    older versions keep seeing exactly the entries they were created with.
+    """
+    __slots__ = ('_log', '_start', '_end')
+
+    def __init__(self, items: Iterable[Calculation] = ()):
+        self._log: list[Calculation] = list(items)
+        self._start = 0
+        self._end = len(self._log)
+
+    @classmethod
+    def _window(cls, log: list[Calculation], start: int, end: int) -> PersistentHistory:
+        """Creates a version that shares an existing log."""
+        version = cls.__new__(cls)
+        version._log = log
+        version._start = start
+        version._end = end
+        return version
+
+    def append(self, calc: Calculation, max_size: Optional[int] = None) -> PersistentHistory:
+        """
+        Returns a new version with ``calc`` added at the end.
+        If ``max_size`` is given, the oldest entries are evicted to respect it.
+        """
+        return self.extend((calc,), max_size)
+
+    def extend(self, calcs: Iterable[Calculation], max_size: Optional[int] = None) -> PersistentHistory:
+        """Returns a new version with all of ``calcs`` added at the end."""
+        log, start, end = self._log, self._start, self._end
+        if end != len(log):
+            # Another version already extended this log: fork off a private copy
+            log = log[start:end]
+            start, end = 0, len(log)
+        log.extend(calcs)
+        end = len(log)
+
+        if max_size is not None and end - start > max_size:
+            start = end - max_size
+
+        # Drop evicted entries once they outweigh the live ones (amortized O(1))
+        if start >= _COMPACT_MIN and start > end - start:
+            log = log[start:end]
+            start, end = 0, len(log)
+
+        return PersistentHistory._window(log, start, end)
+
+    def cleared(self) -> PersistentHistory:
+        """Returns an empty version."""
+        return PersistentHistory()
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            return PersistentHistory._window(self._log, self._start + start, self._start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._log[self._start + index]
+
+    def __iter__(self) -> Iterator[Calculation]:
+        log = self._log
+        for i in range(self._start, self._end):
+            yield log[i]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"PersistentHistory({list(self)!r})"
@@ -0,0 +1,152 @@
+"""
+Defines the n-ary reductions (sum, product, min, max, mean) and the
+readers that feed them numbers in chunks. Values are reduced one NumPy
+chunk at a time, so a file or stream of numbers is never held in memory.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+from app.exceptions import InputValidationError, OperationError
+
+if TYPE_CHECKING:
+    import numpy as np
+
+REDUCTIONS = ('sum', 'product', 'min', 'max', 'mean')
+
+@dataclass(frozen=True)
+class ReductionResult:
+    """
+    The outcome of a reduction. Its final step is also given as a
+    two-operand calculation, ``command(operand_a, operand_b) == value``
+    (up to rounding), which is what history records.
+    """
+    name: str
+    count: int
+    value: float
+    command: str
+    operand_a: float
+    operand_b: float
+
+def chunk_values(values: Iterable[float], chunk_size: int = 65536) -> Iterator[np.ndarray]:
+    """Groups an iterable of numbers into float64 arrays of up to ``chunk_size`` values."""
+    import numpy as np
+    chunk: list[float] = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= chunk_size:
+            yield np.array(chunk, dtype=np.float64)
+            chunk = []
+    if chunk:
+        yield np.array(chunk, dtype=np.float64)
+
+def _to_array(tokens: list[str]) -> np.ndarray:
+    import numpy as np
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        bad = next(token for token in tokens if not _is_number(token))
+        raise InputValidationError(f"Invalid input: '{bad}' is not a valid number.")
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+def read_numbers(stream: TextIO, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+    """
+    Reads numbers separated by whitespace or commas from a text stream,
+    yielding arrays of about ``chunk_size`` values. The stream is read in
+    blocks, so neither long files nor long lines are loaded at once.
+    """
+    block_size = max(chunk_size * 16, 4096) # ~16 characters per number
+    tail = ''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        tokens = (tail + block).replace(',', ' ').split()
+        # The last token may continue in the next block
+        tail = '' if block[-1].isspace() or block[-1] == ',' else tokens.pop() if tokens else ''
+        if tokens:
+            yield _to_array(tokens)
+    if tail:
+        yield _to_array([tail])
+
+class _CompensatedSum:
+    """A Neumaier (improved Kahan) running sum of floats."""
+    __slots__ = ('total', 'compensation')
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value: float):
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+
+    @property
+    def value(self) -> float:
+        return self.total + self.compensation
+
+def reduce_chunks(name: str, chunks: Iterable[np.ndarray]) -> ReductionResult:
+    """
+    Reduces chunks of numbers with the named reduction in a single pass.
+    Sums use NumPy's pairwise summation within a chunk and a compensated
+    sum across chunks. The last value is kept apart from the others so the
+    final step can be reported as a two-operand calculation.
+    """
+    import numpy as np
+    if name not in REDUCTIONS:
+        raise OperationError(f"Unknown reduction: '{name}'")
+    count = 0
+    last = 0.0
+    running = _CompensatedSum() # sum and mean
+    before = 1.0 if name == 'product' else None # Reduction of all values but the last
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if not np.isfinite(chunk).all():
+            raise InputValidationError("Input contains a value that is not a finite number.")
+        head, value = chunk[:-1], float(chunk[-1])
+        if name in ('sum', 'mean'):
+            running.add(float(np.sum(head)))
+            if name == 'sum':
+                before = running.value
+            running.add(value)
+        elif name == 'product':
+            before *= float(np.prod(np.append(head, last))) if count else float(np.prod(head))
+        else:
+            reduce = np.min if name == 'min' else np.max
+            candidates = head if not count else np.append(head, last)
+            if len(candidates):
+                partial = float(reduce(candidates))
+                before = partial if before is None else float(reduce([before, partial]))
+        last = value
+        count += len(chunk)
+    if not count:
+        raise OperationError(f"'{name}' needs at least one number.")
+
+    if name == 'sum':
+        return _checked(ReductionResult(name, count, running.value, 'add', before, last))
+    if name == 'mean':
+        total = running.value
+        return _checked(ReductionResult(name, count, total / count, 'divide', total, float(count)))
+    if name == 'product':
+        return _checked(ReductionResult(name, count, before * last, 'multiply', before, last))
+    if before is None:
+        before = last # A single value is its own min and max
+    value = min(before, last) if name == 'min' else max(before, last)
+    return ReductionResult(name, count, value, name, before, last)
+
+def _checked(outcome: ReductionResult) -> ReductionResult:
+    """Rejects sums and products that overflowed."""
+    if not all(map(math.isfinite, (outcome.value, outcome.operand_a, outcome.operand_b))):
+        raise OperationError(f"The {outcome.name} of these numbers is out of range.")
+    return outcome
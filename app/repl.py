@@ -1,23 +1,17 @@
 """
 The Read-Eval-Print Loop (REPL) for the command-line interface.
 Implements color output (Optional Feature) and dynamic help (Optional Feature).
+colorama is only imported the first time colored output is needed.
 """
 import sys
-from typing import Callable, Dict, Optional
-
-# --- DEBUG: Make sure colorama is imported ---
-try:
-    from colorama import init, Fore, Style
-    init(autoreset=True) # Initialize colorama
-except ImportError:
-    print("REPL Error: colorama not found!")
-    sys.exit(1)
-# --- END DEBUG ---
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
 
 from app.calculator import Calculator
 from app.calculator_config import ConfigLoader
 from app.input_validators import InputHelper
-from app.exceptions import CalculatorError
+from app.exceptions import CalculatorError, InputValidationError
 
 # --- Dynamic Help / Command Decorator ---
 repl_commands: Dict[str, 'REPLCommand'] = {}
@@ -39,20 +33,76 @@ def register_command(description: str, usage: Optional[str] = None):
         return func
     return decorator
 
+_colorama_ready = False
+
+def _color_codes() -> Dict[str, str]:
+    """Imports and initializes colorama on first use; empty if it is missing."""
+    global _colorama_ready
+    try:
+        from colorama import init, Fore, Style
+    except ImportError:
+        print("REPL Error: colorama not found! Colors are disabled.")
+        return {}
+    if not _colorama_ready:
+        init(autoreset=True) # Initialize colorama
+        _colorama_ready = True
+    return {
+        'red': Fore.RED, 'green': Fore.GREEN, 'yellow': Fore.YELLOW,
+        'cyan': Fore.CYAN, 'magenta': Fore.MAGENTA,
+        'bright': Style.BRIGHT, 'reset': Style.RESET_ALL,
+    }
+
+class Palette:
+    """The color codes used for REPL output; all empty when colors are off."""
+    def __init__(self, enabled: bool = True):
+        codes = _color_codes() if enabled else {}
+        self.red = codes.get('red', '')
+        self.green = codes.get('green', '')
+        self.yellow = codes.get('yellow', '')
+        self.cyan = codes.get('cyan', '')
+        self.magenta = codes.get('magenta', '')
+        self.bright = codes.get('bright', '')
+        self.reset = codes.get('reset', '')
+
+@dataclass
+class ScriptReport:
+    """Summary of a non-interactive batch run."""
+    commands: int
+    errors: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Commands executed per second."""
+        return self.commands / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def __str__(self) -> str:
+        return (
+            f"Processed {self.commands} commands ({self.errors} failed) "
+            f"in {self.elapsed:.3f}s ({self.throughput:.0f} commands/s)."
+        )
+
 class REPL:
     """
     Manages the REPL, parsing input and calling the Calculator.
     Uses 'colorama' for color-coded output.
     """
+    # Batch output is written in chunks of this many lines
+    BATCH_FLUSH_LINES = 1000
+
     def __init__(self, calculator: Calculator, config: ConfigLoader):
         # init(autoreset=True) # Moved to top
         self.calculator = calculator
         self.config = config
+        self._colors: Optional[Palette] = None # Created on first colored output
+        self._write: Callable[[str], None] = print
         
         max_val = float(config.get_setting('CALCULATOR_MAX_INPUT_VALUE', 1e9))
         self.input_helper = InputHelper(max_value=max_val, min_value=-max_val)
         
         self.precision = int(config.get_setting('CALCULATOR_PRECISION', 4))
+        self.page_size = int(config.get_setting('CALCULATOR_HISTORY_PAGE_SIZE', 20))
+        self.table_max_rows = int(config.get_setting('CALCULATOR_TABLE_MAX_ROWS', 100_000))
         
         self.is_running = True
 
@@ -62,43 +112,109 @@ class REPL:
             return str(int(value))
         return f"{value:.{self.precision}f}"
 
+    @property
+    def colors(self) -> Palette:
+        """The palette for colored output, loading colorama on first use."""
+        if self._colors is None:
+            self._colors = Palette()
+        return self._colors
+
+    @colors.setter
+    def colors(self, palette: Palette):
+        self._colors = palette
+
+    def _say(self, text: str, color: str = ''):
+        """Writes one line of output, optionally colored."""
+        if color:
+            text = f"{color}{text}{self.colors.reset}"
+        self._write(text)
+
+    def _dispatch(self, raw_input: str):
+        """Parses one line of REPL syntax and runs its handler."""
+        command_name, operands = self.input_helper.parse_command_input(raw_input)
+
+        handler = repl_commands.get(command_name)
+        if handler:
+            handler.func(self, *operands)
+        else:
+            self._say(f"Unknown command: '{command_name}'", self.colors.red) # pragma: no cover
+
     def run(self):
         """Starts the main REPL loop."""
+        c = self.colors
         
         # --- DEBUG CHECKPOINT 10 ---
-        print(f"{Fore.GREEN}--- CHECKPOINT 10: REPL.run() started. ---{Style.RESET_ALL}")
-        print(f"{Fore.GREEN}Welcome to the Advanced Calculator!{Style.RESET_ALL}")
-        print(f"Type '{Fore.CYAN}help{Style.RESET_ALL}' for a list of commands.")
+        print(f"{c.green}--- CHECKPOINT 10: REPL.run() started. ---{c.reset}")
+        print(f"{c.green}Welcome to the Advanced Calculator!{c.reset}")
+        print(f"Type '{c.cyan}help{c.reset}' for a list of commands.")
         
         while self.is_running:
             try:
-                raw_input = input(f"{Fore.YELLOW}>>> {Style.RESET_ALL}").strip()
+                raw_input = input(f"{c.yellow}>>> {c.reset}").strip()
                 if not raw_input:
                     continue
                 
-                command_name, operands = self.input_helper.parse_command_input(raw_input)
-                
-                handler = repl_commands.get(command_name)
-                if handler:
-                    handler.func(self, *operands)
-                else:
-                    print(f"{Fore.RED}Unknown command: '{command_name}'") # pragma: no cover
+                self._dispatch(raw_input)
 
             except CalculatorError as e:
-                print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
+                self._say(f"Error: {e}", c.red)
             except (EOFError, KeyboardInterrupt):
                 self.is_running = False # pragma: no cover
             except Exception as e:
-                print(f"{Fore.RED}An unexpected application error occurred: {e}{Style.RESET_ALL}")
+                self._say(f"An unexpected application error occurred: {e}", c.red)
                 import logging # pragma: no cover
                 logging.getLogger('app').critical(f"REPL Error: {e}", exc_info=True) # pragma: no cover
 
+    def run_batch(self, lines: Iterable[str], out: Optional[TextIO] = None) -> ScriptReport:
+        """
+        Runs REPL-syntax commands from an iterable of lines without prompts
+        or colors. Output is buffered and written to ``out`` in chunks.
+        Blank lines and lines starting with '#' are skipped.
+        """
+        out = out or sys.stdout
+        buffer: List[str] = []
+
+        def write(text: str):
+            buffer.append(text)
+            if len(buffer) >= self.BATCH_FLUSH_LINES:
+                out.write("\n".join(buffer) + "\n")
+                buffer.clear()
+
+        colors, self._colors = self._colors, Palette(enabled=False)
+        self._write = write
+        commands = errors = 0
+        start = time.perf_counter()
+        try:
+            for line_number, line in enumerate(lines, start=1):
+                raw_input = line.strip()
+                if not raw_input or raw_input.startswith('#'):
+                    continue
+                commands += 1
+                try:
+                    self._dispatch(raw_input)
+                except CalculatorError as e:
+                    errors += 1
+                    write(f"Line {line_number}: Error: {e}")
+                except Exception as e:
+                    errors += 1
+                    write(f"Line {line_number}: An unexpected application error occurred: {e}")
+                    import logging
+                    logging.getLogger('app').critical(f"Batch Error: {e}", exc_info=True)
+                if not self.is_running:
+                    break
+        finally:
+            if buffer:
+                out.write("\n".join(buffer) + "\n")
+            out.flush()
+            self._colors, self._write = colors, print
+        return ScriptReport(commands, errors, time.perf_counter() - start)
+
     # --- REPL Command Handlers ---
     
     def _handle_arithmetic(self, command_name: str, a: float, b: float):
         result = self.calculator.execute_command(command_name, a, b)
         formatted_result = self._format_result(result)
-        print(f"{Fore.CYAN}Result: {formatted_result}{Style.RESET_ALL}")
+        self._say(f"Result: {formatted_result}", self.colors.cyan)
 
     @register_command("Adds two numbers.", "add <a> <b>")
     def add(self, a: float, b: float):
@@ -140,47 +256,169 @@ class REPL:
     def abs_diff(self, a: float, b: float):
         self._handle_arithmetic('abs_diff', a, b)
 
-    @register_command("Displays the calculation history.")
-    def history(self):
-        history = self.calculator.get_history()
-        if not history:
-            print(f"{Fore.MAGENTA}History is empty.{Style.RESET_ALL}")
+    @staticmethod
+    def _read_numbers(path: str, func: Callable):
+        """Calls ``func`` with a text stream of the file at ``path`` ('-' for stdin)."""
+        if path == '-':
+            return func(sys.stdin)
+        try:
+            stream = open(path, encoding='utf-8')
+        except OSError as e:
+            raise InputValidationError(f"Cannot read '{path}': {e.strerror}")
+        with stream:
+            return func(stream)
+
+    def _handle_reduction(self, name: str, args: tuple):
+        if args and args[0] == '--file':
+            result = self._read_numbers(args[1], lambda stream: self.calculator.reduce(name, stream))
+        else:
+            result = self.calculator.reduce(name, args)
+        self._say(f"Result: {self._format_result(result)}", self.colors.cyan)
+
+    @register_command("Adds any number of values.", "sum <x1> <x2> ... | sum --file <path|->")
+    def sum(self, *args):
+        self._handle_reduction('sum', args)
+
+    @register_command("Multiplies any number of values.", "product <x1> <x2> ... | product --file <path|->")
+    def product(self, *args):
+        self._handle_reduction('product', args)
+
+    @register_command("Finds the smallest of any number of values.", "min <x1> <x2> ... | min --file <path|->")
+    def min(self, *args):
+        self._handle_reduction('min', args)
+
+    @register_command("Finds the largest of any number of values.", "max <x1> <x2> ... | max --file <path|->")
+    def max(self, *args):
+        self._handle_reduction('max', args)
+
+    @register_command("Averages any number of values.", "mean <x1> <x2> ... | mean --file <path|->")
+    def mean(self, *args):
+        self._handle_reduction('mean', args)
+
+    @register_command(
+        "Shows count, mean, variance, min/max and approximate quantiles of a file, stdin or the history results.",
+        "stats <path|-|history>",
+    )
+    def stats(self, source: str):
+        if source.lower() == 'history':
+            summary = self.calculator.describe_history()
+            title = "history results"
+        else:
+            summary = self._read_numbers(source, self.calculator.describe)
+            title = "stdin" if source == '-' else source
+        fmt = self._format_result
+        lines = [
+            f"--- Statistics of {title} ---",
+            f"  count     {summary.count}",
+            f"  mean      {fmt(summary.mean)}",
+            f"  variance  {fmt(summary.variance)}",
+            f"  stdev     {fmt(summary.stdev)}",
+            f"  min       {fmt(summary.minimum)}",
+            f"  max       {fmt(summary.maximum)}",
+        ]
+        lines.extend(
+            f"  p{q * 100:<8g}~{fmt(value)}" for q, value in summary.quantiles.items()
+        )
+        lines.append(f"  (quantiles within {summary.relative_accuracy:.0%} relative error)")
+        self._say("\n".join(lines), self.colors.magenta)
+
+    @register_command(
+        "Evaluates an infix expression (+ - * / // % ^, parentheses, e.g. root(27, 3)).",
+        "eval <expression>",
+    )
+    def eval(self, expression: str):
+        result = self.calculator.evaluate_expression(expression)
+        self._say(f"Result: {self._format_result(result)}", self.colors.cyan)
+
+    @register_command("Defines a function usable in 'eval' and 'table'.", "def <name>(<params>) = <expression>")
+    def def_handler(self, definition: str):
+        function = self.calculator.define_function(definition)
+        self._say(f"Defined {function}", self.colors.green)
+
+    @register_command("Lists the user-defined functions.")
+    def functions(self):
+        functions = self.calculator.get_functions()
+        if not functions:
+            self._say("No functions defined.", self.colors.magenta)
             return
-        
-        print(f"{Fore.MAGENTA}--- Calculation History ---{Style.RESET_ALL}")
-        for record in history:
-            print(f"{Fore.MAGENTA}  {record}{Style.RESET_ALL}")
+        self._say("\n".join(["--- Functions ---"] + [f"  {function}" for function in functions]), self.colors.magenta)
+
+    @register_command(
+        "Tabulates a function over a range in one vectorized pass; fix other parameters with p=value.",
+        "table <name> <var>=<start>..<stop> [step <s>]",
+    )
+    def table(self, *args: str):
+        name, table_range, fixed = self.input_helper.parse_table_args(args, self.table_max_rows)
+        values, results, errors = self.calculator.tabulate(name, table_range, fixed)
+        header = f"{table_range.variable:>12} | {name}"
+        lines = [header, "-" * len(header)]
+        lines.extend(
+            f"{self._format_result(x):>12} | {'error' if failed else self._format_result(y)}"
+            for x, y, failed in zip(values.tolist(), results.tolist(), errors.tolist())
+        )
+        # The whole table is rendered with a single write
+        self._say("\n".join(lines), self.colors.cyan)
+
+    @register_command(
+        "Displays the history; filter with --command NAME, --since/--until ISO-TIME.",
+        "history [N] [--page P] [--tail N]",
+    )
+    def history(self, *args: str):
+        query = self.input_helper.parse_history_args(args, self.page_size)
+        total = self.calculator.count_history(query.command, query.since, query.until)
+        if not total:
+            self._say("No matching calculations." if query.is_filtered else "History is empty.", self.colors.magenta)
+            return
+
+        offset, limit = query.window(total)
+        pages = query.page_count(total)
+        if not limit:
+            self._say(f"Page {query.page} is out of range ({pages} page(s)).", self.colors.red)
+            return
+        # Only the records on the page are fetched from the history store
+        records = self.calculator.query_history(query.command, query.since, query.until, offset, limit)
+
+        title = "--- Calculation History ---"
+        if query.tail is not None:
+            title = f"--- Calculation History (last {limit} of {total}) ---"
+        elif query.page_size is not None:
+            title = f"--- Calculation History (page {query.page}/{pages}, {total} records) ---"
+        # The whole page is rendered with a single write
+        lines = [title]
+        lines.extend(f"  {record}" for record in records)
+        self._say("\n".join(lines), self.colors.magenta)
 
     @register_command("Clears the entire calculation history.")
     def clear(self):
         self.calculator.clear_history()
-        print(f"{Fore.GREEN}History cleared.{Style.RESET_ALL}")
+        self._say("History cleared.", self.colors.green)
 
     @register_command("Undoes the last calculation or action.")
     def undo(self):
         self.calculator.undo()
-        print(f"{Fore.GREEN}Undo successful.{Style.RESET_ALL}")
+        self._say("Undo successful.", self.colors.green)
 
     @register_command("Redoes the last undone action.")
     def redo(self):
         self.calculator.redo()
-        print(f"{Fore.GREEN}Redo successful.{Style.RESET_ALL}")
+        self._say("Redo successful.", self.colors.green)
 
     @register_command("Manually saves history to CSV.")
     def save(self):
         self.calculator.save_history()
         path = self.config.get_history_file_path()
-        print(f"{Fore.GREEN}History saved to {path}{Style.RESET_ALL}")
+        self._say(f"History saved to {path}", self.colors.green)
 
     @register_command("Manually loads history from CSV.")
     def load(self):
         self.calculator.load_history()
-        print(f"{Fore.GREEN}History loaded.{Style.RESET_ALL}")
+        self._say("History loaded.", self.colors.green)
         self.history()
 
     @register_command("Displays this help menu.")
     def help(self):
-        print("{}{}--- Available Commands ---{}".format(Fore.GREEN, Style.BRIGHT, Style.RESET_ALL))
+        colors = self.colors
+        self._say("{}{}--- Available Commands ---{}".format(colors.green, colors.bright, colors.reset))
         
         # Find the longest usage string for nice alignment
         max_len = max(len(cmd.usage) for cmd in repl_commands.values()) + 2  # Add 2 for padding
@@ -188,9 +426,9 @@ class REPL:
         # Iterate over the dynamically registered commands
         for cmd in sorted(repl_commands.values(), key=lambda c: c.name):
             # Create the padded usage string
-            usage_str = "{}{:<{width}}{}".format(Fore.CYAN, cmd.usage, Style.RESET_ALL, width=max_len)
+            usage_str = "{}{:<{width}}{}".format(colors.cyan, cmd.usage, colors.reset, width=max_len)
             description = cmd.description
-            print("  {} : {}".format(usage_str, description))
+            self._say("  {} : {}".format(usage_str, description))
 
     @register_command("Exits the application.")
     def exit(self):
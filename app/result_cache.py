@@ -0,0 +1,110 @@
+"""
+Defines an opt-in result cache for Command evaluations.
+Every command is a pure function of its operands, so repeated
+``(command, a, b)`` evaluations can be answered from memory.
+"""
+from __future__ import annotations
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+from app.exceptions import OperationError
+
+if TYPE_CHECKING:
+    from app.operations import Command
+
+@dataclass(frozen=True)
+class CacheStats:
+    """A snapshot of the result cache counters."""
+    hits: int
+    misses: int
+    evictions: int # Entries dropped to respect the max size
+    expirations: int # Entries dropped because their TTL ran out
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate), "
+            f"{self.evictions} evictions, {self.expirations} expirations, {self.size} entries"
+        )
+
+def _exact_part(x: float):
+    """A key part that tells signed zeros apart and makes all NaNs equal."""
+    if x != x:
+        return 'nan'
+    return x, math.copysign(1.0, x)
+
+class ResultCache:
+    """
+    A bounded LRU cache of command outcomes keyed by ``(command name, a, b)``
+    and the operand types.
+    Failed evaluations are cached too: a hit re-raises a fresh
+    OperationError with the original message. With ``ttl`` > 0 entries
+    expire that many seconds after they were computed.
+    """
+    def __init__(self, max_size: int, ttl: float = 0, clock: Callable[[], float] = time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, is_error, result or error message)
+        self._entries: OrderedDict = OrderedDict()
+        self._hits = self._misses = self._evictions = self._expirations = 0
+
+    @staticmethod
+    def _key(name: str, a: float, b: float) -> tuple:
+        # 2 == 2.0, but int and float operands can give results of different types
+        if a and b and a == a and b == b:
+            return name, a, b, type(a), type(b)
+        # 0.0 == -0.0, but the sign of a zero can change the result; and
+        # nan != nan, so a NaN operand would make every key unique
+        return name, _exact_part(a), _exact_part(b), type(a), type(b)
+
+    def execute(self, command: Command, a: float, b: float) -> float:
+        """Returns ``command.execute(a, b)``, from the cache when possible."""
+        key = self._key(command.name, a, b)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, is_error, value = entry
+            if self._ttl and self._clock() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                if is_error:
+                    raise OperationError(value)
+                return value
+
+        self._misses += 1
+        expires_at = self._clock() + self._ttl if self._ttl else 0
+        try:
+            result = command.execute(a, b)
+        except OperationError as e:
+            self._store(key, (expires_at, True, str(e)))
+            raise
+        self._store(key, (expires_at, False, result))
+        return result
+
+    def _store(self, key: tuple, entry: tuple):
+        self._entries[key] = entry
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        """Drops every entry; the counters are kept."""
+        self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        """The current counters."""
+        return CacheStats(self._hits, self._misses, self._evictions, self._expirations, len(self._entries))
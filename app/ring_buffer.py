@@ -0,0 +1,182 @@
+"""
+Defines a fixed-capacity ring buffer used as the live history store
+in journal undo mode.
+"""
+from __future__ import annotations
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, Optional
+
+class RingBuffer(Sequence):
+    """
+    A fixed-capacity circular buffer with O(1) append, eviction and
+    indexed access at both ends. Appending to a full buffer evicts the
+    oldest item, like ``deque(maxlen=capacity)``.
+    Subclasses can change how items are stored by overriding
+    ``_reset_storage``, ``_load`` and ``_store``.
+    """
+    def __init__(self, capacity: int, items: Iterable[Any] = ()):
+        if capacity < 0:
+            raise ValueError("capacity must be non-negative")
+        self._capacity = capacity
+        self._reset_storage()
+        self._head = 0 # Physical index of the oldest item
+        self._size = 0
+        self._version = 0 # Bumped on every mutation; used by views
+        self.extend(items)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of items the buffer holds."""
+        return self._capacity
+
+    def _reset_storage(self):
+        """Allocates empty storage for ``capacity`` items."""
+        self._slots: list[Any] = [None] * self._capacity
+
+    def _load(self, slot: int) -> Any:
+        """Reads the item in a physical slot."""
+        return self._slots[slot]
+
+    def _store(self, slot: int, item: Any):
+        """Writes an item (or None, to release it) into a physical slot."""
+        self._slots[slot] = item
+
+    def _slot(self, index: int) -> int:
+        """Maps a logical index (0 = oldest) to a physical slot."""
+        return (self._head + index) % self._capacity
+
+    def append(self, item: Any) -> Optional[Any]:
+        """Adds an item at the newest end. Returns the evicted item, if any."""
+        self._version += 1
+        if self._capacity == 0:
+            return item
+        evicted = None
+        if self._size == self._capacity:
+            evicted = self._load(self._head)
+            self._store(self._head, item)
+            self._head = (self._head + 1) % self._capacity
+        else:
+            self._store(self._slot(self._size), item)
+            self._size += 1
+        return evicted
+
+    def appendleft(self, item: Any) -> Optional[Any]:
+        """Adds an item at the oldest end. Returns the evicted newest item, if any."""
+        self._version += 1
+        if self._capacity == 0:
+            return item
+        evicted = None
+        if self._size == self._capacity:
+            evicted = self.pop()
+        self._head = (self._head - 1) % self._capacity
+        self._store(self._head, item)
+        self._size += 1
+        return evicted
+
+    def pop(self) -> Any:
+        """Removes and returns the newest item."""
+        if not self._size:
+            raise IndexError("pop from an empty ring buffer")
+        self._version += 1
+        slot = self._slot(self._size - 1)
+        item = self._load(slot)
+        self._store(slot, None)
+        self._size -= 1
+        return item
+
+    def popleft(self) -> Any:
+        """Removes and returns the oldest item."""
+        if not self._size:
+            raise IndexError("pop from an empty ring buffer")
+        self._version += 1
+        item = self._load(self._head)
+        self._store(self._head, None)
+        self._head = (self._head + 1) % self._capacity
+        self._size -= 1
+        return item
+
+    def extend(self, items: Iterable[Any]):
+        """Appends items in order, evicting the oldest as needed."""
+        for item in items:
+            self.append(item)
+
+    def clear(self):
+        """Removes all items."""
+        self._version += 1
+        self._reset_storage()
+        self._head = 0
+        self._size = 0
+
+    def copy(self) -> RingBuffer:
+        """Returns an independent buffer with the same capacity and items."""
+        return type(self)(self._capacity, self)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            return RingBufferView(self, range(start, stop, step))
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("ring buffer index out of range")
+        return self._load(self._slot(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        version = self._version
+        for i in range(self._size):
+            if self._version != version:
+                raise RuntimeError("ring buffer mutated during iteration")
+            yield self._load(self._slot(i))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"RingBuffer({self._capacity}, {list(self)!r})"
+
+class RingBufferView(Sequence):
+    """
+    A read-only slice of a RingBuffer that does not copy its items.
+    The view is invalidated by any later mutation of the buffer.
+    """
+    def __init__(self, buffer: RingBuffer, indices: range):
+        self._buffer = buffer
+        self._indices = indices
+        self._version = buffer._version
+
+    def _check(self):
+        """Raises if the underlying buffer changed since the view was taken."""
+        if self._buffer._version != self._version:
+            raise RuntimeError("ring buffer view is stale; the history has changed")
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        self._check()
+        if isinstance(index, slice):
+            return RingBufferView(self._buffer, self._indices[index])
+        return self._buffer[self._indices[index]]
+
+    def __iter__(self) -> Iterator[Any]:
+        buffer = self._buffer
+        for i in self._indices:
+            self._check()
+            yield buffer[i]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"RingBufferView({list(self)!r})"
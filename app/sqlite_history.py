@@ -0,0 +1,451 @@
+"""
+Defines a SQLite-backed history store with indexed queries and
+transactional undo/redo. Selected with CALCULATOR_HISTORY_BACKEND=sqlite.
+"""
+from __future__ import annotations
+import csv
+import logging
+import sqlite3
+import threading
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+from app.calculation import Calculation, datetime_to_ns
+from app.calculator_config import ConfigLoader
+from app.calculator_memento import CalculatorMemento
+from app.durable_io import FsyncPolicy, atomic_path
+from app.exceptions import ConfigError, HistoryError
+from app.history_csv import read_history_csv, write_history_csv
+from app.operations import CommandFactory
+from app.persistent_history import PersistentHistory
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Every row records the action that added it and the action that removed it
+# (cleared, evicted or replaced by a load). A row is visible while ``live``
+# is 1. Undoing an action flips ``live`` on exactly the rows it touched, so
+# undo and redo are single transactions whatever the history size.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    undone INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp INTEGER NOT NULL,
+    operand_a REAL NOT NULL,
+    operand_b REAL NOT NULL,
+    command TEXT NOT NULL,
+    result REAL NOT NULL,
+    live INTEGER NOT NULL DEFAULT 1,
+    added_by INTEGER,
+    removed_by INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_calculations_timestamp ON calculations (live, timestamp);
+CREATE INDEX IF NOT EXISTS idx_calculations_command ON calculations (live, command, timestamp);
+CREATE INDEX IF NOT EXISTS idx_calculations_added_by ON calculations (added_by);
+CREATE INDEX IF NOT EXISTS idx_calculations_removed_by ON calculations (removed_by);
+"""
+
+_COLUMNS = "timestamp, operand_a, operand_b, command, result"
+
+class SQLiteHistory:
+    """
+    A history manager with the same interface as ``History`` that keeps
+    calculations in a SQLite database (WAL mode) instead of in memory.
+    Reads go through indexed queries, so paging and filtering never load
+    the whole history. The database lives next to the history CSV as
+    history.db and survives restarts. The undo stack survives too when
+    CALCULATOR_MAX_UNDO_DEPTH bounds it; unbounded stacks start empty, like
+    those of the in-memory backends, so dead rows never pile up. The CSV
+    methods export and import the history file with the native CSV engine,
+    or in the binary format with CALCULATOR_HISTORY_FORMAT=binary.
+    """
+    def __init__(self, config: ConfigLoader, command_factory: Optional[CommandFactory] = None):
+        self._max_history_size = int(config.get_setting('CALCULATOR_MAX_HISTORY_SIZE', 20))
+        self._max_undo_depth = int(config.get_setting('CALCULATOR_MAX_UNDO_DEPTH', 0))
+        self._history_file_path = config.get_history_file_path()
+        self._encoding = config.get_setting('CALCULATOR_DEFAULT_ENCODING', 'utf-8')
+        self._format = str(config.get_setting('CALCULATOR_HISTORY_FORMAT', 'csv')).lower()
+        if self._format not in ('csv', 'binary'):
+            raise ConfigError(f"Invalid CALCULATOR_HISTORY_FORMAT: '{self._format}'")
+        self._fsync_policy = FsyncPolicy(
+            config.get_setting('CALCULATOR_FSYNC_POLICY', 'none'),
+            int(config.get_setting('CALCULATOR_FSYNC_EVERY_N', 1)),
+        )
+        self._file_lock = threading.Lock()
+        self._commands = (command_factory or CommandFactory()).get_command_table()
+        self._eviction_count = 0
+        self._last_load_skipped = 0
+
+        self._db_path = self._history_file_path.with_name('history.db')
+        try:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL with NORMAL only syncs at checkpoints; 'flush' asks for every commit
+            synchronous = 'FULL' if self._fsync_policy.mode == 'flush' else 'NORMAL'
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+                self._compact()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM calculations WHERE live = 1").fetchone()[0]
+        except sqlite3.Error as e:
+            raise HistoryError(f"Failed to open history database: {e}")
+
+    @property
+    def max_history_size(self) -> int:
+        """Maximum number of calculations kept in the history."""
+        return self._max_history_size
+
+    @property
+    def eviction_count(self) -> int:
+        """Number of calculations evicted so far to respect the max size."""
+        return self._eviction_count
+
+    @property
+    def last_load_skipped(self) -> int:
+        """Number of malformed rows skipped by the last load."""
+        return self._last_load_skipped
+
+    def close(self):
+        """Closes the database connection, checkpointing the WAL."""
+        self._conn.close()
+
+    # --- Row Conversion ---
+
+    def _to_row(self, calc: Calculation) -> tuple:
+        return (
+            calc.timestamp_ns, calc.operand_a, calc.operand_b,
+            calc.command_name, calc.result,
+        )
+
+    def _from_row(self, row: tuple) -> Calculation:
+        timestamp, operand_a, operand_b, command, result = row
+        return Calculation(operand_a, operand_b, self._commands[command], result, timestamp)
+
+    # --- Actions ---
+
+    def _begin_action(self) -> int:
+        """
+        Starts a new undoable action inside the current transaction.
+        Undone actions can no longer be redone, so their rows are dropped.
+        """
+        conn = self._conn
+        undone = "SELECT id FROM actions WHERE undone = 1"
+        conn.execute(f"DELETE FROM calculations WHERE added_by IN ({undone})")
+        conn.execute(f"UPDATE calculations SET removed_by = NULL WHERE removed_by IN ({undone})")
+        conn.execute("DELETE FROM actions WHERE undone = 1")
+        return conn.execute("INSERT INTO actions DEFAULT VALUES").lastrowid
+
+    def _compact(self):
+        """
+        Drops the undo history that is out of reach at startup: past the max
+        undo depth, or all of it when the depth is unbounded.
+        """
+        if self._max_undo_depth:
+            self._end_action()
+            return
+        conn = self._conn
+        conn.execute("DELETE FROM calculations WHERE live = 0")
+        conn.execute("UPDATE calculations SET added_by = NULL, removed_by = NULL")
+        conn.execute("DELETE FROM actions")
+
+    def _end_action(self):
+        """Forgets the oldest actions past the max undo depth."""
+        if not self._max_undo_depth:
+            return
+        conn = self._conn
+        stale = "SELECT id FROM actions ORDER BY id DESC LIMIT -1 OFFSET ?"
+        depth = (self._max_undo_depth,)
+        conn.execute(f"DELETE FROM calculations WHERE live = 0 AND removed_by IN ({stale})", depth)
+        conn.execute(f"UPDATE calculations SET added_by = NULL WHERE added_by IN ({stale})", depth)
+        conn.execute(f"UPDATE calculations SET removed_by = NULL WHERE removed_by IN ({stale})", depth)
+        conn.execute(f"DELETE FROM actions WHERE id IN ({stale})", depth)
+
+    def _insert(self, action: int, calcs: Iterable[Calculation]) -> int:
+        """Inserts calculations in one batch, evicting the oldest past the max size."""
+        rows = [self._to_row(calc) + (action,) for calc in calcs]
+        self._conn.executemany(
+            f"INSERT INTO calculations ({_COLUMNS}, added_by) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        self._size += len(rows)
+        excess = self._size - self._max_history_size
+        if excess > 0:
+            self._conn.execute(
+                "UPDATE calculations SET live = 0, removed_by = ? WHERE id IN "
+                "(SELECT id FROM calculations WHERE live = 1 ORDER BY id LIMIT ?)",
+                (action, excess),
+            )
+            self._size -= excess
+        return max(0, excess)
+
+    def _run(self, operation: str, func, *args):
+        """Runs ``func`` in a transaction, surfacing database errors as HistoryError."""
+        try:
+            with self._conn:
+                return func(*args)
+        except sqlite3.Error as e:
+            self._size = self._conn.execute("SELECT COUNT(*) FROM calculations WHERE live = 1").fetchone()[0]
+            raise HistoryError(f"Failed to {operation}: {e}")
+
+    def add_calculation(self, calc: Calculation):
+        """Adds a new calculation as an undoable action."""
+        self.add_calculations([calc])
+
+    def add_calculations(self, calcs: Sequence[Calculation]):
+        """Adds a batch of calculations as a single undoable action."""
+        if not calcs:
+            return
+        def add():
+            evicted = self._insert(self._begin_action(), calcs)
+            self._end_action()
+            return evicted
+        self._eviction_count += self._run("add calculations", add)
+
+    def _replace(self, calcs: Iterable[Calculation]):
+        """Replaces the live history with ``calcs`` as one undoable action."""
+        def replace():
+            action = self._begin_action()
+            self._conn.execute(
+                "UPDATE calculations SET live = 0, removed_by = ? WHERE live = 1", (action,)
+            )
+            self._size = 0
+            self._insert(action, calcs)
+            self._end_action()
+        self._run("replace history", replace)
+
+    def clear_history(self):
+        """Clears all history, saving state for undo."""
+        if not self._size:
+            return # Nothing to clear
+        self._replace(())
+
+    def undo(self):
+        """Undoes the newest action in a single transaction."""
+        def undo():
+            row = self._conn.execute("SELECT MAX(id) FROM actions WHERE undone = 0").fetchone()
+            if row[0] is None:
+                raise HistoryError("Nothing to undo.")
+            self._flip(row[0], undone=True)
+        self._run("undo", undo)
+
+    def redo(self):
+        """Redoes the oldest undone action in a single transaction."""
+        def redo():
+            row = self._conn.execute("SELECT MIN(id) FROM actions WHERE undone = 1").fetchone()
+            if row[0] is None:
+                raise HistoryError("Nothing to redo.")
+            self._flip(row[0], undone=False)
+        self._run("redo", redo)
+
+    def _flip(self, action: int, undone: bool):
+        """Hides the rows an action added and restores the ones it removed, or the reverse."""
+        conn = self._conn
+        conn.execute("UPDATE calculations SET live = ? WHERE added_by = ?", (int(not undone), action))
+        conn.execute("UPDATE calculations SET live = ? WHERE removed_by = ?", (int(undone), action))
+        conn.execute("UPDATE actions SET undone = ? WHERE id = ?", (int(undone), action))
+        self._size = conn.execute("SELECT COUNT(*) FROM calculations WHERE live = 1").fetchone()[0]
+
+    # --- Reading ---
+
+    def _where(self, command: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> tuple[str, list]:
+        """Builds an indexed WHERE clause for the live rows matching a filter."""
+        clauses, params = ["live = 1"], []
+        if command is not None:
+            clauses.append("command = ?")
+            params.append(command)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(datetime_to_ns(since))
+        if until is not None:
+            clauses.append("timestamp <= ?")
+            params.append(datetime_to_ns(until))
+        return " AND ".join(clauses), params
+
+    def count(self, command: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """Counts the calculations matching a filter."""
+        if command is None and since is None and until is None:
+            return self._size
+        where, params = self._where(command, since, until)
+        return self._conn.execute(f"SELECT COUNT(*) FROM calculations WHERE {where}", params).fetchone()[0]
+
+    def query(
+        self,
+        command: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> list[Calculation]:
+        """
+        Returns one page of the calculations matching a filter, oldest first
+        unless ``newest_first``. Only the requested rows are read.
+        """
+        where, params = self._where(command, since, until)
+        order = "DESC" if newest_first else "ASC"
+        rows = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM calculations WHERE {where} ORDER BY id {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset],
+        )
+        return [self._from_row(row) for row in rows]
+
+    def results(self, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+        """
+        Yields the results of the live history, oldest first, as float64
+        arrays of up to ``chunk_size`` values fetched from a single cursor.
+        """
+        import numpy as np
+        rows = self._conn.execute("SELECT result FROM calculations WHERE live = 1 ORDER BY id")
+        while True:
+            batch = rows.fetchmany(chunk_size)
+            if not batch:
+                break
+            yield np.fromiter((row[0] for row in batch), dtype=np.float64, count=len(batch))
+
+    def get_history(self) -> Sequence[Calculation]:
+        """
+        Returns an immutable copy of the current history, like History does,
+        so it is unaffected by later changes. O(n); see ``view`` for lazy access.
+        """
+        return self.snapshot()
+
+    def view(self) -> Sequence[Calculation]:
+        """
+        Returns a lazy read-only view of the live history. Records are
+        fetched from the database when accessed, so it reflects later changes.
+        """
+        return SQLiteHistoryView(self)
+
+    def snapshot(self) -> Sequence[Calculation]:
+        """Returns an immutable copy of the current history. O(n)."""
+        return PersistentHistory(self.query())
+
+    # --- Memento Pattern Methods ---
+
+    def create_memento(self) -> CalculatorMemento:
+        """Saves the current history into a memento."""
+        return CalculatorMemento(self.snapshot())
+
+    def restore_memento(self, memento: CalculatorMemento):
+        """Restores the history from a memento as an undoable action."""
+        self._replace(memento.get_state())
+
+    # --- Persistence Methods (CSV or binary export/import) ---
+
+    def save_history_to_csv(self, calcs: Optional[Sequence[Calculation]] = None):
+        """Exports the history (or ``calcs``) to the history file."""
+        if calcs is None:
+            calcs = self.snapshot()
+        target = "binary file" if self._format == 'binary' else "CSV"
+        try:
+            self._history_file_path.parent.mkdir(parents=True, exist_ok=True)
+            sync = self._fsync_policy.should_sync()
+            with self._file_lock, atomic_path(self._history_file_path, sync) as tmp:
+                if self._format == 'binary':
+                    from app.history_binary import write_history_binary
+                    write_history_binary(tmp, calcs)
+                else:
+                    write_history_csv(tmp, calcs, self._encoding)
+        except (IOError, OSError, ValueError) as e:
+            raise HistoryError(f"Failed to save history to {target}: {e}")
+
+    def append_to_csv(self, calcs: Iterable[Calculation]):
+        """Appends calculations to the history file."""
+        target = "binary file" if self._format == 'binary' else "CSV"
+        try:
+            with self._file_lock:
+                if self._format == 'binary':
+                    from app.history_binary import write_history_binary
+                    write_history_binary(self._history_file_path, calcs, append=True)
+                else:
+                    write_history_csv(self._history_file_path, calcs, self._encoding, append=True)
+        except (IOError, OSError, ValueError) as e:
+            raise HistoryError(f"Failed to append history to {target}: {e}")
+
+    def _read_binary(self) -> tuple[list[Calculation], int, int]:
+        """Reads the newest calculations of a binary history file, like read_history_csv."""
+        from app.history_binary import BinaryHistoryFile
+        source = BinaryHistoryFile(self._history_file_path, self._commands)
+        records, skipped = source.newest(self._max_history_size)
+        return source.calculations(records), skipped, len(source)
+
+    def _load_empty(self):
+        """Replaces the history with an empty one, as an undoable load unless nothing changes."""
+        if self._size:
+            self._replace(())
+
+    def load_history_from_csv(self, command_factory: CommandFactory):
+        """
+        Replaces the history with the calculations in the history file.
+        A missing or empty file loads an empty history, as with History.
+        """
+        if not self._history_file_path.exists():
+            self._load_empty()
+            return
+        self._commands = command_factory.get_command_table()
+        try:
+            if self._format == 'binary':
+                calcs, skipped, rows = self._read_binary()
+            else:
+                calcs, skipped, rows = read_history_csv(
+                    self._history_file_path, self._commands, self._max_history_size, self._encoding,
+                )
+        except ValueError as e:
+            if self._format == 'binary':
+                raise HistoryError(f"Failed to parse history file (not a binary history?): {e}")
+            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
+        except (csv.Error, KeyError) as e:
+            raise HistoryError(f"Failed to parse history file (malformed CSV?): {e}")
+        except Exception as e:
+            raise HistoryError(f"An unexpected error occurred while loading history: {e}")
+        if not rows:
+            self._load_empty()
+            return
+        self._last_load_skipped = skipped
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed row(s) while loading history.")
+        self._replace(calcs)
+
+class SQLiteHistoryView(Sequence):
+    """
+    A read-only view of the live history in a SQLiteHistory.
+    Iteration streams rows from a cursor; indexing and slicing fetch
+    only the requested rows.
+    """
+    def __init__(self, history: SQLiteHistory):
+        self._history = history
+
+    def __len__(self) -> int:
+        return self._history.count()
+
+    def __getitem__(self, index):
+        size = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                return self._history.query()[index]
+            return self._history.query(offset=start, limit=max(0, stop - start))
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("history index out of range")
+        return self._history.query(offset=index, limit=1)[0]
+
+    def __iter__(self) -> Iterator[Calculation]:
+        history = self._history
+        rows = history._conn.execute(f"SELECT {_COLUMNS} FROM calculations WHERE live = 1 ORDER BY id")
+        for row in rows:
+            yield history._from_row(row)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
@@ -0,0 +1,198 @@
+"""
+Computes summary statistics over streams of numbers in a single pass and
+bounded memory: count, mean and variance (Welford/Chan updates per NumPy
+chunk), min/max and approximate quantiles from a mergeable log-bucketed
+sketch (DDSketch). Accumulators of separate streams can be merged.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+from app.exceptions import InputValidationError
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+
+@dataclass(frozen=True)
+class StatisticsSummary:
+    """
+    Summary statistics of a stream. ``variance`` is the sample variance
+    (0 for a single value); ``quantiles`` maps each requested quantile to
+    an estimate within the sketch's relative accuracy.
+    """
+    count: int
+    mean: float
+    variance: float
+    minimum: float
+    maximum: float
+    quantiles: dict[float, float]
+    relative_accuracy: float
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+class RunningMoments:
+    """Count, mean, sum of squared deviations, min and max of a stream."""
+    __slots__ = ('count', 'mean', 'm2', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, chunk: np.ndarray):
+        """Folds a chunk in: its moments are computed with NumPy, then merged."""
+        if not len(chunk):
+            return
+        mean = float(chunk.mean())
+        self._combine(len(chunk), mean, float(((chunk - mean) ** 2).sum()),
+                      float(chunk.min()), float(chunk.max()))
+
+    def merge(self, other: RunningMoments):
+        """Folds in the moments of another stream."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.minimum, other.maximum)
+
+    def _combine(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        # Chan et al.'s pairwise update, the chunked form of Welford's algorithm
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    @property
+    def variance(self) -> float:
+        """The sample variance, 0 for fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+class QuantileSketch:
+    """
+    A DDSketch: values are counted in logarithmic buckets, so every
+    quantile estimate is within ``relative_accuracy`` of a true value.
+    Positive and negative values have separate stores; when a store grows
+    past ``max_bins``, its buckets closest to zero are collapsed, which
+    bounds memory whatever the input length.
+    """
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("The relative accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive: dict[int, int] = {}
+        self._negative: dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+
+    def add(self, chunk: np.ndarray):
+        """Counts the values of a chunk into their buckets."""
+        self._add_magnitudes(self._positive, chunk[chunk > 0])
+        self._add_magnitudes(self._negative, -chunk[chunk < 0])
+        self._zero += int((chunk == 0).sum())
+        self.count += len(chunk)
+
+    def _add_magnitudes(self, store: dict[int, int], magnitudes: np.ndarray):
+        import numpy as np
+        if not len(magnitudes):
+            return
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma), return_counts=True)
+        for key, count in zip(keys.astype(np.int64).tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+        self._collapse(store)
+
+    def _collapse(self, store: dict[int, int]):
+        """Merges the lowest buckets of a store into one to respect ``max_bins``."""
+        if len(store) <= self.max_bins:
+            return
+        keys = sorted(store)
+        excess = len(keys) - self.max_bins
+        store[keys[excess]] += sum(store.pop(key) for key in keys[:excess])
+
+    def merge(self, other: QuantileSketch):
+        """Adds the counts of a sketch with the same accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        for store, counts in ((self._positive, other._positive), (self._negative, other._negative)):
+            for key, count in counts.items():
+                store[key] = store.get(key, 0) + count
+            self._collapse(store)
+        self._zero += other._zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        # The midpoint (in relative terms) of the bucket (gamma^(key-1), gamma^key]
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """Estimates the ``q`` quantile (0 <= q <= 1) of the values added so far."""
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile {q} is not between 0 and 1.")
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending order: large negatives, zeros, then positives
+        for key in sorted(self._negative, reverse=True):
+            seen += self._negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            seen += self._positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self._positive)) # pragma: no cover (rounding of rank)
+
+class StreamStatistics:
+    """Accumulates the moments and quantile sketch of a stream of chunks."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, chunk: np.ndarray):
+        import numpy as np
+        if not np.isfinite(chunk).all():
+            raise InputValidationError("Input contains a value that is not a finite number.")
+        self.moments.add(chunk)
+        self.sketch.add(chunk)
+
+    def merge(self, other: StreamStatistics):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def summary(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> StatisticsSummary:
+        """Returns the statistics so far; quantile estimates are clamped to [min, max]."""
+        moments = self.moments
+        if not moments.count:
+            raise InputValidationError("There are no numbers to summarize.")
+        estimates = {
+            q: min(max(self.sketch.quantile(q), moments.minimum), moments.maximum)
+            for q in quantiles
+        }
+        return StatisticsSummary(
+            moments.count, moments.mean, moments.variance, moments.minimum, moments.maximum,
+            estimates, self.sketch.relative_accuracy,
+        )
+
+def summarize(
+    chunks: Iterable[np.ndarray],
+    quantiles: Iterable[float] = DEFAULT_QUANTILES,
+    relative_accuracy: float = 0.01,
+) -> StatisticsSummary:
+    """Computes the summary statistics of a stream of chunks in one pass."""
+    statistics = StreamStatistics(relative_accuracy)
+    for chunk in chunks:
+        statistics.add(chunk)
+    return statistics.summary(quantiles)
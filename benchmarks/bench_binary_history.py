@@ -0,0 +1,56 @@
+"""
+Compares loading the newest records of a large history from CSV (native
+engine) and from the memory-mapped binary format.
+
+Usage (from the project root):
+    python benchmarks/bench_binary_history.py [--sizes 1000 100000 1000000] [--keep 1000]
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.history import History  # noqa: E402
+from app.operations import CommandFactory  # noqa: E402
+from bench_csv_engines import make_calculations, timed  # noqa: E402
+
+class BenchConfig:
+    """Minimal config pointing History at a temporary file."""
+    def __init__(self, path: Path, history_format: str, max_size: int):
+        self._path = path
+        self._settings = {
+            'CALCULATOR_CSV_ENGINE': 'native',
+            'CALCULATOR_HISTORY_FORMAT': history_format,
+            'CALCULATOR_MAX_HISTORY_SIZE': max_size,
+        }
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_history_file_path(self):
+        return self._path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--keep', type=int, default=1_000, help="max history size used when loading")
+    args = parser.parse_args()
+
+    factory = CommandFactory()
+    print(f"{'rows':>10} {'format':>8} {'save (s)':>10} {'load (s)':>10} {'file (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            calcs = make_calculations(factory, n)
+            for history_format, suffix in (('csv', 'csv'), ('binary', 'bin')):
+                path = Path(tmp) / f"history_{n}.{suffix}"
+                history = History(BenchConfig(path, history_format, args.keep))
+                save = timed(lambda: history.save_history_to_csv(calcs))
+                load = timed(lambda: history.load_history_from_csv(factory))
+                assert len(history.get_history()) == min(n, args.keep)
+                size = path.stat().st_size / 1e6
+                print(f"{n:>10} {history_format:>8} {save:>10.3f} {load:>10.4f} {size:>10.1f}")
+
+if __name__ == "__main__":
+    main()
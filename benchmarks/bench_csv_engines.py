@@ -0,0 +1,74 @@
+"""
+Compares the pandas and native CSV engines for saving and loading history.
+
+Usage (from the project root):
+    python benchmarks/bench_csv_engines.py [--sizes 1000 100000 1000000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.calculation import Calculation  # noqa: E402
+from app.history import History  # noqa: E402
+from app.operations import CommandFactory  # noqa: E402
+
+class BenchConfig:
+    """Minimal config pointing History at a temporary file."""
+    def __init__(self, path: Path, engine: str, max_size: int):
+        self._path = path
+        self._settings = {
+            'CALCULATOR_CSV_ENGINE': engine,
+            'CALCULATOR_MAX_HISTORY_SIZE': max_size,
+        }
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_history_file_path(self):
+        return self._path
+
+def make_calculations(factory: CommandFactory, n: int) -> list:
+    """Builds n calculations cycling through every command."""
+    commands = [factory.get_command(name) for name in ('add', 'subtract', 'multiply', 'divide')]
+    start = datetime(2024, 1, 1)
+    return [
+        Calculation(
+            float(i), 3.0, commands[i % 4],
+            commands[i % 4].execute(float(i), 3.0),
+            start + timedelta(microseconds=i * 1500),
+        )
+        for i in range(n)
+    ]
+
+def timed(func) -> float:
+    """Runs func once and returns the elapsed seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    factory = CommandFactory()
+    print(f"{'rows':>10} {'engine':>8} {'save (s)':>10} {'load (s)':>10} {'file (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            calcs = make_calculations(factory, n)
+            for engine in ('pandas', 'native'):
+                path = Path(tmp) / f"{engine}_{n}.csv"
+                history = History(BenchConfig(path, engine, n))
+                save = timed(lambda: history.save_history_to_csv(calcs))
+                load = timed(lambda: history.load_history_from_csv(factory))
+                assert len(history.get_history()) == n
+                size = path.stat().st_size / 1e6
+                print(f"{n:>10} {engine:>8} {save:>10.3f} {load:>10.3f} {size:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the per-calculation latency of Calculator.execute_command with a
+LoggingObserver writing to a log file directly and through the queue.
+
+Usage (from the project root):
+    python benchmarks/bench_logging.py [--count 20000]
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.calculator import Calculator  # noqa: E402
+from app.history import History  # noqa: E402
+from app.logger import setup_logging, stop_logging  # noqa: E402
+from app.observers import LoggingObserver  # noqa: E402
+from app.operations import CommandFactory  # noqa: E402
+
+class BenchConfig:
+    """Minimal config for History and setup_logging in a temporary directory."""
+    def __init__(self, tmp: Path, log_mode: str):
+        self._tmp = tmp
+        self._settings = {
+            'CALCULATOR_LOG_MODE': log_mode,
+            'CALCULATOR_MAX_HISTORY_SIZE': 1000,
+        }
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_history_file_path(self):
+        return self._tmp / "history.csv"
+
+    def get_log_file_path(self):
+        return self._tmp / f"{self._settings['CALCULATOR_LOG_MODE']}.log"
+
+def run(tmp: Path, log_mode: str, count: int) -> tuple[float, float]:
+    """Returns the mean latency per calculation and the time to drain the log, in µs and s."""
+    logging.getLogger('app').handlers = []
+    config = BenchConfig(tmp, log_mode)
+    calculator = Calculator(CommandFactory(), History(config))
+    calculator.attach(LoggingObserver(setup_logging(config)))
+
+    start = time.perf_counter()
+    for i in range(count):
+        calculator.execute_command('add', float(i), 1.0)
+    elapsed = time.perf_counter() - start
+
+    drain_start = time.perf_counter()
+    stop_logging()
+    for handler in logging.getLogger('app').handlers:
+        handler.flush()
+    return elapsed / count * 1e6, time.perf_counter() - drain_start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'µs/calculation':>15} {'drain (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for log_mode in ('direct', 'queue'):
+            latency, drain = run(Path(tmp), log_mode, args.count)
+            print(f"{log_mode:>8} {latency:>15.2f} {drain:>10.3f}")
+
+if __name__ == "__main__":
+    main()
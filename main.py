@@ -1,17 +1,28 @@
+import argparse
 import sys
 from pathlib import Path
-from colorama import Fore, Style
 from app.calculator_config import ConfigLoader
-from app.logger import setup_logging
+from app.logger import setup_logging, stop_logging
 from app.operations import CommandFactory
-from app.history import History
+from app.history import create_history
 from app.calculator import Calculator
+from app.result_cache import ResultCache
 from app.observers import LoggingObserver, AutoSaveObserver
-from app.repl import REPL
+from app.repl import REPL, Palette
 from app.exceptions import ConfigError
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parses the command-line arguments."""
+    parser = argparse.ArgumentParser(description="Advanced Calculator")
+    parser.add_argument(
+        '--batch', metavar='FILE',
+        help="Run REPL commands from FILE ('-' for stdin) without prompts or colors.",
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Initializes and runs the calculator application."""
+    args = parse_args(argv)
     try:
         # 1. Load Configuration
         project_root = Path(__file__).parent
@@ -23,34 +34,88 @@ def main():
 
         # 3. Setup Core Components
         command_factory = CommandFactory()
-        history = History(config)
-        calculator = Calculator(command_factory, history)
+        history = create_history(config)
+        result_cache = None
+        cache_size = int(config.get_setting('CALCULATOR_RESULT_CACHE_SIZE', 0))
+        if cache_size > 0:
+            result_cache = ResultCache(cache_size, float(config.get_setting('CALCULATOR_RESULT_CACHE_TTL', 0)))
+        try:
+            calculator = Calculator(
+                command_factory, history, result_cache,
+                dispatch=config.get_setting('CALCULATOR_OBSERVER_DISPATCH', 'sync').lower(),
+                queue_size=int(config.get_setting('CALCULATOR_OBSERVER_QUEUE_SIZE', 1000)),
+                backpressure=config.get_setting('CALCULATOR_OBSERVER_BACKPRESSURE', 'block').lower(),
+                expression_cache_size=int(config.get_setting('CALCULATOR_EXPRESSION_CACHE_SIZE', 256)),
+                reduction_chunk_size=int(config.get_setting('CALCULATOR_REDUCTION_CHUNK_SIZE', 65536)),
+                quantile_accuracy=float(config.get_setting('CALCULATOR_STATS_ACCURACY', 0.01)),
+                max_value=float(config.get_setting('CALCULATOR_MAX_INPUT_VALUE', 1e9)),
+            )
+        except ValueError as e:
+            raise ConfigError(str(e))
 
         # 4. Register Observers (Observer Pattern)
         logging_observer = LoggingObserver(logger)
-        auto_save_observer = AutoSaveObserver(history) # Give it the history manager
-
         calculator.attach(logging_observer)
+
+        auto_save_observer = None
         if config.get_setting('CALCULATOR_AUTO_SAVE', 'false').lower() == 'true':
-            calculator.attach(auto_save_observer)
+            # 'full' rewrites the file on every save, as before the mode existed
+            save_mode = config.get_setting('CALCULATOR_AUTO_SAVE_MODE', 'full').lower()
+            if save_mode not in ('full', 'incremental'):
+                raise ConfigError(f"Invalid CALCULATOR_AUTO_SAVE_MODE: '{save_mode}' (expected full or incremental)")
+            incremental = save_mode == 'incremental'
+            write_behind = config.get_setting('CALCULATOR_AUTO_SAVE_WRITE_BEHIND', 'false').lower() == 'true'
+            auto_save_observer = AutoSaveObserver(
+                history, # Give it the history manager
+                incremental=incremental,
+                write_behind=write_behind,
+                flush_interval=float(config.get_setting('CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL', 1.0)),
+                max_pending=int(config.get_setting('CALCULATOR_AUTO_SAVE_MAX_PENDING', 100)),
+                logger=logger,
+            )
+            # Auto-save reads the history when notified, so it must run in step with it
+            calculator.attach(auto_save_observer, asynchronous=False)
             logger.info("Auto-save observer registered.")
         
-        # 5. Start the REPL
+        # 5. Start the REPL (or replay a command script)
         repl = REPL(calculator, config)
-        repl.run()
+        try:
+            if args.batch:
+                if args.batch == '-':
+                    report = repl.run_batch(sys.stdin)
+                else:
+                    with open(args.batch, encoding='utf-8') as script:
+                        report = repl.run_batch(script)
+                logger.info("Batch run finished: %s", report)
+                print(report, file=sys.stderr)
+            else:
+                repl.run()
+        finally:
+            # Make sure queued auto-saves reach the disk before exiting
+            if auto_save_observer:
+                auto_save_observer.close()
+            calculator.report_cache_stats()
+            # Deliver events still queued for asynchronous observers
+            calculator.close()
+            history.close()
 
     except ConfigError as e:
-        print(f"{Fore.RED}Configuration Error: {e}{Style.RESET_ALL}", file=sys.stderr)
+        colors = Palette()
+        print(f"{colors.red}Configuration Error: {e}{colors.reset}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
-        print(f"{Fore.RED}An unexpected critical error occurred: {e}{Style.RESET_ALL}", file=sys.stderr)
+        colors = Palette()
+        print(f"{colors.red}An unexpected critical error occurred: {e}{colors.reset}", file=sys.stderr)
         if 'logger' in locals():
             locals()['logger'].critical(f"Unhandled exception: {e}", exc_info=True)
         sys.exit(1)
 
     if 'logger' in locals():
         logger.info("Application shutting down gracefully.")
-    print(f"\n{Fore.CYAN}Thank you for using the Advanced Calculator!{Style.RESET_ALL}")
+        stop_logging() # Write the records still queued for the log file
+    if not args.batch:
+        colors = repl.colors
+        print(f"\n{colors.cyan}Thank you for using the Advanced Calculator!{colors.reset}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
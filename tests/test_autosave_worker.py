@@ -0,0 +1,72 @@
+"""
+Tests for app/autosave_worker.py
+"""
+import pytest
+from unittest.mock import MagicMock
+from app.autosave_worker import AutoSaveWorker
+from app.exceptions import HistoryError
+
+@pytest.fixture
+def mock_history():
+    """Mocks the History save methods used by the worker."""
+    return MagicMock()
+
+def test_flush_coalesces_appends(mock_history):
+    """Tests that queued rows are appended in a single write."""
+    worker = AutoSaveWorker(mock_history, flush_interval=60)
+    worker.submit_append(["c1"])
+    worker.submit_append(["c2"])
+    assert worker.pending == 2
+    mock_history.append_to_csv.assert_not_called()
+
+    worker.flush()
+    mock_history.append_to_csv.assert_called_once_with(["c1", "c2"])
+    assert worker.pending == 0
+    worker.close()
+
+def test_rewrite_replaces_queued_rows(mock_history):
+    """Tests that a rewrite supersedes earlier rows and keeps later ones."""
+    worker = AutoSaveWorker(mock_history, flush_interval=60)
+    worker.submit_append(["c1"])
+    worker.submit_rewrite(("c1", "c2"))
+    worker.submit_append(["c3"])
+    worker.close()
+
+    mock_history.save_history_to_csv.assert_called_once_with(("c1", "c2"))
+    mock_history.append_to_csv.assert_called_once_with(["c3"])
+
+def test_max_pending_wakes_worker(mock_history):
+    """Tests that a full batch is flushed without waiting for the interval."""
+    worker = AutoSaveWorker(mock_history, flush_interval=60, max_pending=2)
+    worker.submit_append(["c1"])
+    worker.submit_append(["c2"])
+    # Poll until the background flush has happened
+    for _ in range(100):
+        if mock_history.append_to_csv.called:
+            break
+        worker._thread.join(0.01)
+    mock_history.append_to_csv.assert_called_once_with(["c1", "c2"])
+    worker.close()
+
+def test_flush_interval(mock_history):
+    """Tests that the worker flushes periodically."""
+    worker = AutoSaveWorker(mock_history, flush_interval=0.01)
+    worker.submit_append(["c1"])
+    for _ in range(100):
+        if mock_history.append_to_csv.called:
+            break
+        worker._thread.join(0.01)
+    mock_history.append_to_csv.assert_called_once_with(["c1"])
+    worker.close()
+
+def test_errors_are_logged(mock_history):
+    """Tests that save failures are logged and reported, not raised."""
+    logger = MagicMock()
+    on_error = MagicMock()
+    mock_history.append_to_csv.side_effect = HistoryError("disk full")
+    worker = AutoSaveWorker(mock_history, flush_interval=60, logger=logger, on_error=on_error)
+
+    worker.submit_append(["c1"])
+    worker.close()
+    logger.error.assert_called_once_with("Failed to auto-save history: disk full")
+    on_error.assert_called_once()
@@ -1,8 +1,13 @@
 """
 Tests for app/calculation.py
 """
-from datetime import datetime
-from app.calculation import Calculation
+import copy
+import pickle
+import time
+from dataclasses import FrozenInstanceError
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.calculation import Calculation, datetime_to_ns, now_ns, ns_to_datetime
 from app.operations import AddCommand
 
 def test_calculation_dataclass():
@@ -35,4 +40,59 @@ def test_calculation_dataclass():
         "Command": "add",
         "Result": 8
     }
-    assert calc.to_dict() == expected_dict
\ No newline at end of file
+    assert calc.to_dict() == expected_dict
+def test_timestamp_ns_round_trip():
+    """Tests conversion between datetimes and epoch nanoseconds."""
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    ns = datetime_to_ns(timestamp)
+    assert ns == 1714979289123456000
+    assert ns_to_datetime(ns) == timestamp
+
+@pytest.fixture
+def utc_plus_two(monkeypatch):
+    """Makes UTC+2 the local time zone for the duration of a test."""
+    monkeypatch.setenv('TZ', 'XYZ-02')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_aware_datetimes_use_local_time(utc_plus_two):
+    """Tests that an offset-qualified datetime encodes like the same local wall-clock time."""
+    local = datetime(2024, 5, 6, 12, 0)
+    for offset in (0, 2, -7):
+        aware = local.astimezone(timezone(timedelta(hours=offset)))
+        assert aware.hour == (10 + offset) % 24
+        assert datetime_to_ns(aware) == datetime_to_ns(local)
+    assert datetime_to_ns(datetime(1970, 1, 1, tzinfo=timezone.utc)) == 2 * 3600 * 10**9
+
+def test_compact_record():
+    """Tests the slotted, frozen record and its lazy timestamp."""
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    calc = Calculation(1.0, 2.0, AddCommand(), 3.0, timestamp)
+    assert not hasattr(calc, '__dict__')
+    assert calc.timestamp_ns == datetime_to_ns(timestamp)
+    assert calc.timestamp == timestamp
+    assert Calculation(1.0, 2.0, AddCommand(), 3.0, calc.timestamp_ns) == calc
+    assert hash(Calculation(1.0, 2.0, AddCommand(), 3.0, timestamp)) == hash(calc)
+    assert calc != Calculation(1.0, 2.0, AddCommand(), 3.5, timestamp)
+    assert calc != "not a calculation"
+    assert "timestamp=datetime.datetime(2024, 5, 6" in repr(calc)
+
+    with pytest.raises(FrozenInstanceError):
+        calc.result = 4.0
+    with pytest.raises(FrozenInstanceError):
+        del calc.result
+
+    # Records and their commands are shared, never duplicated
+    assert copy.copy(calc) is calc
+    assert copy.deepcopy([calc])[0] is calc
+    assert copy.deepcopy(calc.command) is calc.command
+    assert pickle.loads(pickle.dumps(calc)) == calc
+
+def test_default_timestamp_is_local_time():
+    """Tests that new records are stamped with the local wall-clock time."""
+    before = datetime.now().replace(microsecond=0)
+    calc = Calculation(1.0, 2.0, AddCommand(), 3.0)
+    assert before <= calc.timestamp <= datetime.now()
+    assert now_ns() % 1000 == 0
@@ -1,13 +1,22 @@
 """
 Tests for app/calculator.py (including Observer pattern)
 """
+import io
+import numpy as np
 import pytest
 from unittest.mock import MagicMock, Mock
 from app.calculator import Calculator
 from app.operations import CommandFactory, AddCommand
 from app.history import History
 from app.calculation import Calculation
-from app.exceptions import OperationError
+from app.exceptions import InputValidationError, OperationError
+from app.expression import TableRange
+from app.result_cache import ResultCache
+from app.observers import Observer
+from app.events import (
+    BatchPerformed, CacheStatsReported, CalculationPerformed, ErrorOccurred, Event, HistoryChanged,
+    HistoryCleared, HistoryLoaded, HistorySaved, RedoPerformed, UndoPerformed,
+)
 
 @pytest.fixture
 def mock_factory():
@@ -61,6 +70,12 @@ def test_history_commands_pass_through(calculator, mock_history):
     """Tests that history commands are passed to the History manager."""
     calculator.get_history()
     mock_history.get_history.assert_called_once()
+
+    calculator.count_history('add')
+    mock_history.count.assert_called_once_with('add', None, None)
+
+    calculator.query_history('add', offset=5, limit=10)
+    mock_history.query.assert_called_once_with('add', None, None, 5, 10)
     
     calculator.clear_history()
     mock_history.clear_history.assert_called_once()
@@ -88,8 +103,8 @@ def test_get_available_commands(calculator, mock_factory):
 
 @pytest.fixture
 def mock_observer():
-    """Mocks an Observer."""
-    return MagicMock()
+    """Mocks an Observer subscribed to every event."""
+    return MagicMock(spec=Observer, subscriptions=(Event,))
 
 def test_observer_attach_detach(calculator, mock_observer):
     """Tests attaching and detaching observers."""
@@ -117,9 +132,9 @@ def test_observer_notify_on_calculation(calculator, mock_factory, mock_observer)
     mock_observer.update.assert_called_once()
     call_args = mock_observer.update.call_args[0]
     assert call_args[0] == calculator  # subject
-    assert call_args[1] == "calculation_performed" # event
-    assert isinstance(call_args[2], Calculation) # data
-    assert call_args[2].result == 8.0
+    assert isinstance(call_args[1], CalculationPerformed) # event
+    assert isinstance(call_args[1].calculation, Calculation)
+    assert call_args[1].calculation.result == 8.0
 
 def test_observer_notify_on_error(calculator, mock_factory, mock_observer):
     """Tests that observers are notified on calculation error."""
@@ -134,23 +149,219 @@ def test_observer_notify_on_error(calculator, mock_factory, mock_observer):
         calculator.execute_command('divide', 10, 0)
         
     # Check that observer's update method was called with error
-    mock_observer.update.assert_called_once_with(calculator, "error_occurred", error)
+    mock_observer.update.assert_called_once_with(calculator, ErrorOccurred(error))
 
 def test_observer_notify_on_history_changes(calculator, mock_observer):
     """Tests that observers are notified on other history events."""
     calculator.attach(mock_observer)
     
     calculator.clear_history()
-    mock_observer.update.assert_called_with(calculator, "history_cleared", None)
+    mock_observer.update.assert_called_with(calculator, HistoryCleared())
     
     calculator.undo()
-    mock_observer.update.assert_called_with(calculator, "undo", None)
+    mock_observer.update.assert_called_with(calculator, UndoPerformed())
     
     calculator.redo()
-    mock_observer.update.assert_called_with(calculator, "redo", None)
+    mock_observer.update.assert_called_with(calculator, RedoPerformed())
     
     calculator.save_history()
-    mock_observer.update.assert_called_with(calculator, "history_saved", None)
+    mock_observer.update.assert_called_with(calculator, HistorySaved())
     
     calculator.load_history()
-    mock_observer.update.assert_called_with(calculator, "history_loaded", None)
\ No newline at end of file
+    mock_observer.update.assert_called_with(calculator, HistoryLoaded())
+def test_observer_subscriptions(calculator, mock_factory):
+    """Tests that observers are only called for the event types they subscribed to."""
+    mock_factory.get_command.return_value = AddCommand()
+    changes = MagicMock(spec=Observer, subscriptions=(HistoryChanged,))
+    errors = MagicMock(spec=Observer, subscriptions=(Event,))
+    calculator.attach(changes)
+    calculator.attach(errors, events=[ErrorOccurred])
+
+    calculator.execute_command('add', 1, 2)
+    calculator.undo()
+    calculator.save_history()
+    assert [type(c.args[1]) for c in changes.update.call_args_list] == [CalculationPerformed, UndoPerformed]
+    errors.update.assert_not_called()
+
+    mock_factory.get_command.side_effect = OperationError("Unknown command")
+    with pytest.raises(OperationError):
+        calculator.execute_command('bogus', 1, 2)
+    errors.update.assert_called_once()
+    assert changes.update.call_count == 2
+
+    # Detaching rebuilds the dispatch table
+    calculator.detach(changes)
+    calculator.redo()
+    assert changes.update.call_count == 2
+
+def test_evaluate_expression(mock_history, mock_observer):
+    """Tests that an expression is recorded as its outermost operation."""
+    calculator = Calculator(CommandFactory(), mock_history)
+    calculator.attach(mock_observer)
+    assert calculator.evaluate_expression("3 + 4 * 2") == 11.0
+    calc = mock_history.add_calculation.call_args[0][0]
+    assert (calc.operand_a, calc.command_name, calc.operand_b, calc.result) == (3.0, 'add', 8.0, 11.0)
+    mock_observer.update.assert_called_once()
+
+    # A bare number is not a calculation
+    assert calculator.evaluate_expression("-5") == -5.0
+    assert mock_history.add_calculation.call_count == 1
+
+    with pytest.raises(OperationError):
+        calculator.evaluate_expression("2 / (1 - 1)")
+    assert isinstance(mock_observer.update.call_args[0][1], ErrorOccurred)
+    assert mock_history.add_calculation.call_count == 1
+
+def test_evaluate_expression_range(mock_history, mock_observer):
+    """Tests that literals and the value of an expression respect max_value."""
+    calculator = Calculator(CommandFactory(), mock_history, max_value=1e9)
+    calculator.attach(mock_observer)
+    for source in ("1e300 * 1e300", "-1e10 + 1", "add(2e9, 1)"):
+        with pytest.raises(InputValidationError, match="out of range"):
+            calculator.evaluate_expression(source)
+    with pytest.raises(InputValidationError, match="out of range"):
+        calculator.define_function("g(x) = x * 1e10")
+    with pytest.raises(OperationError, match="Result 1e\\+18 is out of range"):
+        calculator.evaluate_expression("1e9 * 1e9")
+    with pytest.raises(OperationError, match="Result inf is out of range"):
+        calculator.evaluate_expression("*".join(["1e9"] * 35))
+    assert isinstance(mock_observer.update.call_args[0][1], ErrorOccurred)
+    mock_history.add_calculation.assert_not_called()
+    assert calculator.evaluate_expression("-1e9 * 1") == -1e9
+
+def test_functions_and_tables(mock_history):
+    """Tests defining functions and tabulating them without touching history."""
+    calculator = Calculator(CommandFactory(), mock_history)
+    calculator.define_function("f(x, y) = power(x, 2) + y")
+    assert [str(function) for function in calculator.get_functions()] == ["f(x, y) = power(x, 2) + y"]
+
+    values, results, errors = calculator.tabulate('f', TableRange('x', 0.0, 1.0, 0.5), {'y': 1.0})
+    assert values.tolist() == [0.0, 0.5, 1.0]
+    assert results.tolist() == [1.0, 1.25, 2.0]
+    assert not errors.any()
+    mock_history.add_calculation.assert_not_called()
+
+    with pytest.raises(InputValidationError, match="Missing a value for parameter 'y'"):
+        calculator.tabulate('f', TableRange('x', 0.0, 1.0))
+    with pytest.raises(InputValidationError, match="has no parameter 'z'"):
+        calculator.tabulate('f', TableRange('x', 0.0, 1.0), {'y': 1.0, 'z': 2.0})
+
+def test_reduce(mock_history, mock_observer):
+    """Tests that a reduction is recorded as its final two-operand step."""
+    calculator = Calculator(CommandFactory(), mock_history, reduction_chunk_size=2)
+    calculator.attach(mock_observer)
+    assert calculator.reduce('sum', [1.0, 2.0, 3.0, 4.0, 5.0]) == 15.0
+    calc = mock_history.add_calculation.call_args[0][0]
+    assert (calc.operand_a, calc.command_name, calc.operand_b, calc.result) == (10.0, 'add', 5.0, 15.0)
+    mock_observer.update.assert_called_once()
+
+    assert calculator.reduce('mean', io.StringIO("1, 2\n3 6")) == 3.0
+    calc = mock_history.add_calculation.call_args[0][0]
+    assert (calc.operand_a, calc.command_name, calc.operand_b) == (12.0, 'divide', 4.0)
+
+    with pytest.raises(OperationError, match="needs at least one number"):
+        calculator.reduce('max', [])
+    assert isinstance(mock_observer.update.call_args[0][1], ErrorOccurred)
+    assert mock_history.add_calculation.call_count == 2
+
+    with pytest.raises(ValueError, match="chunk size"):
+        Calculator(CommandFactory(), mock_history, reduction_chunk_size=0)
+
+def test_describe(mock_history):
+    """Tests statistics of values, a stream and the history results, without recording anything."""
+    calculator = Calculator(CommandFactory(), mock_history, reduction_chunk_size=2, quantile_accuracy=0.05)
+    summary = calculator.describe([2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0], quantiles=(0.5,))
+    assert (summary.count, summary.mean, summary.minimum, summary.maximum) == (8, 5.0, 2.0, 9.0)
+    assert summary.variance == pytest.approx(32 / 7)
+    assert summary.quantiles[0.5] == pytest.approx(4.0, rel=0.05)
+    assert summary.relative_accuracy == 0.05
+
+    assert calculator.describe(io.StringIO("1, 2\n3")).mean == 2.0
+
+    mock_history.results.return_value = iter([np.array([1.0, 3.0])])
+    assert calculator.describe_history().mean == 2.0
+    mock_history.results.assert_called_once_with(2)
+    mock_history.add_calculation.assert_not_called()
+
+    with pytest.raises(ValueError, match="quantile accuracy"):
+        Calculator(CommandFactory(), mock_history, quantile_accuracy=1.0)
+
+# --- Batch Evaluation Tests ---
+
+@pytest.fixture
+def batch_calculator(mock_history):
+    """Provides a Calculator with a real factory for batch evaluation."""
+    return Calculator(CommandFactory(), mock_history)
+
+def test_execute_batch_single_command(batch_calculator, mock_history, mock_observer):
+    """Tests a batch that applies one command to every operand pair."""
+    batch_calculator.attach(mock_observer)
+    batch = batch_calculator.execute_batch('add', [1, 2, 3], [10, 20, 30])
+
+    assert list(batch.results) == [11.0, 22.0, 33.0]
+    assert batch.error_count == 0
+    mock_history.add_calculations.assert_called_once_with(batch.calculations)
+    assert [calc.result for calc in batch.calculations] == [11.0, 22.0, 33.0]
+    mock_observer.update.assert_called_once_with(batch_calculator, BatchPerformed(batch))
+
+def test_execute_batch_mixed_commands_with_errors(batch_calculator):
+    """Tests a batch with several commands and failing elements."""
+    batch = batch_calculator.execute_batch(
+        ['divide', 'multiply', 'divide'], [10, 3, 1], [2, 4, 0]
+    )
+    assert list(batch.errors) == [False, False, True]
+    assert batch.results[:2].tolist() == [5.0, 12.0]
+    assert [calc.command_name for calc in batch.calculations] == ['divide', 'multiply']
+
+def test_execute_batch_invalid(batch_calculator, mock_history, mock_observer):
+    """Tests that invalid batches are rejected before anything is recorded."""
+    batch_calculator.attach(mock_observer)
+    with pytest.raises(OperationError, match="Unknown command"):
+        batch_calculator.execute_batch(['add', 'bogus'], [1, 2], [3, 4])
+    assert isinstance(mock_observer.update.call_args[0][1], ErrorOccurred)
+
+    with pytest.raises(OperationError, match="equal length"):
+        batch_calculator.execute_batch('add', [1, 2], [3])
+    with pytest.raises(OperationError, match="one command name per operand pair"):
+        batch_calculator.execute_batch(['add'], [1, 2], [3, 4])
+    mock_history.add_calculations.assert_not_called()
+
+def test_result_cache(mock_history, mock_observer):
+    """Tests that a cached calculator skips evaluation but still records history."""
+    calculator = Calculator(CommandFactory(), mock_history, ResultCache(10))
+    calculator.attach(mock_observer)
+    assert calculator.execute_command('power', 2.0, 8.0) == 256.0
+    assert calculator.execute_command('power', 2.0, 8.0) == 256.0
+    assert mock_history.add_calculation.call_count == 2
+    for _ in range(2):
+        with pytest.raises(OperationError):
+            calculator.execute_command('divide', 1.0, 0.0)
+    assert calculator.cache_stats.hits == 2
+
+    calculator.report_cache_stats()
+    mock_observer.update.assert_called_with(calculator, CacheStatsReported(calculator.cache_stats))
+    assert Calculator(CommandFactory(), mock_history).cache_stats is None
+
+def test_async_dispatch(mock_history):
+    """Tests per-observer queues, synchronous overrides, flush and close."""
+    calculator = Calculator(CommandFactory(), mock_history, dispatch='async')
+    queued = MagicMock(spec=Observer, subscriptions=(Event,))
+    direct = MagicMock(spec=Observer, subscriptions=(Event,))
+    calculator.attach(queued)
+    calculator.attach(direct, asynchronous=False)
+    for i in range(5):
+        calculator.execute_command('add', float(i), 1.0)
+    assert direct.update.call_count == 5
+    calculator.flush()
+    assert [c.args[1].calculation.operand_a for c in queued.update.call_args_list] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    calculator.detach(queued)
+    calculator.close()
+    calculator.undo()
+    assert queued.update.call_count == 5
+    assert direct.update.call_count == 6
+
+    with pytest.raises(ValueError, match="dispatch"):
+        Calculator(CommandFactory(), mock_history, dispatch='threads')
+    with pytest.raises(ValueError, match="backpressure"):
+        Calculator(CommandFactory(), mock_history, backpressure='ignore')
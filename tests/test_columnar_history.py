@@ -0,0 +1,72 @@
+"""
+Tests for app/columnar_history.py
+"""
+import numpy as np
+import pytest
+from datetime import datetime
+from app.columnar_history import ColumnarHistory
+from app.calculation import Calculation
+from app.operations import AddCommand, SubtractCommand
+
+def make_calcs(n):
+    """Creates n distinct calculations with different commands and timestamps."""
+    commands = [AddCommand(), SubtractCommand()]
+    return [
+        Calculation(float(i), 2.0, commands[i % 2], float(i) + 2, datetime(2024, 1, 1, 10, 0, i, i * 1000))
+        for i in range(n)
+    ]
+
+def test_round_trip_records():
+    """Tests that records read back equal the ones stored."""
+    calcs = make_calcs(4)
+    store = ColumnarHistory(3, calcs)
+    assert list(store) == calcs[1:]
+    assert store[0].timestamp == calcs[1].timestamp
+    assert store[-1].command is calcs[3].command
+    assert store.pop() == calcs[3]
+    store.appendleft(calcs[0])
+    assert store == calcs[:3]
+
+def test_from_columns_keeps_newest_rows():
+    """Tests building a store directly from arrays."""
+    commands = [SubtractCommand(), AddCommand()]
+    store = ColumnarHistory.from_columns(
+        2,
+        np.array([0, 1_000_000_000, 2_000_000_000], dtype=np.int64),
+        np.array([1.0, 2.0, 3.0]),
+        np.array([1.0, 1.0, 1.0]),
+        np.array([0, 1, 0]),
+        commands,
+        np.array([0.0, 3.0, 2.0]),
+    )
+    assert [calc.command_name for calc in store] == ["add", "subtract"]
+    assert store[0].timestamp == datetime(1970, 1, 1, 0, 0, 1)
+    assert list(store.results()) == [3.0, 2.0]
+
+    empty = ColumnarHistory.from_columns(0, *(np.zeros(0) for _ in range(4)), [], np.zeros(0))
+    assert len(empty) == 0
+
+def test_copy_is_independent():
+    """Tests that copies do not share arrays."""
+    calcs = make_calcs(3)
+    store = ColumnarHistory(3, calcs)
+    clone = store.copy()
+    store.append(make_calcs(5)[4])
+    assert clone == calcs
+    assert clone != store
+
+def test_to_frame_matches_to_dict():
+    """Tests that the frame is formatted exactly like Calculation.to_dict."""
+    calcs = make_calcs(3)
+    store = ColumnarHistory(5, calcs)
+    df = store.to_frame()
+    assert df.to_dict("records") == [calc.to_dict() for calc in calcs]
+    assert ColumnarHistory(2).to_frame().empty
+
+def test_too_many_commands():
+    """Tests the limit of the uint8 command table."""
+    store = ColumnarHistory(1)
+    store._codes = {str(i): i for i in range(256)}
+    store._commands = [None] * 256
+    with pytest.raises(ValueError, match="Too many distinct commands"):
+        store.append(make_calcs(1)[0])
@@ -41,7 +41,7 @@ CALCULATOR_DEFAULT_ENCODING="latin-1"
         "history_dir_name": history_dir
     }
 
-def test_config_loader_success(temp_env_setup):
+def test_config_loader_success(temp_env_setup, monkeypatch):
     """Tests successful loading of configuration and directory creation."""
     env_file = temp_env_setup["env_file"]
     project_root = temp_env_setup["project_root"]
@@ -76,6 +76,8 @@ def test_config_loader_success(temp_env_setup):
     # Use the paths obtained from config for comparison
     assert config.get_log_file_path() == log_dir_path / "app.log"
     assert config.get_history_file_path() == history_dir_path / "history.csv"
+    monkeypatch.setenv('CALCULATOR_HISTORY_FORMAT', 'binary')
+    assert config.get_history_file_path() == history_dir_path / "history.bin"
 
 
 
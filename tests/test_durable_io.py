@@ -0,0 +1,82 @@
+"""
+Tests for app/durable_io.py
+"""
+import os
+import stat
+import pytest
+from app.durable_io import FsyncPolicy, atomic_path, ends_mid_line
+from app.exceptions import ConfigError
+
+@pytest.mark.parametrize("mode, every_n, expected", [
+    ("none", 1, [False] * 4),
+    ("flush", 1, [True] * 4),
+    ("every_n", 2, [False, True, False, True]),
+])
+def test_fsync_policy(mode, every_n, expected):
+    """Tests which writes each policy syncs."""
+    policy = FsyncPolicy(mode, every_n)
+    assert [policy.should_sync() for _ in expected] == expected
+    assert policy.mode == mode
+
+def test_invalid_fsync_policy():
+    """Tests that unknown policies and intervals are rejected."""
+    with pytest.raises(ConfigError, match="CALCULATOR_FSYNC_POLICY"):
+        FsyncPolicy("sometimes")
+    with pytest.raises(ConfigError, match="CALCULATOR_FSYNC_EVERY_N"):
+        FsyncPolicy("every_n", 0)
+
+@pytest.mark.parametrize("fsync", [False, True])
+def test_atomic_path_replaces_file(tmp_path, fsync):
+    """Tests that the new contents replace the file and no temp file is left."""
+    path = tmp_path / "history.csv"
+    path.write_text("old")
+    with atomic_path(path, fsync) as tmp:
+        tmp.write_text("new")
+        assert path.read_text() == "old"
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["history.csv"]
+
+def test_atomic_path_keeps_old_file_on_error(tmp_path):
+    """Tests that a failed write leaves the old file untouched."""
+    path = tmp_path / "history.csv"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_path(path) as tmp:
+            tmp.write_text("partial")
+            raise RuntimeError("crash")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["history.csv"]
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions")
+def test_atomic_path_keeps_permissions(tmp_path):
+    """Tests that a replaced file keeps its mode and a new file follows the umask."""
+    path = tmp_path / "history.csv"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+    with atomic_path(path) as tmp:
+        tmp.write_text("new")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+    umask = os.umask(0o027)
+    try:
+        new = tmp_path / "new.csv"
+        with atomic_path(new) as tmp:
+            tmp.write_text("new")
+        assert os.umask(0o027) == 0o027 # Left as it was
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(new).st_mode) == 0o640
+
+@pytest.mark.parametrize("content, expected", [
+    (b"", False),
+    (b"a,b\n1,2\n", False),
+    (b"a,b\n1,2\n3,", True),
+    (b"no newline", True),
+])
+def test_ends_mid_line(tmp_path, content, expected):
+    """Tests the detection of a file that ends mid-line, without modifying it."""
+    path = tmp_path / "history.csv"
+    path.write_bytes(content)
+    assert ends_mid_line(path) is expected
+    assert path.read_bytes() == content
+    assert ends_mid_line(tmp_path / "missing.csv") is False
@@ -0,0 +1,208 @@
+"""
+Tests for app/expression.py
+"""
+import math
+import numpy as np
+import pytest
+from app.expression import ExpressionCompiler, Number, expanded_size, Operation, TableRange, tokenize
+from app.exceptions import InputValidationError, OperationError
+from app.operations import CommandFactory
+
+@pytest.fixture
+def compiler():
+    """Provides a compiler with a small cache."""
+    return ExpressionCompiler(CommandFactory(), cache_size=2)
+
+@pytest.mark.parametrize("source, expected", [
+    ("3 + 4 * 2 ^ 0.5", 3 + 4 * 2 ** 0.5),
+    ("2 ^ 3 ^ 2", 512.0),
+    ("2 ** -1", 0.5),
+    ("-2 ^ 2", -4.0),
+    ("-(3 + 4) * +2", -14.0),
+    ("(1 + 2) * 3 - 4 / 8", 8.5),
+    ("10 // 3 % 2", 1.0),
+    ("1e3 / .5", 2000.0),
+    ("root(27, 3) + abs_diff(2, 7)", 8.0),
+    ("PERCENT(1, 4)", 25.0),
+    ("42", 42.0),
+])
+def test_evaluate(compiler, source, expected):
+    """Tests operator precedence, associativity, unary signs and function calls."""
+    assert math.isclose(compiler.compile(source).evaluate(), expected)
+
+def test_tokenize():
+    """Tests the token kinds."""
+    assert tokenize("root(2.5e1, x) // 3") == [
+        ('name', 'root'), ('op', '('), ('number', '2.5e1'), ('op', ','), ('name', 'x'),
+        ('op', ')'), ('op', '//'), ('number', '3'),
+    ]
+
+def test_tree_keeps_outermost_operation(compiler):
+    """Tests that constants below the outermost operation are folded."""
+    root = compiler.compile("3 + 4 * 2").root
+    assert isinstance(root, Operation) and root.command.name == 'add'
+    assert isinstance(root.left, Number) and root.right.value == 8.0
+    assert isinstance(compiler.compile("-7").root, Number)
+    assert repr(root) == "Operation(add, Number(3.0), Number(8.0))"
+
+@pytest.mark.parametrize("source, message", [
+    ("", "Empty expression"),
+    ("3 +", "Unexpected end"),
+    ("3 $ 4", "Unexpected character '\\$' at position 3"),
+    ("1 2", "Unexpected '2'"),
+    ("(1 + 2", "Unexpected end"),
+    ("* 2", "Unexpected '\\*'"),
+    ("add(1)", "takes 2 argument"),
+    ("add(1 2)", "Expected '\\)'"),
+    ("sqrt(4, 2)", "Unknown function: 'sqrt'"),
+])
+def test_syntax_errors(compiler, source, message):
+    """Tests that malformed expressions are rejected as invalid input."""
+    with pytest.raises(InputValidationError, match=message):
+        compiler.compile(source)
+
+def test_operation_errors(compiler):
+    """Tests that command errors surface as OperationError."""
+    with pytest.raises(OperationError, match="divide by zero"):
+        compiler.compile("1 / 0").evaluate()
+    # Constant subexpressions already fail while compiling
+    with pytest.raises(OperationError, match="divide by zero"):
+        compiler.compile("(1 / 0) + 1")
+
+def test_cache(compiler):
+    """Tests that repeated source text reuses the compiled expression."""
+    first = compiler.compile("1 + 2")
+    assert compiler.compile(" 1 + 2 ") is first
+    compiler.compile("2 + 3")
+    compiler.compile("1 + 2")
+    compiler.compile("3 + 4") # Evicts "2 + 3", the least recently used
+    assert compiler.compile("1 + 2") is first
+    assert (compiler.hits, compiler.misses) == (3, 3)
+    compiler.compile("2 + 3")
+    assert compiler.misses == 4
+
+    compiler.clear()
+    assert compiler.compile("1 + 2") is not first
+    uncached = ExpressionCompiler(CommandFactory(), cache_size=0)
+    assert uncached.compile("1 + 2") is not uncached.compile("1 + 2")
+
+# --- User-Defined Functions ---
+
+def test_define_and_call(compiler):
+    """Tests that functions compile to closures and are inlined into expressions."""
+    f = compiler.define("F(x, Y) = power(x, 2) + y")
+    assert str(f) == "f(x, y) = power(x, 2) + y"
+    assert f.params == ('x', 'y')
+    assert f(3.0, 1.0) == 10.0
+
+    g = compiler.define("g(x) = f(x, 1) * (2 + 2) - 1 / x")
+    assert g(2.0) == 19.5
+    with pytest.raises(OperationError):
+        g(0.0)
+    with pytest.raises(InputValidationError, match="takes 1 argument"):
+        g(1.0, 2.0)
+
+    # Calls are inlined, so the expression is a tree of commands again
+    root = compiler.compile("g(2) + f(1, 1)").root
+    assert root.command.name == 'add' and root.left.value == 19.5
+    assert compiler.compile("2 * f(2, 0)").evaluate() == 8.0
+    assert [function.name for function in compiler.functions] == ['f', 'g']
+
+def test_redefinition_clears_cache(compiler):
+    """Tests that cached expressions do not keep an old definition."""
+    compiler.define("f(x) = x + 1")
+    assert compiler.compile("f(1)").evaluate() == 2.0
+    compiler.define("f(x) = x + 2")
+    assert compiler.compile("f(1)").evaluate() == 3.0
+    assert compiler.function("F").source == "f(x) = x + 2"
+    with pytest.raises(InputValidationError, match="Unknown function"):
+        compiler.function("h")
+
+@pytest.mark.parametrize("source, message", [
+    ("f(x) x + 1", "Expected a definition"),
+    ("f(x, 1) = x", "Expected a definition"),
+    ("add(x, y) = x", "built-in command"),
+    ("f(x, x) = x", "duplicate parameters"),
+    ("f(x) = x + z", "Unknown name: 'z'"),
+    ("f(x) = f(x)", "Unknown function: 'f'"),
+    ("f(x) = power(x)", "takes 2 argument"),
+])
+def test_define_errors(compiler, source, message):
+    """Tests that invalid definitions are rejected."""
+    with pytest.raises(InputValidationError, match=message):
+        compiler.define(source)
+
+def test_nested_calls_are_capped(compiler):
+    """Tests that definitions expanding exponentially are rejected quickly."""
+    compiler.define("f0(x) = x * x")
+    for level in range(1, 13): # f12 expands to 2**13 - 1 = 8191 operations
+        compiler.define(f"f{level}(x) = f{level - 1}(x) * f{level - 1}(x)")
+    assert compiler.function("f12")(1.0) == 1.0
+    with pytest.raises(InputValidationError, match="more than 10000 operations"):
+        compiler.define("f13(x) = f12(x) * f12(x)")
+    with pytest.raises(InputValidationError, match="Expression is too large"):
+        compiler.compile("f12(f12(2))")
+    with pytest.raises(InputValidationError, match="Expression is too large"):
+        compiler.compile("f12(1) + f12(1)")
+    assert expanded_size(compiler.define("g(x) = f0(f0(x)) + 1").body) == 4
+
+def test_long_flat_expression_is_capped(compiler):
+    """Tests that the cap applies to plain input, before anything walks the tree."""
+    with pytest.raises(InputValidationError, match="more than 10000 operations"):
+        compiler.compile("+".join(["1"] * 10_002))
+    with pytest.raises(InputValidationError, match="more than 10000 operations"):
+        compiler.define("f(x) = " + "*".join(["x"] * 10_002))
+
+def test_long_flat_expression(compiler):
+    """Tests that long chains are compiled and evaluated without deep recursion."""
+    assert compiler.compile("+".join(["1"] * 1200)).evaluate() == 1200.0
+    assert compiler.compile("+".join(["1"] * 10_001)).evaluate() == 10_001.0
+    source = "2 * " + " - ".join(["(1 + 1)"] * 3000) # Folded: 1 + 1 is constant
+    assert compiler.compile(source).evaluate() == 4.0 - 2.0 * 2999
+
+    f = compiler.define("f(x) = " + " + ".join(["x"] * 1200))
+    assert not f._shallow and f(0.5) == 600.0
+    results, errors = f.evaluate_array([1.0, 2.0])
+    assert results.tolist() == [1200.0, 2400.0] and not errors.any()
+    g = compiler.define("g(x) = " + " + ".join(["1 / x"] * 100))
+    assert g(4.0) == 25.0
+    results, errors = g.evaluate_array([0.0, 4.0])
+    assert errors.tolist() == [True, False] and results[1] == 25.0
+
+@pytest.mark.parametrize("source", [
+    "(" * 150 + "1" + ")" * 150,
+    "-" * 150 + "1",
+    "^".join(["1"] * 150),
+    "add(" * 150 + "1" + ", 1)" * 150,
+])
+def test_deep_nesting_is_rejected(compiler, source):
+    """Tests that deeply nested input is an input error, not a RecursionError."""
+    with pytest.raises(InputValidationError, match="nested more than 100 levels"):
+        compiler.compile(source)
+    assert compiler.compile("(" * 90 + "2" + ")" * 90).evaluate() == 2.0
+
+def test_evaluate_array(compiler):
+    """Tests vectorized evaluation, including failing elements."""
+    f = compiler.define("f(x, y) = power(x, 2) + y / x")
+    results, errors = f.evaluate_array([1.0, 0.0, 2.0], [1.0, 1.0, 4.0])
+    assert errors.tolist() == [False, True, False]
+    assert results[[0, 2]].tolist() == [2.0, 6.0]
+    assert np.isnan(results[1])
+
+    identity = compiler.define("identity(x) = x")
+    x = np.array([1.0, 2.0])
+    results, errors = identity.evaluate_array(x)
+    assert results.tolist() == [1.0, 2.0] and results is not x
+    assert not errors.any()
+
+    constant = compiler.define("seven() = 3 + 4")
+    assert constant() == 7.0
+    assert constant.evaluate_array()[0].tolist() == [7.0]
+    with pytest.raises(InputValidationError, match="arrays of equal length"):
+        f.evaluate_array([1.0], [1.0, 2.0])
+
+def test_table_range():
+    """Tests that ranges include their end despite rounding."""
+    assert TableRange('x', 0.0, 1.0, 0.1).count == 11
+    assert TableRange('x', 0.0, 1000.0, 0.1).values()[-1] == pytest.approx(1000.0)
+    assert TableRange('x', 5.0, 5.0).values().tolist() == [5.0]
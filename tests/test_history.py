@@ -1,12 +1,15 @@
 """
 Tests for app/history.py (Memento Pattern and Pandas)
 """
+import os
+from datetime import datetime, timedelta, timezone
 import pytest
 import pandas as pd
 from app.history import History
+from app.persistent_history import PersistentHistory
 from app.calculation import Calculation
 from app.operations import AddCommand, SubtractCommand, CommandFactory
-from app.exceptions import HistoryError
+from app.exceptions import ConfigError, HistoryError
 
 # Mock ConfigLoader
 class MockConfig:
@@ -211,6 +214,32 @@ def test_load_nonexistent_file(history, command_factory):
     history.load_history_from_csv(command_factory)
     assert history.get_history() == []
 
+@pytest.mark.parametrize("mode, backend", [("snapshot", "ring"), ("journal", "ring"), ("journal", "columnar")])
+@pytest.mark.parametrize("engine, file_format, content", [
+    ('pandas', 'csv', None), ('pandas', 'csv', ''), ('native', 'csv', ''), ('pandas', 'binary', 'saved'),
+])
+def test_load_empty_is_undoable(config, command_factory, sample_calculations, mode, backend, engine, file_format, content):
+    """Tests that loading a missing or empty file is journaled like any other load."""
+    config._settings.update({
+        'CALCULATOR_UNDO_MODE': mode, 'CALCULATOR_HISTORY_BACKEND': backend,
+        'CALCULATOR_CSV_ENGINE': engine, 'CALCULATOR_HISTORY_FORMAT': file_format,
+    })
+    history = History(config)
+    if content == 'saved':
+        history.save_history_to_csv() # A binary file with a header and no records
+    elif content is not None:
+        path = config.get_history_file_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    for calc in sample_calculations:
+        history.add_calculation(calc)
+    history.load_history_from_csv(command_factory)
+    assert list(history.get_history()) == []
+    history.undo()
+    assert list(history.get_history()) == sample_calculations
+    history.undo()
+    assert list(history.get_history()) == sample_calculations[:1]
+
 def test_load_malformed_file(history, command_factory, config):
     """Tests loading from a malformed CSV."""
     history_file = config.get_history_file_path()
@@ -219,4 +248,511 @@ def test_load_malformed_file(history, command_factory, config):
         f.write("HeaderA,HeaderB\nValueA,ValueB,ValueC") # Wrong number of columns
         
     with pytest.raises(HistoryError, match="Failed to parse history file"):
-        history.load_history_from_csv(command_factory)
\ No newline at end of file
+        history.load_history_from_csv(command_factory)
+
+
+def test_memento_shares_state(history, sample_calculations):
+    """Tests that mementos keep a reference instead of copying the history."""
+    calc1, calc2 = sample_calculations
+    history.add_calculation(calc1)
+    memento = history.create_memento()
+    history.add_calculation(calc2)
+
+    assert memento.get_state() == [calc1]
+    assert memento.get_state()[0] is calc1
+
+# --- Journal Undo Mode Tests ---
+
+@pytest.fixture
+def journal_history(config):
+    """Provides a History instance using the delta journal for undo/redo."""
+    config._settings['CALCULATOR_UNDO_MODE'] = 'journal'
+    return History(config)
+
+def test_journal_undo_redo_with_eviction(journal_history):
+    """Tests that undoing an append restores the evicted calculation."""
+    calcs = [Calculation(i, 1, AddCommand(), i + 1) for i in range(4)]
+    for calc in calcs:
+        journal_history.add_calculation(calc)
+    assert journal_history.get_history() == calcs[1:]
+
+    journal_history.undo()
+    assert journal_history.get_history() == calcs[:3]
+    journal_history.redo()
+    assert journal_history.get_history() == calcs[1:]
+
+    with pytest.raises(HistoryError, match="Nothing to redo"):
+        journal_history.redo()
+
+def test_journal_clear_and_load(journal_history, sample_calculations, command_factory):
+    """Tests undo/redo of clear and load in journal mode."""
+    calc1, calc2 = sample_calculations
+    journal_history.add_calculation(calc1)
+    journal_history.save_history_to_csv()
+    journal_history.add_calculation(calc2)
+
+    journal_history.clear_history()
+    assert journal_history.get_history() == []
+    journal_history.undo()
+    assert journal_history.get_history() == [calc1, calc2]
+    journal_history.redo()
+    assert journal_history.get_history() == []
+
+    journal_history.load_history_from_csv(command_factory)
+    assert len(journal_history.get_history()) == 1
+    journal_history.undo()
+    assert journal_history.get_history() == []
+    journal_history.redo()
+    assert journal_history.get_history()[0].command_name == "add"
+
+def test_journal_memento_round_trip(journal_history, sample_calculations):
+    """Tests that mementos still work in journal mode."""
+    calc1, calc2 = sample_calculations
+    journal_history.add_calculation(calc1)
+    memento = journal_history.create_memento()
+    journal_history.add_calculation(calc2)
+    journal_history.restore_memento(memento)
+    assert journal_history.get_history() == [calc1]
+
+def test_undo_depth_limit(config, sample_calculations):
+    """Tests that the undo stack is bounded by CALCULATOR_MAX_UNDO_DEPTH."""
+    config._settings['CALCULATOR_MAX_UNDO_DEPTH'] = 1
+    history = History(config)
+    for calc in sample_calculations:
+        history.add_calculation(calc)
+    assert len(history._undo_stack) == 1
+
+    history.undo()
+    with pytest.raises(HistoryError, match="Nothing to undo"):
+        history.undo()
+
+def test_invalid_undo_mode(config):
+    """Tests that an unknown undo mode is rejected."""
+    config._settings['CALCULATOR_UNDO_MODE'] = 'bogus'
+    with pytest.raises(ConfigError, match="Invalid CALCULATOR_UNDO_MODE"):
+        History(config)
+
+def test_get_history_stays_valid(history, journal_history, sample_calculations):
+    """Tests that get_history returns an immutable sequence that survives later changes."""
+    for calc in sample_calculations:
+        history.add_calculation(calc)
+        journal_history.add_calculation(calc)
+
+    assert history.get_history() is history._history # Persistent: no copy needed
+    kept = journal_history.get_history()
+    assert isinstance(kept, PersistentHistory)
+    assert kept[0] is sample_calculations[0]
+    journal_history.undo()
+    journal_history.clear_history()
+    assert list(kept) == sample_calculations
+    assert journal_history.get_history() == []
+
+def test_journal_get_history_is_not_copied(journal_history):
+    """Tests that journal-mode get_history is kept in step with adds instead of copied per call."""
+    calcs = [Calculation(i, 1, AddCommand(), i + 1) for i in range(6)]
+    journal_history.add_calculation(calcs[0])
+    first = journal_history.get_history()
+    assert journal_history.get_history() is first
+
+    journal_history.add_calculation(calcs[1])
+    journal_history.add_calculations(calcs[2:5]) # Evicts past the max size of 3
+    second = journal_history.get_history()
+    assert second._log is first._log # Extended in place, not copied
+    assert list(first) == calcs[:1] and list(second) == calcs[2:5]
+
+    journal_history.undo()
+    assert journal_history.get_history() == calcs[:2]
+    journal_history.add_calculation(calcs[5])
+    assert journal_history.get_history() == calcs[:2] + [calcs[5]]
+    assert list(second) == calcs[2:5]
+    assert journal_history.create_memento().get_state() is journal_history.get_history()
+
+def test_append_matches_full_save(history, config):
+    """Tests that appended rows are byte-identical to a full pandas save."""
+    calcs = [Calculation(1.5, 2.0, AddCommand(), 3.5), Calculation(0.1, 0.2, AddCommand(), 0.1 + 0.2)]
+    history_file = config.get_history_file_path()
+
+    history.add_calculation(calcs[0])
+    history.save_history_to_csv()
+    history.add_calculation(calcs[1])
+    history.append_to_csv([calcs[1]])
+    appended = history_file.read_bytes()
+
+    history.save_history_to_csv()
+    assert history_file.read_bytes() == appended
+
+def test_journal_snapshot_is_a_copy(journal_history, sample_calculations):
+    """Tests that journal-mode snapshots survive later changes."""
+    calc1, calc2 = sample_calculations
+    journal_history.add_calculation(calc1)
+    snapshot = journal_history.snapshot()
+    journal_history.add_calculation(calc2)
+    assert snapshot == (calc1,)
+
+def test_load_skips_malformed_rows(history, command_factory, config, caplog):
+    """Tests that malformed rows are dropped and counted while loading."""
+    history_file = config.get_history_file_path()
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    history_file.write_text(
+        "Timestamp,OperandA,OperandB,Command,Result\n"
+        "2024-01-01T10:00:00,1.0,2.0,add,3.0\n"
+        "not-a-date,1.0,2.0,add,3.0\n"
+        "2024-01-01T10:00:01,x,2.0,add,3.0\n"
+        "2024-01-01T10:00:02,1.0,2.0,bogus,3.0\n"
+        "2024-01-01T10:00:03.500000,5.0,3.0,subtract,2.0\n"
+    )
+
+    with caplog.at_level("WARNING", logger="app.history"):
+        history.load_history_from_csv(command_factory)
+
+    loaded = history.get_history()
+    assert [calc.command_name for calc in loaded] == ["add", "subtract"]
+    assert loaded[1].timestamp.microsecond == 500000
+    assert isinstance(loaded[0].operand_a, float)
+    assert history.last_load_skipped == 3
+    assert "Skipped 3 malformed row(s)" in caplog.text
+
+# --- Columnar Backend Tests ---
+
+@pytest.fixture
+def columnar_history(config):
+    """Provides a History instance backed by NumPy columns."""
+    config._settings['CALCULATOR_UNDO_MODE'] = 'journal'
+    config._settings['CALCULATOR_HISTORY_BACKEND'] = 'columnar'
+    return History(config)
+
+def test_columnar_save_load_round_trip(columnar_history, history, command_factory, config):
+    """Tests that the columnar backend saves the same bytes and loads them back."""
+    calcs = [
+        Calculation(1.5, 2.0, AddCommand(), 3.5),
+        Calculation(5.0, 3.0, SubtractCommand(), 2.0),
+    ]
+    for calc in calcs:
+        history.add_calculation(calc)
+        columnar_history.add_calculation(calc)
+    history.save_history_to_csv()
+    expected = config.get_history_file_path().read_bytes()
+    columnar_history.save_history_to_csv()
+    assert config.get_history_file_path().read_bytes() == expected
+
+    columnar_history.clear_history()
+    columnar_history.load_history_from_csv(command_factory)
+    assert columnar_history.get_history() == calcs
+    columnar_history.undo()
+    assert columnar_history.get_history() == []
+    columnar_history.undo()
+    assert columnar_history.get_history() == calcs
+
+def test_invalid_backend(config):
+    """Tests backend validation."""
+    config._settings['CALCULATOR_HISTORY_BACKEND'] = 'columnar'
+    with pytest.raises(ConfigError, match="requires CALCULATOR_UNDO_MODE=journal"):
+        History(config)
+    config._settings['CALCULATOR_HISTORY_BACKEND'] = 'bogus'
+    with pytest.raises(ConfigError, match="Invalid CALCULATOR_HISTORY_BACKEND"):
+        History(config)
+
+# --- Batch Tests ---
+
+def make_batch(start, n):
+    """Creates n distinct calculations starting at operand `start`."""
+    return [Calculation(i, 1, AddCommand(), i + 1) for i in range(start, start + n)]
+
+@pytest.mark.parametrize("mode", ["snapshot", "journal"])
+def test_add_calculations_is_one_action(config, mode):
+    """Tests that a batch is undone and redone as a whole."""
+    config._settings['CALCULATOR_UNDO_MODE'] = mode
+    history = History(config)
+    first = make_batch(0, 2)
+    batch = make_batch(10, 2)
+    history.add_calculations(first)
+    history.add_calculations(batch)
+    history.add_calculations([])
+
+    assert list(history.get_history()) == [first[1]] + batch
+    assert history.eviction_count == 1
+    assert len(history._undo_stack) == 2
+
+    history.undo()
+    assert list(history.get_history()) == first
+    history.redo()
+    assert list(history.get_history()) == [first[1]] + batch
+
+@pytest.mark.parametrize("mode", ["snapshot", "journal"])
+def test_add_calculations_larger_than_history(config, mode):
+    """Tests a batch that overflows the whole history (max size 3)."""
+    config._settings['CALCULATOR_UNDO_MODE'] = mode
+    history = History(config)
+    first = make_batch(0, 2)
+    batch = make_batch(10, 5)
+    history.add_calculations(first)
+    history.add_calculations(batch)
+    assert list(history.get_history()) == batch[2:]
+    assert history.eviction_count == 4
+
+    history.undo()
+    assert list(history.get_history()) == first
+
+# --- Native CSV Engine Tests ---
+
+@pytest.fixture
+def native_history(config):
+    """Provides a History instance using the native CSV engine."""
+    config._settings['CALCULATOR_CSV_ENGINE'] = 'native'
+    return History(config)
+
+def test_native_save_matches_pandas(history, native_history, config):
+    """Tests that the native writer produces the same bytes as pandas."""
+    calcs = [
+        Calculation(1.5, 2.0, AddCommand(), 3.5),
+        Calculation(3, 1, SubtractCommand(), 2),
+        Calculation(0.1, 0.2, AddCommand(), 0.1 + 0.2),
+    ]
+    history_file = config.get_history_file_path()
+    history.save_history_to_csv(calcs)
+    expected = history_file.read_bytes()
+
+    native_history.save_history_to_csv(calcs)
+    assert history_file.read_bytes() == expected
+
+    history.save_history_to_csv([])
+    expected = history_file.read_bytes()
+    native_history.save_history_to_csv([])
+    assert history_file.read_bytes() == expected
+
+def test_native_load_matches_pandas(history, native_history, command_factory, config):
+    """Tests that both engines load the same history and skip the same rows."""
+    history_file = config.get_history_file_path()
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    history_file.write_text(
+        "Timestamp,OperandA,OperandB,Command,Result\n"
+        "2024-01-01T10:00:00,1.0,2.0,add,3.0\n"
+        "not-a-date,1.0,2.0,add,3.0\n"
+        "\n"
+        "2024-01-01T10:00:01,x,2.0,add,3.0\n"
+        "2024-01-01T10:00:02,1.0,2.0,bogus,nan\n"
+        "2024-01-01 10:00:03.500000,5.0,3.0,subtract,2.0\n"
+        "2024-01-01T10:00:04,1.0,1.0,add,2.0\n"
+        "2024-01-01T10:00:05,2.0,1.0,add,3.0\n"
+    )
+    history.load_history_from_csv(command_factory)
+    native_history.load_history_from_csv(command_factory)
+
+    assert list(native_history.get_history()) == list(history.get_history())
+    assert len(native_history.get_history()) == 3 # Trimmed to the max size
+    assert native_history.last_load_skipped == history.last_load_skipped == 3
+    assert len(native_history._undo_stack) == 1
+
+def test_native_load_empty_and_malformed(native_history, command_factory, config):
+    """Tests the native reader on empty, header-only and malformed files."""
+    history_file = config.get_history_file_path()
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+
+    for content in ("", "Timestamp,OperandA,OperandB,Command,Result\n"):
+        history_file.write_text(content)
+        native_history.load_history_from_csv(command_factory)
+        assert native_history.get_history() == []
+        assert len(native_history._undo_stack) == 0
+
+    history_file.write_text("HeaderA,HeaderB\nValueA,ValueB,ValueC")
+    with pytest.raises(HistoryError, match="Failed to parse history file"):
+        native_history.load_history_from_csv(command_factory)
+
+    history_file.write_bytes(b"\xff\xfe\x00bad")
+    with pytest.raises(HistoryError, match="unexpected error"):
+        native_history.load_history_from_csv(command_factory)
+
+def test_native_save_error(native_history, config):
+    """Tests that native write failures surface as HistoryError."""
+    config.get_history_file_path().mkdir(parents=True) # A directory, not a file
+    with pytest.raises(HistoryError, match="Failed to save history"):
+        native_history.save_history_to_csv()
+
+def test_invalid_csv_engine(config):
+    """Tests that an unknown CSV engine is rejected."""
+    config._settings['CALCULATOR_CSV_ENGINE'] = 'excel'
+    with pytest.raises(ConfigError, match="CALCULATOR_CSV_ENGINE"):
+        History(config)
+
+# --- Binary Format Tests ---
+
+@pytest.mark.parametrize("backend", ["ring", "columnar"])
+def test_binary_save_append_and_load(config, command_factory, backend):
+    """Tests saving, appending and loading the newest records of a binary history."""
+    config._settings.update({
+        'CALCULATOR_HISTORY_FORMAT': 'binary',
+        'CALCULATOR_UNDO_MODE': 'journal',
+        'CALCULATOR_HISTORY_BACKEND': backend,
+    })
+    history = History(config)
+    add = command_factory.get_command('add')
+    calcs = [Calculation(float(i), 1.0, add, i + 1.0) for i in range(5)]
+    history.save_history_to_csv(calcs[:4])
+    history.append_to_csv(calcs[4:])
+
+    history.load_history_from_csv(command_factory)
+    assert list(history.get_history()) == calcs[2:] # Newest 3 records only
+    assert history.last_load_skipped == 0
+    assert len(history._undo_stack) == 1
+
+def test_binary_load_errors(config, command_factory):
+    """Tests empty and invalid binary history files."""
+    config._settings['CALCULATOR_HISTORY_FORMAT'] = 'binary'
+    history = History(config)
+    history.save_history_to_csv([])
+    history.load_history_from_csv(command_factory)
+    assert history.get_history() == []
+    assert len(history._undo_stack) == 0
+
+    config.get_history_file_path().write_text("Timestamp,OperandA\n")
+    with pytest.raises(HistoryError, match="not a binary history"):
+        history.load_history_from_csv(command_factory)
+
+def test_binary_save_error(config):
+    """Tests that binary write failures surface as HistoryError."""
+    config._settings['CALCULATOR_HISTORY_FORMAT'] = 'binary'
+    history = History(config)
+    config.get_history_file_path().mkdir(parents=True) # A directory, not a file
+    with pytest.raises(HistoryError, match="Failed to save history"):
+        history.save_history_to_csv()
+    with pytest.raises(HistoryError, match="Failed to append history"):
+        history.append_to_csv([])
+
+def test_invalid_history_format(config):
+    """Tests that an unknown history format is rejected."""
+    config._settings['CALCULATOR_HISTORY_FORMAT'] = 'parquet'
+    with pytest.raises(ConfigError, match="CALCULATOR_HISTORY_FORMAT"):
+        History(config)
+
+# --- Crash Safety Tests ---
+
+@pytest.mark.parametrize("engine", ["pandas", "native"])
+def test_load_skips_truncated_row(config, command_factory, engine, caplog):
+    """Tests that a torn last row is skipped in memory only and that appends stay aligned."""
+    config._settings['CALCULATOR_CSV_ENGINE'] = engine
+    history = History(config)
+    add = command_factory.get_command('add')
+    calcs = [Calculation(1.0, 2.0, add, 3.0), Calculation(2.0, 2.0, add, 4.0)]
+    history.save_history_to_csv(calcs)
+    history_file = config.get_history_file_path()
+    with open(history_file, 'a') as f:
+        f.write("2024-01-01T10:00:00,1.0,2.") # Crashed mid-row
+    torn = history_file.read_bytes()
+
+    history.load_history_from_csv(command_factory)
+    assert list(history.get_history()) == calcs
+    assert history.last_load_skipped == 1
+    assert history_file.read_bytes() == torn # Loading never modifies the file
+
+    history.append_to_csv([calcs[0]])
+    history.load_history_from_csv(command_factory)
+    assert list(history.get_history()) == calcs + [calcs[0]]
+
+    # The next full save drops the torn row
+    history.save_history_to_csv()
+    history.load_history_from_csv(command_factory)
+    assert history.last_load_skipped == 0
+
+@pytest.mark.parametrize("engine", ["pandas", "native"])
+def test_load_keeps_last_row_without_newline(config, command_factory, engine):
+    """Tests that a complete last row without a trailing newline is loaded and kept."""
+    config._settings['CALCULATOR_CSV_ENGINE'] = engine
+    history_file = config.get_history_file_path()
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    content = (
+        "Timestamp,OperandA,OperandB,Command,Result\n"
+        "2024-01-01T00:00:00,1.0,2.0,add,3.0\n"
+        "2024-01-01T00:00:01,2.0,2.0,add,4.0"
+    )
+    history_file.write_text(content)
+    history = History(config)
+    history.load_history_from_csv(command_factory)
+    assert [calc.result for calc in history.get_history()] == [3.0, 4.0]
+    assert history_file.read_text() == content
+
+def test_fsync_policy_is_applied(config, monkeypatch, sample_calculations):
+    """Tests that saves and appends sync according to the configured policy."""
+    config._settings.update({'CALCULATOR_FSYNC_POLICY': 'every_n', 'CALCULATOR_FSYNC_EVERY_N': 2})
+    history = History(config)
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+
+    history.save_history_to_csv(sample_calculations)
+    assert not synced
+    history.append_to_csv(sample_calculations)
+    assert synced # The second write is synced
+    count = len(synced)
+    history.append_to_csv(sample_calculations)
+    assert len(synced) == count
+
+def test_failed_save_keeps_previous_file(history, config, sample_calculations, monkeypatch):
+    """Tests that a save that fails midway leaves the old file intact."""
+    history.save_history_to_csv(sample_calculations)
+    history_file = config.get_history_file_path()
+    before = history_file.read_bytes()
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(pd.DataFrame, "to_csv", crash)
+    with pytest.raises(HistoryError, match="disk full"):
+        history.save_history_to_csv([])
+    assert history_file.read_bytes() == before
+    assert os.listdir(history_file.parent) == ["history.csv"]
+
+# --- Query Tests ---
+
+@pytest.mark.parametrize("mode, backend", [("snapshot", "ring"), ("journal", "ring"), ("journal", "columnar")])
+def test_query_and_count(config, command_factory, mode, backend):
+    """Tests filtered, paged queries on every in-memory backend."""
+    config._settings.update({
+        'CALCULATOR_MAX_HISTORY_SIZE': 10,
+        'CALCULATOR_UNDO_MODE': mode,
+        'CALCULATOR_HISTORY_BACKEND': backend,
+    })
+    history = History(config)
+    add, subtract = command_factory.get_command('add'), command_factory.get_command('subtract')
+    calcs = [
+        Calculation(float(i), 1.0, add if i % 2 else subtract, 0.0, datetime(2024, 1, 1, 10, i))
+        for i in range(6)
+    ]
+    history.add_calculations(calcs)
+
+    assert history.count() == 6
+    assert history.query(offset=4) == calcs[4:]
+    assert history.query(limit=2, newest_first=True) == [calcs[5], calcs[4]]
+    assert history.count(command='add') == 3
+    assert history.query(command='add', offset=1, limit=1) == [calcs[3]]
+    assert history.query(since=datetime(2024, 1, 1, 10, 2), until=datetime(2024, 1, 1, 10, 3)) == calcs[2:4]
+    # The same bounds with an explicit UTC offset select the same calculations
+    offset = timezone(timedelta(hours=5, minutes=30))
+    since = datetime(2024, 1, 1, 10, 2).astimezone(offset)
+    until = datetime(2024, 1, 1, 10, 3).astimezone(offset)
+    assert history.query(since=since, until=until) == calcs[2:4]
+    assert history.query(command='power') == []
+
+@pytest.mark.parametrize("mode, backend", [("snapshot", "ring"), ("journal", "ring"), ("journal", "columnar")])
+def test_results_in_chunks(config, command_factory, mode, backend):
+    """Tests that the result column is streamed in chunks on every in-memory backend."""
+    config._settings.update({'CALCULATOR_UNDO_MODE': mode, 'CALCULATOR_HISTORY_BACKEND': backend})
+    history = History(config)
+    add = command_factory.get_command('add')
+    history.add_calculations([Calculation(float(i), 1.0, add, float(i + 1)) for i in range(5)])
+    assert [chunk.tolist() for chunk in history.results(chunk_size=2)] == [[3.0, 4.0], [5.0]]
+    history.clear_history()
+    assert list(history.results()) == []
+
+@pytest.mark.parametrize("mode, backend", [("snapshot", "ring"), ("journal", "ring"), ("journal", "columnar")])
+def test_zero_capacity_history(config, sample_calculations, mode, backend):
+    """Tests that with a max size of 0 calculations are dropped and undo/redo are no-ops."""
+    config._settings.update({
+        'CALCULATOR_MAX_HISTORY_SIZE': 0, 'CALCULATOR_UNDO_MODE': mode, 'CALCULATOR_HISTORY_BACKEND': backend,
+    })
+    history = History(config)
+    history.add_calculation(sample_calculations[0])
+    history.add_calculations(sample_calculations)
+    assert list(history.get_history()) == []
+    history.undo()
+    history.undo()
+    history.redo()
+    assert list(history.get_history()) == []
+    assert history.eviction_count == 3
@@ -0,0 +1,87 @@
+"""
+Tests for app/history_binary.py
+"""
+from datetime import datetime
+import pytest
+from app.calculation import Calculation
+from app.columnar_history import ColumnarHistory
+from app.history_binary import (
+    HEADER_SIZE, RECORD_DTYPE, BinaryHistoryFile, binary_to_csv, csv_to_binary, write_history_binary,
+)
+from app.history_csv import write_history_csv
+from app.operations import AddCommand, DivideCommand
+
+@pytest.fixture
+def calcs():
+    """Provides calculations with microsecond timestamps."""
+    return [
+        Calculation(float(i), 2.0, AddCommand(), i + 2.0, datetime(2024, 1, 1, 10, 0, i, 250))
+        for i in range(5)
+    ]
+
+def test_write_and_read(tmp_path, calcs):
+    """Tests that records round-trip through a memory-mapped file."""
+    path = tmp_path / "history.bin"
+    write_history_binary(path, calcs)
+    assert path.stat().st_size == HEADER_SIZE + 5 * RECORD_DTYPE.itemsize
+
+    source = BinaryHistoryFile(path, {"add": AddCommand()})
+    assert len(source) == 5
+    assert source[0] == calcs[0]
+    assert source[-1] == calcs[-1]
+    assert source[1:3] == calcs[1:3]
+    with pytest.raises(IndexError):
+        source[5]
+
+def test_append_adds_commands_and_drops_partial_record(tmp_path, calcs):
+    """Tests that appends extend the command table and overwrite a torn record."""
+    path = tmp_path / "history.bin"
+    write_history_binary(path, calcs[:2])
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03") # An interrupted append
+    divide = Calculation(4.0, 2.0, DivideCommand(), 2.0, datetime(2024, 1, 2))
+    write_history_binary(path, [divide], append=True)
+
+    source = BinaryHistoryFile(path, {"add": AddCommand(), "divide": DivideCommand()})
+    assert list(source) == calcs[:2] + [divide]
+
+def test_newest_skips_unknown_commands(tmp_path, calcs):
+    """Tests that only the newest records with known commands are returned."""
+    path = tmp_path / "history.bin"
+    divide = Calculation(4.0, 2.0, DivideCommand(), 2.0, datetime(2024, 1, 2))
+    write_history_binary(path, calcs + [divide])
+
+    source = BinaryHistoryFile(path, {"add": AddCommand()})
+    records, skipped = source.newest(2)
+    assert source.calculations(records) == calcs[-2:]
+    assert skipped == 1
+
+    store = ColumnarHistory.from_columns(2, *source.columns(records))
+    assert list(store) == calcs[-2:]
+
+def test_columnar_store_written_from_columns(tmp_path, calcs):
+    """Tests that a columnar store is written without creating records."""
+    path = tmp_path / "history.bin"
+    write_history_binary(path, ColumnarHistory(3, calcs))
+    assert list(BinaryHistoryFile(path, {"add": AddCommand()})) == calcs[-3:]
+
+def test_invalid_files(tmp_path):
+    """Tests that files that are not binary histories are rejected."""
+    path = tmp_path / "history.bin"
+    path.write_bytes(b"short")
+    with pytest.raises(ValueError, match="too short"):
+        BinaryHistoryFile(path, {})
+    path.write_bytes(b"x" * HEADER_SIZE)
+    with pytest.raises(ValueError, match="Not a binary history"):
+        BinaryHistoryFile(path, {})
+
+def test_csv_conversion_round_trip(tmp_path, calcs):
+    """Tests converting CSV to binary and back gives the same bytes."""
+    csv_path, bin_path = tmp_path / "history.csv", tmp_path / "history.bin"
+    write_history_csv(csv_path, calcs)
+    expected = csv_path.read_bytes()
+    commands = {"add": AddCommand()}
+
+    assert csv_to_binary(csv_path, bin_path, commands) == 0
+    assert binary_to_csv(bin_path, csv_path, commands) == 0
+    assert csv_path.read_bytes() == expected
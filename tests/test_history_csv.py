@@ -0,0 +1,37 @@
+"""
+Tests for app/history_csv.py
+"""
+from datetime import datetime
+from app.calculation import Calculation
+from app.history_csv import calc_to_row, read_history_csv, write_history_csv
+from app.operations import AddCommand, DivideCommand
+
+def test_calc_to_row():
+    """Tests that numbers are written as floats, like pandas does."""
+    calc = Calculation(3, 2, AddCommand(), 5, datetime(2024, 1, 1, 10, 0, 0, 250))
+    assert calc_to_row(calc) == ("2024-01-01T10:00:00.000250", 3.0, 2.0, "add", 5.0)
+
+def test_write_append_and_read(tmp_path):
+    """Tests a write/append/read round trip that keeps only the newest rows."""
+    path = tmp_path / "history.csv"
+    calcs = [Calculation(float(i), 1.0, AddCommand(), i + 1.0) for i in range(4)]
+    write_history_csv(path, calcs[:2])
+    write_history_csv(path, calcs[2:], append=True)
+
+    loaded, skipped, rows = read_history_csv(path, {"add": AddCommand()}, max_rows=3)
+    assert loaded == calcs[1:]
+    assert (skipped, rows) == (0, 4)
+
+def test_read_reordered_columns_and_short_rows(tmp_path):
+    """Tests that columns are matched by name and short or NaN rows are skipped."""
+    path = tmp_path / "history.csv"
+    path.write_text(
+        "Command,Result,OperandA,OperandB,Timestamp\n"
+        "divide,2.0,4.0,2.0,2024-01-01T10:00:00\n"
+        "divide,2.0\n"
+        "divide,nan,4.0,0.0,2024-01-01T10:00:01\n"
+    )
+    divide = DivideCommand()
+    loaded, skipped, rows = read_history_csv(path, {"divide": divide}, max_rows=10)
+    assert loaded == [Calculation(4.0, 2.0, divide, 2.0, datetime(2024, 1, 1, 10))]
+    assert (skipped, rows) == (2, 3)
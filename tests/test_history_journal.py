@@ -0,0 +1,67 @@
+"""
+Tests for app/history_journal.py
+"""
+from collections import deque
+from app.history_journal import AppendEntry, ClearEntry, LoadEntry, UndoStack
+from app.calculation import Calculation
+from app.operations import AddCommand
+
+def make_calcs(n):
+    """Creates n distinct calculations."""
+    return [Calculation(i, 1, AddCommand(), i + 1) for i in range(n)]
+
+def test_entry_sizes():
+    """Tests the number of records each entry holds."""
+    c1, c2, c3 = make_calcs(3)
+    assert AppendEntry(c1).size == 1
+    assert AppendEntry(c1, evicted=c2).size == 2
+    assert ClearEntry(deque([c1, c2]), deque()).size == 2
+    assert LoadEntry((c1,), (c2, c3)).size == 3
+
+def test_append_entry_round_trip():
+    """Tests undo/redo of an append with eviction."""
+    c1, c2, c3 = make_calcs(3)
+    store = deque([c2, c3])
+    entry = AppendEntry(c3, evicted=c1)
+
+    assert entry.undo(store) is store
+    assert list(store) == [c1, c2]
+    assert entry.redo(store) is store
+    assert list(store) == [c2, c3]
+
+def test_replace_entries_swap_stores():
+    """Tests that clear and load entries swap whole stores."""
+    previous, current = deque(make_calcs(2)), deque()
+    entry = ClearEntry(previous, current)
+    assert entry.undo(current) is previous
+    assert entry.redo(previous) is current
+
+def test_undo_stack_depth():
+    """Tests that the oldest entries are dropped past max depth."""
+    stack = UndoStack(max_depth=2)
+    entries = [AppendEntry(c) for c in make_calcs(3)]
+    for entry in entries:
+        stack.append(entry)
+    assert len(stack) == 2
+    assert stack.pop() is entries[2]
+    assert stack.pop() is entries[1]
+
+def test_undo_stack_memory_budget():
+    """Tests that entries are dropped once the record budget is exceeded."""
+    stack = UndoStack(memory_budget=3)
+    c1, c2, c3, c4 = make_calcs(4)
+    stack.append(AppendEntry(c1))
+    stack.append(AppendEntry(c2, evicted=c1))
+    assert stack.records == 3
+    stack.append(AppendEntry(c3))
+    assert len(stack) == 2
+    assert stack.records == 3
+
+    # An entry larger than the budget is still kept on its own
+    stack.append(ClearEntry(deque([c1, c2, c3, c4]), deque()))
+    assert len(stack) == 1
+    assert stack.records == 4
+
+    stack.clear()
+    assert len(stack) == 0
+    assert stack.records == 0
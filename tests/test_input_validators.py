@@ -1,9 +1,12 @@
 """
 Tests for app/input_validators.py
 """
+from datetime import datetime
 import pytest
 from app.input_validators import InputHelper
 from app.exceptions import InputValidationError
+from app.history_query import HistoryQuery
+from app.expression import TableRange
 
 @pytest.fixture
 def validator():
@@ -74,11 +77,84 @@ def test_parse_command_formatting(validator):
     ("add 5 3 1", "requires exactly 2"),
     ("add 5 abc", "is not a valid number"),
     ("add 9999 1", "out of range"),
-    ("history 5", "does not take any arguments"),
-    ("exit 1 2", "does not take any arguments")
+    ("clear 5", "does not take any arguments"),
+    ("exit 1 2", "does not take any arguments"),
+    ("sum", "requires at least 1"),
+    ("mean 1 x", "is not a valid number"),
+    ("max --file", "Usage: max --file"),
+    ("min --file a.txt 3", "Usage: min --file"),
+    ("stats", "Usage: stats"),
+    ("stats a.txt b.txt", "Usage: stats"),
 ])
 def test_parse_command_input_failure(validator, user_input, error_msg):
     """Tests various invalid command input formats."""
     with pytest.raises(InputValidationError) as e:
         validator.parse_command_input(user_input)
-    assert error_msg in str(e.value)
\ No newline at end of file
+    assert error_msg in str(e.value)
+
+def test_parse_history_args(validator):
+    """Tests paging, tailing and filter options of the history command."""
+    assert validator.parse_command_input("history 5 --page 2") == ('history', ['5', '--page', '2'])
+    assert validator.parse_history_args([]) == HistoryQuery()
+    assert validator.parse_history_args(['50']) == HistoryQuery(page_size=50)
+    assert validator.parse_history_args(['--page', '3'], default_page_size=10) == HistoryQuery(page=3, page_size=10)
+    assert validator.parse_history_args(
+        ['--tail', '4', '--command', 'ADD', '--since', '2024-01-01', '--until', '2024-01-02T12:30']
+    ) == HistoryQuery(
+        command='add', since=datetime(2024, 1, 1), until=datetime(2024, 1, 2, 12, 30), tail=4,
+    )
+
+@pytest.mark.parametrize("args, error_msg", [
+    (['0'], "positive whole number"),
+    (['5', '6'], "Unexpected history argument"),
+    (['--page'], "requires a value"),
+    (['--page', 'x'], "positive whole number"),
+    (['--since', 'yesterday'], "ISO timestamp"),
+    (['--sort', 'asc'], "Unknown history option"),
+    (['--tail', '3', '--page', '2'], "cannot be combined"),
+])
+def test_parse_history_args_failure(validator, args, error_msg):
+    """Tests invalid history options."""
+    with pytest.raises(InputValidationError, match=error_msg):
+        validator.parse_history_args(args)
+
+def test_parse_eval(validator):
+    """Tests that 'eval' and 'def' keep the rest of the line as one expression."""
+    assert validator.parse_command_input("EVAL 3 +  4*2") == ('eval', ['3 + 4*2'])
+    assert validator.parse_command_input("def f(x) = x") == ('def', ['f(x) = x'])
+    with pytest.raises(InputValidationError, match="requires an expression"):
+        validator.parse_command_input("eval")
+
+def test_parse_reductions(validator):
+    """Tests that reductions take one or more numbers or '--file PATH'."""
+    assert validator.parse_command_input("SUM 1 2.5 -3") == ('sum', [1.0, 2.5, -3.0])
+    assert validator.parse_command_input("max 7") == ('max', [7.0])
+    assert validator.parse_command_input("mean --file data.txt") == ('mean', ['--file', 'data.txt'])
+    assert validator.parse_command_input("product --file -") == ('product', ['--file', '-'])
+    assert validator.parse_command_input("stats History") == ('stats', ['History'])
+
+def test_parse_table_args(validator):
+    """Tests the range, step and fixed parameters of 'table'."""
+    name, table_range, fixed = validator.parse_table_args(["F", "x=0..10", "step", "0.5", "Y=2"])
+    assert name == 'f'
+    assert table_range == TableRange('x', 0.0, 10.0, 0.5)
+    assert fixed == {'y': 2.0}
+    assert validator.parse_table_args(["f", "x=-1..1"])[1].step == 1.0
+    assert validator.parse_command_input("table f x=0..1") == ('table', ['f', 'x=0..1'])
+
+@pytest.mark.parametrize("args, message", [
+    ([], "Usage: table"),
+    (["f"], "Give one parameter a range"),
+    (["f", "x=0..1", "step"], "requires a value"),
+    (["f", "x"], "Unexpected table argument"),
+    (["f", "x=0..1", "x=2"], "given twice"),
+    (["f", "x=0..1", "y=0..1"], "Only one parameter"),
+    (["f", "x=0..1", "step", "-1"], "must be positive"),
+    (["f", "x=1..0"], "must not end before"),
+    (["f", "x=0..1000", "step", "0.001"], "limit 100000"),
+    (["f", "x=0..abc"], "is not a valid number"),
+])
+def test_parse_table_args_invalid(validator, args, message):
+    """Tests that malformed table arguments are rejected."""
+    with pytest.raises(InputValidationError, match=message):
+        validator.parse_table_args(args)
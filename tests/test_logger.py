@@ -4,18 +4,18 @@ Tests for app/logger.py
 import pytest
 import logging
 from pathlib import Path
-from app.logger import setup_logging
+from app.exceptions import ConfigError
+from app.logger import DeferredQueueHandler, setup_logging, stop_logging
 
 # Use a mock config
 class MockConfig:
     def __init__(self, tmp_path):
         self._log_dir = tmp_path / "test_logs"
         self._log_file = self._log_dir / "app.log"
+        self._settings = {'CALCULATOR_LOG_DIR': self._log_dir}
         
     def get_setting(self, key, default=None):
-        if key == 'CALCULATOR_LOG_DIR':
-            return self._log_dir
-        return default
+        return self._settings.get(key, default)
         
     def get_log_file_path(self):
         return self._log_file
@@ -31,6 +31,7 @@ def test_setup_logging(mock_config):
     # Clear any existing handlers
     logger = logging.getLogger('app')
     logger.handlers = []
+    mock_config._settings['CALCULATOR_LOG_MODE'] = 'direct'
 
     logger = setup_logging(mock_config)
     
@@ -51,4 +52,53 @@ def test_setup_logging(mock_config):
     bad_config = "not a config"
     fallback_logger = setup_logging(bad_config)
     assert fallback_logger.level == logging.INFO
-    fallback_logger.error("Fallback test") # Should not raise an error
\ No newline at end of file
+    fallback_logger.error("Fallback test") # Should not raise an error
+
+def test_setup_queued_logging(mock_config):
+    """Tests that queue mode writes through the listener thread."""
+    logger = logging.getLogger('app')
+    logger.handlers = []
+    mock_config._settings['CALCULATOR_LOG_LEVEL'] = 'debug'
+
+    logger = setup_logging(mock_config)
+    assert logger.level == logging.DEBUG
+    assert [type(h) for h in logger.handlers] == [DeferredQueueHandler]
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Something failed: %s", "details")
+    logger.debug("Debug message %d", 42)
+    stop_logging()
+    stop_logging() # Stopping twice is harmless
+
+    log_content = mock_config.get_log_file_path().read_text()
+    assert "queue mode" in log_content
+    assert "Something failed: details" in log_content
+    assert "ValueError: boom" in log_content
+    assert "Debug message 42" in log_content
+    logger.handlers = []
+
+@pytest.mark.parametrize("key, value, message", [
+    ('CALCULATOR_LOG_MODE', 'thread', "Unknown log mode: 'thread'"),
+    ('CALCULATOR_LOG_LEVEL', 'LOUD', "Unknown log level: 'LOUD'"),
+])
+def test_setup_logging_invalid_settings(mock_config, key, value, message):
+    """Tests that invalid settings raise ConfigError instead of falling back."""
+    logger = logging.getLogger('app')
+    logger.handlers = []
+    mock_config._settings[key] = value
+    with pytest.raises(ConfigError, match=message):
+        setup_logging(mock_config)
+    assert logger.handlers == []
+
+def test_invalid_log_mode_fails_startup(mock_config, monkeypatch, capsys):
+    """Tests that the application exits with a configuration error for an unknown log mode."""
+    import main
+    logging.getLogger('app').handlers = []
+    mock_config._settings['CALCULATOR_LOG_MODE'] = 'thread'
+    monkeypatch.setattr(main, 'ConfigLoader', lambda dotenv_path: mock_config)
+    with pytest.raises(SystemExit) as e:
+        main.main([])
+    assert e.value.code == 1
+    assert "Configuration Error: Unknown log mode: 'thread'" in capsys.readouterr().err
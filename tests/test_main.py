@@ -0,0 +1,54 @@
+"""
+Tests for main.py
+"""
+import logging
+from unittest.mock import MagicMock
+import pytest
+import main
+
+class MockConfig:
+    def __init__(self, tmp_path, **settings):
+        self._tmp_path = tmp_path
+        self._settings = {'CALCULATOR_LOG_MODE': 'direct', 'CALCULATOR_AUTO_SAVE': 'true', **settings}
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_log_file_path(self):
+        return self._tmp_path / "app.log"
+
+    def get_history_file_path(self):
+        return self._tmp_path / "history.csv"
+
+@pytest.fixture
+def run_main(tmp_path, monkeypatch):
+    """Runs main on an empty batch script with the given settings; returns the AutoSaveObserver mock."""
+    observer = MagicMock()
+    monkeypatch.setattr(main, 'AutoSaveObserver', observer)
+    script = tmp_path / "script.txt"
+    script.write_text("")
+
+    def run(**settings):
+        monkeypatch.setattr(main, 'ConfigLoader', lambda dotenv_path: MockConfig(tmp_path, **settings))
+        try:
+            main.main(['--batch', str(script)])
+        finally:
+            logging.getLogger('app').handlers = []
+        return observer
+    return run
+
+@pytest.mark.parametrize("settings, incremental", [
+    ({}, False), # Existing setups keep full saves
+    ({'CALCULATOR_AUTO_SAVE_MODE': 'full'}, False),
+    ({'CALCULATOR_AUTO_SAVE_MODE': 'Incremental'}, True),
+])
+def test_auto_save_mode(run_main, settings, incremental):
+    """Tests that auto-save rewrites the file unless incremental mode is chosen."""
+    observer = run_main(**settings)
+    assert observer.call_args.kwargs['incremental'] is incremental
+
+def test_invalid_auto_save_mode(run_main, capsys):
+    """Tests that an unknown auto-save mode is a configuration error."""
+    with pytest.raises(SystemExit):
+        run_main(CALCULATOR_AUTO_SAVE_MODE='sometimes')
+    assert "Invalid CALCULATOR_AUTO_SAVE_MODE: 'sometimes'" in capsys.readouterr().err
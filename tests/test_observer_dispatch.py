@@ -0,0 +1,94 @@
+"""
+Tests for app/observer_dispatch.py
+"""
+import threading
+from unittest.mock import MagicMock
+import pytest
+from app.observer_dispatch import ObserverQueue
+from app.events import CalculationPerformed, HistoryLoaded, HistorySaved, RedoPerformed, UndoPerformed
+from app.observers import Observer
+
+class RecordingObserver(Observer):
+    """Records events; can be held on a gate to let the queue fill up."""
+    def __init__(self):
+        self.events = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def update(self, subject, event):
+        self.started.set()
+        self.gate.wait()
+        self.events.append(event)
+
+def held_queue(policy, max_size=2):
+    """Returns a queue whose worker is stuck delivering a first event."""
+    observer = RecordingObserver()
+    observer.gate.clear()
+    queue = ObserverQueue(observer, max_size, policy)
+    queue.put(None, HistoryLoaded())
+    observer.started.wait(1)
+    return observer, queue
+
+def test_events_are_delivered_in_order():
+    """Tests ordered delivery and that flush waits for it."""
+    observer = RecordingObserver()
+    queue = ObserverQueue(observer)
+    for i in range(50):
+        queue.put(None, CalculationPerformed(i))
+    queue.flush()
+    assert [event.calculation for event in observer.events] == list(range(50))
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.put(None, UndoPerformed())
+
+def test_drop_oldest():
+    """Tests that a full queue discards its oldest events."""
+    observer, queue = held_queue('drop_oldest')
+    for i in range(1, 5):
+        queue.put(None, CalculationPerformed(i))
+    observer.gate.set()
+    queue.close()
+    assert observer.events == [HistoryLoaded(), CalculationPerformed(3), CalculationPerformed(4)]
+    assert queue.dropped == 2
+
+def test_coalesce():
+    """Tests that a full queue collapses same-type events into the newest."""
+    observer, queue = held_queue('coalesce')
+    queue.put(None, UndoPerformed())
+    queue.put(None, CalculationPerformed(2))
+    queue.put(None, CalculationPerformed(3))
+    observer.gate.set()
+    queue.close()
+    assert observer.events == [HistoryLoaded(), UndoPerformed(), CalculationPerformed(3)]
+    assert queue.coalesced == 1
+
+def test_block_waits_for_room():
+    """Tests that the block policy holds the producer until there is room."""
+    observer, queue = held_queue('block', max_size=1)
+    queue.put(None, UndoPerformed())
+    producer = threading.Thread(target=queue.put, args=(None, RedoPerformed()))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    observer.gate.set()
+    producer.join(1)
+    queue.close()
+    assert [event.name for event in observer.events] == ["history_loaded", "undo", "redo"]
+
+def test_failing_observer_keeps_receiving():
+    """Tests that an exception in update is logged and delivery continues."""
+    observer = MagicMock()
+    observer.update.side_effect = [ValueError("boom"), None]
+    logger = MagicMock()
+    queue = ObserverQueue(observer, logger=logger)
+    queue.put(None, UndoPerformed())
+    queue.put(None, HistorySaved())
+    queue.close()
+    assert observer.update.call_count == 2
+    assert "boom" in logger.error.call_args[0][0]
+
+def test_invalid_policy():
+    """Tests that unknown policies are rejected."""
+    with pytest.raises(ValueError, match="backpressure"):
+        ObserverQueue(MagicMock(), policy='ignore')
@@ -0,0 +1,219 @@
+"""
+Tests for app/observers.py
+"""
+import logging
+import pytest
+import pandas as pd
+from unittest.mock import MagicMock
+from app.observers import LoggingObserver, AutoSaveObserver
+from app.events import (
+    BatchPerformed, CacheStatsReported, CalculationPerformed, ErrorOccurred, HistoryCleared,
+    HistoryLoaded, HistorySaved, RedoPerformed, UndoPerformed,
+)
+from app.history import History
+from app.calculation import Calculation
+from app.operations import AddCommand, CommandFactory
+from app.exceptions import HistoryError
+
+class MockConfig:
+    def __init__(self, tmp_path):
+        self._history_file_path = tmp_path / "data" / "history.csv"
+        self._settings = {
+            'CALCULATOR_MAX_HISTORY_SIZE': 3,
+            'CALCULATOR_DEFAULT_ENCODING': 'utf-8'
+        }
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_history_file_path(self):
+        return self._history_file_path
+
+@pytest.fixture
+def history(tmp_path):
+    """Provides a real History writing into tmp_path."""
+    return History(MockConfig(tmp_path))
+
+def make_calc(i):
+    """Creates a distinct calculation."""
+    return Calculation(float(i), 1.0, AddCommand(), i + 1.0)
+
+def perform(history, observer, calc):
+    """Adds a calculation and notifies the observer like the Calculator does."""
+    history.add_calculation(calc)
+    observer.update(None, CalculationPerformed(calc))
+
+def read_rows(history):
+    """Reads the saved CSV file back with pandas."""
+    return pd.read_csv(history._history_file_path)
+
+def logged(method) -> str:
+    """Returns the message of the last call to a mocked logger method."""
+    template, *args = method.call_args[0]
+    return template % tuple(args)
+
+def test_logging_observer_events():
+    """Tests that the logging observer logs each event type."""
+    logger = MagicMock()
+    observer = LoggingObserver(logger)
+    calc = make_calc(1)
+
+    observer.update(None, CalculationPerformed(calc))
+    assert logged(logger.info) == f"New Calculation: {calc}"
+    observer.update(None, ErrorOccurred(ValueError("boom")))
+    assert logged(logger.warning) == "Operation Error: boom"
+    for event in (HistoryCleared(), HistoryLoaded(), HistorySaved(), UndoPerformed(), RedoPerformed()):
+        observer.update(None, event)
+    observer.update(None, CacheStatsReported("1 hits"))
+    assert logger.info.call_count == 7
+    assert logged(logger.info) == "Result cache: 1 hits"
+
+def test_auto_save_full_rewrites(history):
+    """Tests that full mode rewrites the file on every calculation."""
+    history.save_history_to_csv = MagicMock(wraps=history.save_history_to_csv)
+    history.append_to_csv = MagicMock(wraps=history.append_to_csv)
+    observer = AutoSaveObserver(history)
+
+    perform(history, observer, make_calc(1))
+    perform(history, observer, make_calc(2))
+    assert history.save_history_to_csv.call_count == 2
+    history.append_to_csv.assert_not_called()
+    assert len(read_rows(history)) == 2
+
+def test_auto_save_incremental_appends(history):
+    """Tests that incremental mode appends rows after the first full save."""
+    history.save_history_to_csv = MagicMock(wraps=history.save_history_to_csv)
+    observer = AutoSaveObserver(history, incremental=True)
+
+    for i in range(3):
+        perform(history, observer, make_calc(i))
+    # Only the first save needs a full rewrite
+    assert history.save_history_to_csv.call_count == 1
+    df = read_rows(history)
+    assert list(df["OperandA"]) == [0.0, 1.0, 2.0]
+
+    # Structural events rewrite the file
+    history.undo()
+    observer.update(None, UndoPerformed())
+    assert history.save_history_to_csv.call_count == 2
+    assert list(read_rows(history)["OperandA"]) == [0.0, 1.0]
+
+def test_auto_save_incremental_compaction(history, tmp_path):
+    """Tests that evicted rows are compacted once they exceed the max size."""
+    history.save_history_to_csv = MagicMock(wraps=history.save_history_to_csv)
+    observer = AutoSaveObserver(history, incremental=True)
+
+    for i in range(6):
+        perform(history, observer, make_calc(i))
+    # 3 evictions so far: stale rows stay in the file until they exceed the max size
+    assert history.save_history_to_csv.call_count == 1
+    assert len(read_rows(history)) == 6
+
+    perform(history, observer, make_calc(6))
+    assert history.save_history_to_csv.call_count == 2
+    assert list(read_rows(history)["OperandA"]) == [4.0, 5.0, 6.0]
+
+    # Loading keeps only the newest rows, even with stale ones in the file
+    perform(history, observer, make_calc(7))
+    loaded = History(MockConfig(tmp_path))
+    loaded.load_history_from_csv(CommandFactory())
+    assert [c.operand_a for c in loaded.get_history()] == [5.0, 6.0, 7.0]
+
+def test_auto_save_manual_save_resyncs(history):
+    """Tests that a manual save lets incremental mode append again."""
+    history.append_to_csv = MagicMock(wraps=history.append_to_csv)
+    observer = AutoSaveObserver(history, incremental=True)
+
+    history.add_calculation(make_calc(1))
+    history.save_history_to_csv()
+    observer.update(None, HistorySaved())
+    perform(history, observer, make_calc(2))
+    history.append_to_csv.assert_called_once()
+    assert len(read_rows(history)) == 2
+
+def test_auto_save_error_falls_back_to_rewrite(history):
+    """Tests that a failed save forces the next save to rewrite the file."""
+    observer = AutoSaveObserver(history, incremental=True)
+    perform(history, observer, make_calc(1))
+
+    history.append_to_csv = MagicMock(side_effect=HistoryError("disk full"))
+    perform(history, observer, make_calc(2))
+    assert observer._in_sync is False
+
+    history.append_to_csv.reset_mock()
+    perform(history, observer, make_calc(3))
+    history.append_to_csv.assert_not_called()
+    assert len(read_rows(history)) == 3
+
+def test_append_to_csv_error(history):
+    """Tests that append failures are reported as HistoryError."""
+    history._history_file_path = history._history_file_path.parent / "missing" / "history.csv"
+    with pytest.raises(HistoryError, match="Failed to append history"):
+        history.append_to_csv([make_calc(1)])
+
+def test_auto_save_write_behind(history):
+    """Tests that write-behind mode defers saving until flushed."""
+    observer = AutoSaveObserver(history, incremental=True, write_behind=True, flush_interval=60)
+
+    perform(history, observer, make_calc(1))
+    perform(history, observer, make_calc(2))
+    assert not history._history_file_path.exists()
+
+    observer.flush()
+    assert list(read_rows(history)["OperandA"]) == [1.0, 2.0]
+
+    history.clear_history()
+    observer.update(None, HistoryCleared())
+    perform(history, observer, make_calc(3))
+    observer.close()
+    assert list(read_rows(history)["OperandA"]) == [3.0]
+
+    # Closing twice is harmless
+    observer.close()
+    observer.flush()
+
+def test_snapshot_is_immutable(history):
+    """Tests that snapshots taken for background saves do not change."""
+    history.add_calculation(make_calc(1))
+    snapshot = history.snapshot()
+    history.add_calculation(make_calc(2))
+    assert len(snapshot) == 1
+
+def test_auto_save_batch(history):
+    """Tests that a batch is appended with a single write in incremental mode."""
+    history.append_to_csv = MagicMock(wraps=history.append_to_csv)
+    observer = AutoSaveObserver(history, incremental=True)
+    perform(history, observer, make_calc(0))
+
+    batch = MagicMock()
+    batch.calculations = [make_calc(1), make_calc(2)]
+    history.add_calculations(batch.calculations)
+    observer.update(None, BatchPerformed(batch))
+    history.append_to_csv.assert_called_once_with(batch.calculations)
+    assert list(read_rows(history)["OperandA"]) == [0.0, 1.0, 2.0]
+
+def test_logging_observer_batch():
+    """Tests that a batch is logged as one summary line."""
+    logger = MagicMock()
+    batch = MagicMock()
+    batch.results = [1.0, 2.0]
+    batch.error_count = 1
+    LoggingObserver(logger).update(None, BatchPerformed(batch))
+    logger.info.assert_called_once()
+    assert logged(logger.info) == "Batch of 2 calculations performed (1 failed)."
+
+def test_auto_save_ignores_other_events(history):
+    """Tests that events outside the subscriptions do not trigger a save."""
+    history.save_history_to_csv = MagicMock()
+    observer = AutoSaveObserver(history)
+    observer.update(None, ErrorOccurred(ValueError("boom")))
+    history.save_history_to_csv.assert_not_called()
+    assert not issubclass(ErrorOccurred, AutoSaveObserver.subscriptions)
+
+def test_logging_observer_is_lazy():
+    """Tests that the event message is not built when INFO is disabled."""
+    logger = logging.getLogger('test_lazy')
+    logger.setLevel(logging.WARNING)
+    event = MagicMock()
+    LoggingObserver(logger).update(None, event)
+    event.__str__.assert_not_called()
@@ -1,8 +1,10 @@
 """
 Tests for app/operations.py
 """
+import math
+import numpy as np
 import pytest
-from app.operations import CommandFactory
+from app.operations import Command, CommandFactory
 from app.exceptions import OperationError
 
 @pytest.fixture
@@ -34,6 +36,21 @@ def test_factory_get_available_commands(factory):
     }
     available_commands = set(factory.get_available_commands())
     assert available_commands == expected_commands
+    table = factory.get_command_table()
+    assert set(table) == expected_commands | {'min', 'max'}
+    assert table['add'] is factory.get_command('add')
+
+def test_reduction_steps_are_not_binary_commands(factory):
+    """Tests that min and max only resolve as the recorded steps of reductions."""
+    for name in ('min', 'max'):
+        with pytest.raises(OperationError, match=f"Unknown command: '{name}'"):
+            factory.get_command(name)
+    assert factory.get_recorded_command('min').execute(3, -2) == -2
+    assert factory.get_recorded_command('max').execute(3, -2) == 3
+    assert factory.get_recorded_command('add') is factory.get_command('add')
+    assert factory.get_command_table()['min'] is factory.get_recorded_command('min')
+    with pytest.raises(OperationError, match="Unknown command: 'median'"):
+        factory.get_recorded_command('median')
 
 # --- Test Each Operation ---
 # Use pytest.mark.parametrize for efficient testing
@@ -80,10 +97,82 @@ def test_all_operations_success(factory, cmd_name, a, b, expected):
     ('root', 10, 0, "Cannot calculate the 0th root"),
     ('root', -4, 2, "Cannot calculate an even root of a negative number"),
     ('power', -1, 0.5, "Math error"), # math.pow(-1, 0.5) is a ValueError
+    ('power', 10, 400, "Math error"), # math.pow(10, 400) is an OverflowError
+    ('root', 1e300, 0.01, "Math error"),
 ])
 def test_all_operations_errors(factory, cmd_name, a, b, error_msg):
     """Tests calculations that should raise OperationError."""
     command = factory.get_command(cmd_name)
     with pytest.raises(OperationError) as e:
         command.execute(a, b)
-    assert error_msg in str(e.value)
\ No newline at end of file
+    assert error_msg in str(e.value)
+class FailingOddCommand(Command):
+    """A command without its own kernel, to exercise the fallback."""
+    @property
+    def name(self) -> str: return "failing_odd"
+
+    def execute(self, a: float, b: float) -> float:
+        if a % 2:
+            raise OperationError("odd")
+        return a + b
+
+def test_execute_array_fallback():
+    """Tests the per-element fallback kernel, including failing elements."""
+    results, errors = FailingOddCommand().execute_array(
+        np.array([10.0, 1.0, 4.0]), np.array([2.0, 0.0, 3.0])
+    )
+    assert list(errors) == [False, True, False]
+    assert results[0] == 12.0 and results[2] == 7.0
+    assert np.isnan(results[1])
+
+KERNEL_OPERANDS = [
+    -8.0, -4.0, -2.5, -1.0, -0.5, -0.0, 0.0, 0.5, 1.0, 2.0, 3.0, 4.0, 7.5, 1000.0,
+    -1024.0, 1024.0, 1e-308, 5e-324, -1e308, 1e308, -np.inf, np.inf,
+]
+
+def same_float(x, y, ulps=0):
+    """
+    Equal values to within ``ulps`` units in the last place, with NaN equal
+    to NaN, infinities exact and 0.0 distinct from -0.0.
+    """
+    if np.isnan(x) or np.isnan(y):
+        return np.isnan(x) and np.isnan(y)
+    if x == 0 or y == 0 or np.isinf(x) or np.isinf(y):
+        return x == y and np.copysign(1.0, x) == np.copysign(1.0, y)
+    return abs(x - y) <= ulps * np.spacing(abs(y))
+
+# NumPy's SIMD pow may round differently from math.pow
+KERNEL_ULPS = {'power': 1, 'root': 1}
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("cmd_name", [
+    'add', 'subtract', 'multiply', 'divide', 'power', 'root',
+    'modulus', 'int_divide', 'percent', 'abs_diff'
+])
+def test_execute_array_kernels(factory, cmd_name):
+    """Tests every vectorized kernel against the scalar path (bit for bit but for pow), without warnings."""
+    command = factory.get_command(cmd_name)
+    pairs = [(x, y) for x in KERNEL_OPERANDS for y in KERNEL_OPERANDS]
+    a = np.array([x for x, _ in pairs])
+    b = np.array([y for _, y in pairs])
+    results, errors = command.execute_array(a, b)
+
+    for (x, y), result, error in zip(pairs, results.tolist(), errors.tolist()):
+        try:
+            expected = command.execute(x, y)
+        except OperationError:
+            assert error, (x, y)
+            assert np.isnan(result)
+        else:
+            assert not error, (x, y)
+            assert same_float(result, float(expected), KERNEL_ULPS.get(cmd_name, 0)), (x, y, result, expected)
+
+def test_power_kernel_within_one_ulp(factory):
+    """Tests the vectorized power against math.pow over random operands."""
+    rng = np.random.default_rng(3)
+    a = np.abs(rng.normal(0, 100, 20_000))
+    b = rng.uniform(-30, 30, 20_000)
+    results, errors = factory.get_command('power').execute_array(a, b)
+    expected = np.array([math.pow(x, y) for x, y in zip(a.tolist(), b.tolist())])
+    assert not errors.any()
+    assert np.all(np.abs(results - expected) <= np.spacing(np.abs(expected)))
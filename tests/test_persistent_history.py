@@ -0,0 +1,87 @@
+"""
+Tests for app/persistent_history.py
+"""
+import pytest
+from app.persistent_history import PersistentHistory
+from app.calculation import Calculation
+from app.operations import AddCommand
+
+def make_calcs(n):
+    """Creates n distinct calculations."""
+    return [Calculation(i, 1, AddCommand(), i + 1) for i in range(n)]
+
+def test_append_returns_new_version():
+    """Tests that appending never changes an existing version."""
+    c1, c2 = make_calcs(2)
+    empty = PersistentHistory()
+    one = empty.append(c1)
+    two = one.append(c2)
+
+    assert list(empty) == []
+    assert list(one) == [c1]
+    assert list(two) == [c1, c2]
+    # The two versions share the same underlying log
+    assert one._log is two._log
+
+def test_append_to_older_version_forks():
+    """Tests that appending to a non-latest version does not affect others."""
+    c1, c2, c3 = make_calcs(3)
+    one = PersistentHistory().append(c1)
+    two = one.append(c2)
+    branch = one.append(c3)
+
+    assert list(two) == [c1, c2]
+    assert list(branch) == [c1, c3]
+
+def test_append_with_max_size_evicts_oldest():
+    """Tests eviction when max_size is exceeded."""
+    calcs = make_calcs(5)
+    version = PersistentHistory()
+    for calc in calcs:
+        version = version.append(calc, max_size=3)
+    assert list(version) == calcs[2:]
+
+def test_compaction_keeps_contents():
+    """Tests that dropping dead entries keeps the live window intact."""
+    calcs = make_calcs(200)
+    version = PersistentHistory()
+    snapshots = []
+    for calc in calcs:
+        version = version.append(calc, max_size=10)
+        snapshots.append(version)
+
+    assert list(version) == calcs[-10:]
+    # The log never holds more than twice the live window plus the threshold
+    assert len(version._log) <= 2 * 10 + 32
+    # Old snapshots are unaffected by compaction
+    assert list(snapshots[50]) == calcs[41:51]
+
+def test_cleared():
+    """Tests that clearing returns an empty version."""
+    version = PersistentHistory(make_calcs(3))
+    assert len(version.cleared()) == 0
+    assert len(version) == 3
+
+def test_indexing_and_slicing():
+    """Tests sequence access."""
+    calcs = make_calcs(5)
+    version = PersistentHistory(calcs)
+
+    assert version[0] == calcs[0]
+    assert version[-1] == calcs[-1]
+    assert version[1:3] == calcs[1:3]
+    assert isinstance(version[1:3], PersistentHistory)
+    assert version[::2] == calcs[::2]
+    assert version[3:1] == []
+    with pytest.raises(IndexError):
+        version[5]
+
+def test_equality():
+    """Tests comparison with other sequences."""
+    calcs = make_calcs(2)
+    version = PersistentHistory(calcs)
+    assert version == calcs
+    assert version == tuple(calcs)
+    assert version != calcs[:1]
+    assert version != "not a history"
+    assert repr(PersistentHistory()) == "PersistentHistory([])"
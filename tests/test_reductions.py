@@ -0,0 +1,67 @@
+"""
+Tests for app/reductions.py
+"""
+import math
+from io import StringIO
+import numpy as np
+import pytest
+from app.reductions import REDUCTIONS, ReductionResult, chunk_values, read_numbers, reduce_chunks
+from app.exceptions import InputValidationError, OperationError
+
+VALUES = [4.0, -2.5, 7.0, 0.5, 3.0]
+
+def test_chunk_values():
+    """Tests that values are grouped into float arrays of the chunk size."""
+    chunks = list(chunk_values(VALUES, chunk_size=2))
+    assert [chunk.tolist() for chunk in chunks] == [[4.0, -2.5], [7.0, 0.5], [3.0]]
+    assert all(chunk.dtype == np.float64 for chunk in chunks)
+    assert list(chunk_values([], chunk_size=2)) == []
+
+def test_read_numbers_across_blocks():
+    """Tests that numbers split between read blocks are put back together."""
+    text = "1.25, 2e3\n-7  4,5\n" * 500 + "123456.5"
+    chunks = list(read_numbers(StringIO(text), chunk_size=1)) # 4096-character blocks
+    assert len(chunks) > 1
+    values = np.concatenate(chunks).tolist()
+    assert values == [1.25, 2000.0, -7.0, 4.0, 5.0] * 500 + [123456.5]
+
+def test_read_numbers_invalid_token():
+    """Tests that a token that is not a number is reported."""
+    with pytest.raises(InputValidationError, match="'abc' is not a valid number"):
+        list(read_numbers(StringIO("1 2 abc 3")))
+
+@pytest.mark.parametrize("name, expected", [
+    ('sum', ReductionResult('sum', 5, 12.0, 'add', 9.0, 3.0)),
+    ('product', ReductionResult('product', 5, -105.0, 'multiply', -35.0, 3.0)),
+    ('min', ReductionResult('min', 5, -2.5, 'min', -2.5, 3.0)),
+    ('max', ReductionResult('max', 5, 7.0, 'max', 7.0, 3.0)),
+    ('mean', ReductionResult('mean', 5, 2.4, 'divide', 12.0, 5.0)),
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_reduce_chunks(name, expected, chunk_size):
+    """Tests each reduction and its final two-operand step, whatever the chunking."""
+    assert reduce_chunks(name, chunk_values(VALUES, chunk_size)) == expected
+
+@pytest.mark.parametrize("name", REDUCTIONS)
+def test_reduce_single_value(name):
+    """Tests that a single value reduces to itself."""
+    outcome = reduce_chunks(name, chunk_values([6.0]))
+    assert (outcome.count, outcome.value) == (1, 6.0)
+
+def test_sum_is_compensated():
+    """Tests that the sum across chunks does not lose small values."""
+    assert reduce_chunks('sum', chunk_values([1e16, 1.0, -1e16], chunk_size=1)).value == 1.0
+    values = [0.1] * 100_000
+    assert reduce_chunks('sum', chunk_values(values, chunk_size=7)).value == math.fsum(values)
+
+@pytest.mark.parametrize("name, chunks, error, message", [
+    ('sum', [], OperationError, "'sum' needs at least one number"),
+    ('median', [np.array([1.0])], OperationError, "Unknown reduction: 'median'"),
+    ('sum', [np.array([1.0, np.inf])], InputValidationError, "not a finite number"),
+    ('product', [np.array([1e200, 1e200])], OperationError, "product of these numbers is out of range"),
+    ('sum', [np.array([1.7e308, 1.7e308])], OperationError, "sum of these numbers is out of range"),
+])
+def test_reduce_chunks_errors(name, chunks, error, message):
+    """Tests empty, unknown, non-finite and overflowing reductions."""
+    with pytest.raises(error, match=message):
+        reduce_chunks(name, chunks)
@@ -2,6 +2,8 @@
 Tests for app/repl.py
 """
 import sys
+from dataclasses import replace
+import numpy as np
 import pytest
 from unittest.mock import MagicMock, Mock
 from io import StringIO
@@ -9,6 +11,8 @@ from app.repl import REPL
 from app.calculator import Calculator
 from app.calculator_config import ConfigLoader
 from app.exceptions import HistoryError
+from app.expression import TableRange
+from app.stream_stats import StatisticsSummary
 
 @pytest.fixture
 def mock_calculator():
@@ -66,13 +70,84 @@ def test_repl_arithmetic_commands(repl, mock_calculator):
     output = run_repl_commands(repl, commands)
     assert "Result: 2.5000" in output
 
+def test_repl_eval(repl, mock_calculator):
+    """Tests that 'eval' hands the expression to the calculator."""
+    mock_calculator.evaluate_expression.return_value = 8.65685
+    output = run_repl_commands(repl, ["eval 3 + 4 * 2 ^ 0.5", "exit"])
+    mock_calculator.evaluate_expression.assert_called_once_with("3 + 4 * 2 ^ 0.5")
+    assert "Result: 8.6569" in output
+
+def test_repl_functions_and_table(repl, mock_calculator):
+    """Tests 'def', 'functions' and 'table'."""
+    mock_calculator.define_function.return_value = "f(x) = 1 / x"
+    mock_calculator.get_functions.return_value = []
+    mock_calculator.tabulate.return_value = (
+        np.array([0.0, 0.5]), np.array([np.nan, 2.0]), np.array([True, False])
+    )
+    output = run_repl_commands(repl, ["def f(x) = 1 / x", "functions", "table f x=0..0.5 step 0.5", "exit"])
+    mock_calculator.define_function.assert_called_once_with("f(x) = 1 / x")
+    assert "Defined f(x) = 1 / x" in output
+    assert "No functions defined." in output
+    mock_calculator.tabulate.assert_called_once_with('f', TableRange('x', 0.0, 0.5, 0.5), {})
+    assert "0 | error" in output
+    assert "0.5000 | 2" in output
+
+    repl.is_running = True
+    mock_calculator.get_functions.return_value = ["f(x) = 1 / x"]
+    output = run_repl_commands(repl, ["functions", "exit"])
+    assert "  f(x) = 1 / x" in output
+
+def test_repl_reductions(repl, mock_calculator, tmp_path, monkeypatch):
+    """Tests the reductions with numbers, a file and stdin."""
+    mock_calculator.reduce.return_value = 6.0
+    output = run_repl_commands(repl, ["sum 1 2 3", "exit"])
+    mock_calculator.reduce.assert_called_once_with('sum', (1.0, 2.0, 3.0))
+    assert "Result: 6" in output
+
+    repl.is_running = True
+    numbers = tmp_path / "numbers.txt"
+    numbers.write_text("1 2\n3\n", encoding='utf-8')
+    mock_calculator.reduce.side_effect = lambda name, stream: float(len(stream.read().split()))
+    out = StringIO()
+    monkeypatch.setattr('sys.stdin', StringIO("4 5"))
+    report = repl.run_batch(
+        [f"mean --file {numbers}", "max --file -", f"min --file {tmp_path / 'missing.txt'}"], out
+    )
+    assert out.getvalue().splitlines()[:2] == ["Result: 3", "Result: 2"]
+    assert "Line 3: Error: Cannot read" in out.getvalue()
+    assert report.errors == 1
+
+def test_repl_stats(repl, mock_calculator, tmp_path, monkeypatch):
+    """Tests 'stats' over the history, a file and stdin."""
+    summary = StatisticsSummary(4, 2.5, 1.25, 1.0, 4.0, {0.5: 2.0, 0.99: 4.0}, 0.01)
+    mock_calculator.describe_history.return_value = summary
+    output = run_repl_commands(repl, ["stats history", "exit"])
+    assert "--- Statistics of history results ---" in output
+    assert "variance  1.2500" in output
+    assert "p50      ~2" in output
+    assert "p99      ~4" in output
+    assert "within 1% relative error" in output
+
+    repl.is_running = True
+    numbers = tmp_path / "numbers.txt"
+    numbers.write_text("1 2 3 4", encoding='utf-8')
+    mock_calculator.describe.side_effect = lambda stream: replace(summary, count=len(stream.read().split()))
+    monkeypatch.setattr('sys.stdin', StringIO("5 6"))
+    out = StringIO()
+    repl.run_batch([f"stats {numbers}", "stats -"], out)
+    assert f"--- Statistics of {numbers} ---" in out.getvalue()
+    assert "count     4" in out.getvalue()
+    assert "--- Statistics of stdin ---" in out.getvalue()
+    assert "count     2" in out.getvalue()
+
 def test_repl_history_commands(repl, mock_calculator):
     """Tests history, clear, undo, redo."""
     
     # Mock return value for history
     mock_calculation = MagicMock()
     mock_calculation.__str__.return_value = "[Test] 1 + 1 = 2"
-    mock_calculator.get_history.return_value = [mock_calculation]
+    mock_calculator.count_history.return_value = 1
+    mock_calculator.query_history.return_value = [mock_calculation]
     
     commands = ["history", "clear", "undo", "redo", "exit"]
     output = run_repl_commands(repl, commands)
@@ -86,11 +161,37 @@ def test_repl_history_commands(repl, mock_calculator):
     
     # Test empty history
     repl.is_running = True
-    mock_calculator.get_history.return_value = []
+    mock_calculator.count_history.return_value = 0
     commands = ["history", "exit"]
     output = run_repl_commands(repl, commands)
     assert "History is empty" in output
 
+def test_repl_history_paging_and_filters(repl, mock_calculator):
+    """Tests that history pages, tails and filters fetch only the shown records."""
+    mock_calculator.count_history.return_value = 45
+    mock_calculator.query_history.return_value = ["record-a", "record-b"]
+    out = StringIO()
+    repl.run_batch([
+        "history 20 --page 3",
+        "history --tail 2 --command add",
+        "history --page 9",
+        "history --since 2024-01-01T00:00",
+    ], out)
+    output = out.getvalue()
+
+    assert "--- Calculation History (page 3/3, 45 records) ---\n  record-a\n  record-b" in output
+    assert "--- Calculation History (last 2 of 45) ---" in output
+    assert "Page 9 is out of range (3 page(s))." in output
+    assert mock_calculator.query_history.call_args_list[:2] == [
+        ((None, None, None, 40, 5),),
+        (('add', None, None, 43, 2),),
+    ]
+
+    mock_calculator.count_history.return_value = 0
+    out = StringIO()
+    repl.run_batch(["history --command power"], out)
+    assert "No matching calculations." in out.getvalue()
+
 def test_repl_persistence_commands(repl, mock_calculator, mock_config):
     """Tests save and load."""
     mock_config.get_history_file_path.return_value = "fake/path/history.csv"
@@ -133,4 +234,60 @@ def test_repl_invalid_input(repl, mock_calculator):
     assert "is not a valid number" in output
     assert "Unknown command: 'fakecmd'" in output
     # Ensure no calculator commands were called
-    mock_calculator.execute_command.assert_not_called()
\ No newline at end of file
+    mock_calculator.execute_command.assert_not_called()
+def test_repl_run_batch(repl, mock_calculator):
+    """Tests batch mode: no prompts or colors, comments skipped, errors counted."""
+    mock_calculator.execute_command.side_effect = [3.0, 2.5]
+    mock_calculator.undo.side_effect = HistoryError("Nothing to undo")
+    script = StringIO("# replay\nadd 1 2\n\ndivide 5 2\nundo\nfakecmd\nexit\nadd 9 9\n")
+    out = StringIO()
+
+    report = repl.run_batch(script, out)
+
+    assert out.getvalue().splitlines() == [
+        "Result: 3",
+        "Result: 2.5000",
+        "Line 5: Error: Nothing to undo",
+        "Line 6: Error: Unknown command: 'fakecmd'",
+    ]
+    assert report.commands == 5 # Stops at 'exit'
+    assert report.errors == 2
+    assert report.throughput > 0
+    assert "Processed 5 commands (2 failed)" in str(report)
+    assert "\x1b[" not in out.getvalue()
+
+def test_repl_run_batch_buffers_output(repl, mock_calculator, monkeypatch):
+    """Tests that batch output is written in chunks, and colors are restored."""
+    monkeypatch.setattr(REPL, 'BATCH_FLUSH_LINES', 2)
+    mock_calculator.execute_command.return_value = 1.0
+    out = MagicMock()
+
+    repl.run_batch(["add 1 0"] * 5, out)
+
+    assert out.write.call_count == 3 # 2 + 2 + 1 lines
+    assert out.write.call_args_list[0].args[0] == "Result: 1\nResult: 1\n"
+    out.flush.assert_called_once()
+    assert repl.colors.reset != ''
+
+def test_repl_run_batch_unexpected_error(repl, mock_calculator):
+    """Tests that unexpected errors are reported and the batch continues."""
+    mock_calculator.execute_command.side_effect = [RuntimeError("boom"), 4.0]
+    out = StringIO()
+    report = repl.run_batch(["add 1 1", "add 2 2"], out)
+    assert "Line 1: An unexpected application error occurred: boom" in out.getvalue()
+    assert "Result: 4" in out.getvalue()
+    assert report.errors == 1
+
+def test_palette_without_colorama(monkeypatch, capsys):
+    """Tests that a missing colorama disables colors instead of crashing."""
+    from app.repl import Palette
+    monkeypatch.setitem(sys.modules, 'colorama', None)
+    palette = Palette()
+    assert palette.red == palette.reset == ''
+    assert "colorama not found" in capsys.readouterr().out
+
+def test_repl_colors_are_created_lazily(repl):
+    """Tests that the palette is only built on first colored output."""
+    assert repl._colors is None
+    assert repl.colors.reset != ''
+    assert repl.colors is repl.colors
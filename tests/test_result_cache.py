@@ -0,0 +1,104 @@
+"""
+Tests for app/result_cache.py
+"""
+import math
+from unittest.mock import MagicMock
+import pytest
+from app.exceptions import OperationError
+from app.operations import AddCommand, DivideCommand, PowerCommand
+from app.result_cache import CacheStats, ResultCache
+
+def counting(command):
+    """Wraps a command so its evaluations can be counted."""
+    mock = MagicMock(wraps=command)
+    mock.name = command.name
+    return mock
+
+def test_hits_and_misses():
+    """Tests that repeated evaluations are answered from the cache."""
+    cache = ResultCache(10)
+    power = counting(PowerCommand())
+    assert cache.execute(power, 2.0, 10.0) == 1024.0
+    assert cache.execute(power, 2.0, 10.0) == 1024.0
+    assert power.execute.call_count == 1
+    assert cache.stats == CacheStats(hits=1, misses=1, evictions=0, expirations=0, size=1)
+    assert cache.stats.hit_rate == 0.5
+    assert "1 hits, 1 misses (50.0% hit rate)" in str(cache.stats)
+
+def test_commands_do_not_share_entries():
+    """Tests that the command name is part of the key."""
+    cache = ResultCache(10)
+    assert cache.execute(AddCommand(), 2.0, 3.0) == 5.0
+    assert cache.execute(PowerCommand(), 2.0, 3.0) == 8.0
+
+def test_signed_zeros_are_distinct():
+    """Tests that -0.0 and 0.0 do not share an entry."""
+    cache = ResultCache(10)
+    assert str(cache.execute(AddCommand(), -0.0, -0.0)) == "-0.0"
+    assert str(cache.execute(AddCommand(), 0.0, 0.0)) == "0.0"
+    assert cache.stats.misses == 2
+
+def test_int_and_float_operands_are_distinct():
+    """Tests that 2 and 2.0 do not share an entry, so results keep their type."""
+    cache = ResultCache(10)
+    assert repr(cache.execute(AddCommand(), 2, 3)) == "5"
+    assert repr(cache.execute(AddCommand(), 2.0, 3.0)) == "5.0"
+    assert repr(cache.execute(AddCommand(), 2, 3.0)) == "5.0"
+    assert cache.stats.misses == 3
+
+def test_nan_operands_share_an_entry():
+    """Tests that NaN operands hit the cache instead of adding a new entry per lookup."""
+    cache = ResultCache(2)
+    add = counting(AddCommand())
+    cache.execute(add, 1.0, 1.0)
+    for _ in range(3):
+        assert math.isnan(cache.execute(add, math.nan, 1.0))
+    assert math.isnan(cache.execute(add, float('-nan'), 1.0))
+    assert add.execute.call_count == 2
+    assert cache.stats.size == 2 and cache.stats.evictions == 0
+    cache.execute(add, 1.0, 1.0)
+    assert cache.stats.misses == 2 # 1 + 1 was not evicted
+
+def test_errors_are_cached():
+    """Tests that a cached failure raises a fresh OperationError each time."""
+    cache = ResultCache(10)
+    divide = counting(DivideCommand())
+    with pytest.raises(OperationError, match="divide by zero") as first:
+        cache.execute(divide, 1.0, 0.0)
+    with pytest.raises(OperationError, match="divide by zero") as second:
+        cache.execute(divide, 1.0, 0.0)
+    assert first.value is not second.value
+    assert divide.execute.call_count == 1
+    assert cache.stats.hits == 1
+
+def test_lru_eviction():
+    """Tests that the least recently used entry is evicted first."""
+    cache = ResultCache(2)
+    add = counting(AddCommand())
+    cache.execute(add, 1.0, 1.0)
+    cache.execute(add, 2.0, 2.0)
+    cache.execute(add, 1.0, 1.0) # 1+1 is now the most recent
+    cache.execute(add, 3.0, 3.0) # Evicts 2+2
+    cache.execute(add, 1.0, 1.0)
+    cache.execute(add, 2.0, 2.0)
+    assert add.execute.call_count == 4
+    assert cache.stats.evictions == 2
+    assert cache.stats.size == 2
+
+def test_ttl_expiry():
+    """Tests that entries expire after the TTL."""
+    now = [0.0]
+    cache = ResultCache(10, ttl=5, clock=lambda: now[0])
+    add = counting(AddCommand())
+    cache.execute(add, 1.0, 1.0)
+    now[0] = 4.9
+    cache.execute(add, 1.0, 1.0)
+    now[0] = 5.0
+    cache.execute(add, 1.0, 1.0)
+    assert add.execute.call_count == 2
+    assert cache.stats.expirations == 1
+
+    cache.clear()
+    assert cache.stats.size == 0
+    with pytest.raises(ValueError):
+        ResultCache(0)
@@ -0,0 +1,81 @@
+"""
+Tests for app/ring_buffer.py
+"""
+import pytest
+from app.ring_buffer import RingBuffer, RingBufferView
+
+def test_append_evicts_oldest():
+    """Tests that a full buffer evicts its oldest item."""
+    buffer = RingBuffer(3)
+    assert [buffer.append(i) for i in range(3)] == [None, None, None]
+    assert buffer.append(3) == 0
+    assert buffer.append(4) == 1
+    assert list(buffer) == [2, 3, 4]
+    assert buffer.capacity == 3
+
+def test_pop_and_appendleft():
+    """Tests removal and insertion at both ends."""
+    buffer = RingBuffer(3, [1, 2, 3])
+    assert buffer.pop() == 3
+    assert buffer.popleft() == 1
+    buffer.appendleft(0)
+    assert list(buffer) == [0, 2]
+
+    # appendleft on a full buffer drops the newest item
+    buffer.append(5)
+    assert buffer.appendleft(-1) == 5
+    assert list(buffer) == [-1, 0, 2]
+
+def test_empty_errors():
+    """Tests popping from an empty buffer."""
+    buffer = RingBuffer(2)
+    with pytest.raises(IndexError):
+        buffer.pop()
+    with pytest.raises(IndexError):
+        buffer.popleft()
+    with pytest.raises(ValueError):
+        RingBuffer(-1)
+
+def test_zero_capacity():
+    """Tests that a zero-capacity buffer keeps nothing."""
+    buffer = RingBuffer(0)
+    assert buffer.append(1) == 1
+    assert buffer.appendleft(2) == 2
+    assert len(buffer) == 0
+
+def test_indexing_wraps_around():
+    """Tests logical indexing after the head has moved."""
+    buffer = RingBuffer(3, range(5))
+    assert buffer[0] == 2
+    assert buffer[-1] == 4
+    with pytest.raises(IndexError):
+        buffer[3]
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer == []
+
+def test_slice_views():
+    """Tests that slices are views that do not copy."""
+    buffer = RingBuffer(5, range(7))
+    view = buffer[1:4]
+    assert isinstance(view, RingBufferView)
+    assert view == [3, 4, 5]
+    assert view[0] == 3
+    assert view[1:] == [4, 5]
+    assert buffer[::-1] == [6, 5, 4, 3, 2]
+    assert repr(view) == "RingBufferView([3, 4, 5])"
+    assert repr(RingBuffer(2, [1])) == "RingBuffer(2, [1])"
+    assert buffer != "not a buffer"
+    assert view != "not a view"
+
+def test_stale_view_and_iteration():
+    """Tests that views and iterators detect mutation."""
+    buffer = RingBuffer(3, [1, 2])
+    view = buffer[:]
+    buffer.append(3)
+    with pytest.raises(RuntimeError, match="stale"):
+        view[0]
+
+    with pytest.raises(RuntimeError, match="mutated"):
+        for item in buffer:
+            buffer.append(item)
@@ -0,0 +1,232 @@
+"""
+Tests for app/sqlite_history.py
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.calculation import Calculation
+from app.exceptions import ConfigError, HistoryError
+from app.history import History, create_history
+from app.operations import CommandFactory
+from app.sqlite_history import SQLiteHistory
+
+class MockConfig:
+    def __init__(self, tmp_path, **settings):
+        self._history_file_path = tmp_path / "data" / "history.csv"
+        self._settings = {'CALCULATOR_MAX_HISTORY_SIZE': 3, **settings}
+
+    def get_setting(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def get_history_file_path(self):
+        return self._history_file_path
+
+@pytest.fixture
+def factory():
+    return CommandFactory()
+
+@pytest.fixture
+def calcs(factory):
+    """Provides calculations one second apart, alternating add and multiply."""
+    start = datetime(2024, 1, 1, 10)
+    return [
+        Calculation(float(i), 2.0, factory.get_command('add' if i % 2 else 'multiply'), float(i), start + timedelta(seconds=i))
+        for i in range(5)
+    ]
+
+@pytest.fixture
+def history(tmp_path):
+    store = SQLiteHistory(MockConfig(tmp_path))
+    yield store
+    store.close()
+
+def test_create_history_selects_backend(tmp_path):
+    """Tests that the factory picks SQLiteHistory only for the sqlite backend."""
+    assert isinstance(create_history(MockConfig(tmp_path)), History)
+    store = create_history(MockConfig(tmp_path, CALCULATOR_HISTORY_BACKEND='sqlite'))
+    assert isinstance(store, SQLiteHistory)
+    store.close()
+    with pytest.raises(ConfigError, match="create_history"):
+        History(MockConfig(tmp_path, CALCULATOR_HISTORY_BACKEND='sqlite'))
+
+def test_add_evict_undo_redo(history, calcs):
+    """Tests eviction past the max size and that undo/redo restore exact states."""
+    for calc in calcs[:4]:
+        history.add_calculation(calc)
+    assert list(history.get_history()) == calcs[1:4]
+    assert history.eviction_count == 1
+
+    history.undo()
+    assert list(history.get_history()) == calcs[:3]
+    history.redo()
+    assert list(history.get_history()) == calcs[1:4]
+
+    history.undo()
+    history.add_calculation(calcs[4]) # Discards the redo step
+    assert list(history.get_history()) == calcs[1:3] + [calcs[4]]
+    with pytest.raises(HistoryError, match="Nothing to redo"):
+        history.redo()
+
+def test_batch_clear_and_memento(history, calcs):
+    """Tests that batches and clears are single undoable actions."""
+    history.add_calculations(calcs[:2])
+    history.add_calculations([])
+    history.clear_history()
+    history.clear_history() # Nothing to clear
+    assert list(history.get_history()) == []
+    history.undo()
+    assert history.get_history() == calcs[:2]
+    history.undo()
+    assert len(history.get_history()) == 0
+    with pytest.raises(HistoryError, match="Nothing to undo"):
+        history.undo()
+
+    memento = history.create_memento()
+    history.add_calculation(calcs[4])
+    history.restore_memento(memento)
+    assert list(history.get_history()) == []
+    assert list(history.snapshot()) == []
+
+def test_undo_depth_limit(tmp_path, calcs):
+    """Tests that actions past the max undo depth are forgotten."""
+    history = SQLiteHistory(MockConfig(tmp_path, CALCULATOR_MAX_UNDO_DEPTH=2, CALCULATOR_MAX_HISTORY_SIZE=10))
+    for calc in calcs[:4]:
+        history.add_calculation(calc)
+    history.clear_history()
+    history.undo()
+    history.undo()
+    assert list(history.get_history()) == calcs[:3]
+    with pytest.raises(HistoryError, match="Nothing to undo"):
+        history.undo()
+    history.close()
+
+def test_view_and_queries(history, calcs):
+    """Tests lazy indexing and filtered, paged queries."""
+    history.add_calculations(calcs[2:])
+    view = history.view()
+    assert len(view) == 3
+    assert view[0] == calcs[2]
+    assert view[-1] == calcs[4]
+    assert view[1:] == calcs[3:]
+    assert view[::2] == [calcs[2], calcs[4]]
+    with pytest.raises(IndexError):
+        view[3]
+    snapshot = history.get_history()
+    history.clear_history()
+    assert len(view) == 0 and list(snapshot) == calcs[2:]
+    history.undo()
+
+    assert history.count(command='multiply') == 2
+    assert history.query(command='multiply', newest_first=True) == [calcs[4], calcs[2]]
+    assert history.query(since=calcs[3].timestamp, until=calcs[3].timestamp) == [calcs[3]]
+    assert history.query(offset=1, limit=1) == [calcs[3]]
+    assert history.count(since=calcs[3].timestamp) == 2
+    assert [chunk.tolist() for chunk in history.results(chunk_size=2)] == [[2.0, 3.0], [4.0]]
+
+def test_queries_use_indexes(history):
+    """Tests that command and time filters are served by an index."""
+    for where in ("live = 1 AND command = 'add'", "live = 1 AND timestamp >= 0"):
+        plan = history._conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM calculations WHERE {where}").fetchall()
+        assert "USING INDEX" in str(plan)
+
+def test_history_persists_across_connections(tmp_path, calcs):
+    """Tests that the history and its bounded undo stack survive a restart."""
+    config = MockConfig(tmp_path, CALCULATOR_MAX_UNDO_DEPTH=5)
+    history = SQLiteHistory(config)
+    history.add_calculations(calcs[:2])
+    history.add_calculation(calcs[2])
+    history.close()
+
+    reopened = SQLiteHistory(config)
+    assert list(reopened.get_history()) == calcs[:3]
+    reopened.undo()
+    assert list(reopened.get_history()) == calcs[:2]
+    reopened.close()
+
+def test_unbounded_undo_is_compacted_at_startup(tmp_path, calcs):
+    """Tests that with an unbounded undo depth dead rows and actions are dropped on restart."""
+    config = MockConfig(tmp_path)
+    history = SQLiteHistory(config)
+    for calc in calcs:
+        history.add_calculation(calc) # Evicts the two oldest
+    history.clear_history()
+    history.undo()
+    history.close()
+
+    reopened = SQLiteHistory(config)
+    assert list(reopened.get_history()) == calcs[2:]
+    assert reopened._conn.execute("SELECT COUNT(*) FROM calculations").fetchone()[0] == 3
+    assert reopened._conn.execute("SELECT COUNT(*) FROM actions").fetchone()[0] == 0
+    with pytest.raises(HistoryError, match="Nothing to undo"):
+        reopened.undo()
+    reopened.add_calculation(calcs[0])
+    reopened.undo()
+    assert list(reopened.get_history()) == calcs[2:]
+    reopened.close()
+
+def test_binary_export_and_import(tmp_path, calcs, factory):
+    """Tests that CALCULATOR_HISTORY_FORMAT=binary is honoured by save, append and load."""
+    config = MockConfig(tmp_path, CALCULATOR_HISTORY_FORMAT='binary', CALCULATOR_MAX_HISTORY_SIZE=10)
+    config._history_file_path = tmp_path / "data" / "history.bin"
+    history = SQLiteHistory(config)
+    history.add_calculations(calcs[:2])
+    history.save_history_to_csv()
+    history.append_to_csv(calcs[2:])
+    assert not config._history_file_path.read_bytes().startswith(b"Timestamp")
+    history.clear_history()
+
+    history.load_history_from_csv(factory)
+    assert list(history.get_history()) == calcs
+
+    config._history_file_path.write_text("Timestamp,OperandA\n")
+    with pytest.raises(HistoryError, match="not a binary history"):
+        history.load_history_from_csv(factory)
+    history.close()
+
+    with pytest.raises(ConfigError, match="CALCULATOR_HISTORY_FORMAT"):
+        SQLiteHistory(MockConfig(tmp_path, CALCULATOR_HISTORY_FORMAT='parquet'))
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_empty_loads_match_across_backends(tmp_path, factory, calcs, backend):
+    """Tests that loading a missing or empty file is the same undoable load on every backend."""
+    config = MockConfig(tmp_path, CALCULATOR_UNDO_MODE='journal')
+    history = SQLiteHistory(config) if backend == 'sqlite' else History(config)
+    history.add_calculations(calcs[:2])
+
+    history.load_history_from_csv(factory) # No file
+    assert list(history.get_history()) == []
+    history.undo()
+    assert list(history.get_history()) == calcs[:2]
+
+    config.get_history_file_path().parent.mkdir(exist_ok=True)
+    config.get_history_file_path().write_text("Timestamp,OperandA,Command,OperandB,Result\n")
+    history.load_history_from_csv(factory) # Header only
+    assert list(history.get_history()) == []
+    history.undo()
+    assert list(history.get_history()) == calcs[:2]
+    history.clear_history()
+    history.load_history_from_csv(factory) # Already empty: nothing to undo but the clear
+    history.undo()
+    assert list(history.get_history()) == calcs[:2]
+    if backend == 'sqlite':
+        history.close()
+
+def test_csv_export_and_import(history, calcs, factory, tmp_path):
+    """Tests saving to and loading from the history CSV."""
+    history.load_history_from_csv(factory) # No file yet
+    history.add_calculations(calcs[:2])
+    history.save_history_to_csv()
+    history.append_to_csv(calcs[2:])
+    history.clear_history()
+
+    history.load_history_from_csv(factory)
+    assert list(history.get_history()) == calcs[2:]
+    assert history.last_load_skipped == 0
+    history.undo()
+    assert list(history.get_history()) == []
+
+    history._history_file_path.write_text("Timestamp,OperandA\n1,2\n")
+    with pytest.raises(HistoryError, match="Failed to parse"):
+        history.load_history_from_csv(factory)
+    history._history_file_path.write_text("")
+    history.load_history_from_csv(factory)
+    assert list(history.get_history()) == []
@@ -0,0 +1,55 @@
+"""
+Startup regression tests: heavy dependencies must load on first use only.
+Each check runs in a fresh interpreter so earlier imports don't interfere.
+"""
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Importing main (and everything it needs to reach the first prompt) measures
+# well under 0.15s on a laptop; the budget leaves headroom for slow CI runners.
+STARTUP_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = ('pandas', 'numpy', 'colorama')
+
+def run_python(code: str) -> str:
+    """Runs code in a fresh interpreter from the project root and returns stdout."""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+@pytest.mark.parametrize("module", ["app.calculator", "main"])
+def test_import_does_not_load_heavy_dependencies(module):
+    """Tests that importing the app pulls in none of the heavy dependencies."""
+    loaded = run_python(
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
+
+def test_startup_budget():
+    """Tests that importing main stays within the startup budget (best of 3)."""
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    best = min(float(run_python(code)) for _ in range(3))
+    assert best < STARTUP_BUDGET_SECONDS
+
+def test_calculation_and_batch_mode_stay_light():
+    """Tests that scalar calculations and uncolored batch runs load nothing heavy."""
+    loaded = run_python(
+        "import io, sys\n"
+        "from unittest.mock import MagicMock\n"
+        "from app.calculator import Calculator\n"
+        "from app.operations import CommandFactory\n"
+        "from app.repl import REPL\n"
+        "config = MagicMock()\n"
+        "config.get_setting.side_effect = lambda key, default=None: default\n"
+        "calculator = Calculator(CommandFactory(), MagicMock())\n"
+        "REPL(calculator, config).run_batch(['add 1 2', 'power 2 8'], io.StringIO())\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
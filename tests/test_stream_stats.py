@@ -0,0 +1,100 @@
+"""
+Tests for app/stream_stats.py
+"""
+import math
+import numpy as np
+import pytest
+from app.stream_stats import QuantileSketch, RunningMoments, StreamStatistics, summarize
+from app.exceptions import InputValidationError
+
+@pytest.fixture
+def data():
+    """Provides mixed-sign values with a long tail and some zeros."""
+    rng = np.random.default_rng(7)
+    values = np.concatenate([
+        rng.normal(50, 10, 20_000), rng.lognormal(0, 2, 20_000), -rng.exponential(3, 5_000), np.zeros(100),
+    ])
+    rng.shuffle(values)
+    return values
+
+def chunks(values, size):
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+@pytest.mark.parametrize("size", [1000, 4096, 100_000])
+def test_moments_match_numpy(data, size):
+    """Tests the chunked Welford/Chan moments against NumPy, whatever the chunking."""
+    summary = summarize(chunks(data, size))
+    assert summary.count == len(data)
+    assert summary.mean == pytest.approx(data.mean(), rel=1e-12)
+    assert summary.variance == pytest.approx(data.var(ddof=1), rel=1e-12)
+    assert summary.stdev == pytest.approx(data.std(ddof=1), rel=1e-12)
+    assert (summary.minimum, summary.maximum) == (data.min(), data.max())
+
+def test_moments_are_stable_with_a_large_offset():
+    """Tests that a large common offset does not destroy the variance."""
+    values = 1e9 + np.array([4.0, 7.0, 13.0, 16.0])
+    moments = RunningMoments()
+    for chunk in chunks(values, 1):
+        moments.add(chunk)
+    assert moments.variance == pytest.approx(30.0)
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(data, accuracy):
+    """Tests every quantile estimate against the exact quantile."""
+    quantiles = (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+    summary = summarize(chunks(data, 4096), quantiles, accuracy)
+    for q, estimate in summary.quantiles.items():
+        exact = np.quantile(data, q, method='lower')
+        assert abs(estimate - exact) <= accuracy * abs(exact) + 1e-12, q
+    assert summary.relative_accuracy == accuracy
+
+def test_merge_matches_single_pass(data):
+    """Tests that merging the statistics of two halves gives the same summary."""
+    whole, left, right = StreamStatistics(), StreamStatistics(), StreamStatistics()
+    whole.add(data)
+    left.add(data[:12_345])
+    right.add(data[12_345:])
+    left.merge(right)
+    merged, expected = left.summary(), whole.summary()
+    assert merged.quantiles == expected.quantiles
+    assert merged.mean == pytest.approx(expected.mean, rel=1e-12)
+    assert merged.variance == pytest.approx(expected.variance, rel=1e-12)
+    with pytest.raises(ValueError, match="same relative accuracy"):
+        left.sketch.merge(QuantileSketch(0.05))
+
+def test_sketch_memory_is_bounded():
+    """Tests that collapsing keeps the number of buckets under max_bins."""
+    sketch = QuantileSketch(0.01, max_bins=64)
+    sketch.add(np.logspace(-200, 200, 10_000))
+    sketch.add(-np.logspace(-200, 200, 10_000))
+    assert len(sketch._positive) <= 64 and len(sketch._negative) <= 64
+    assert sketch.count == 20_000
+    # The large-magnitude buckets keep their accuracy
+    assert sketch.quantile(1.0) == pytest.approx(1e200, rel=0.01)
+    assert sketch.quantile(0.0) == pytest.approx(-1e200, rel=0.01)
+
+def test_single_value_and_empty_sketch():
+    """Tests a single value and the estimate of an empty sketch."""
+    summary = summarize([np.array([5.0])])
+    assert (summary.count, summary.mean, summary.variance) == (1, 5.0, 0.0)
+    assert set(summary.quantiles.values()) == {5.0}
+    assert math.isnan(QuantileSketch().quantile(0.5))
+
+@pytest.mark.parametrize("chunk_list, error, message", [
+    ([], InputValidationError, "no numbers to summarize"),
+    ([np.array([1.0, np.nan])], InputValidationError, "not a finite number"),
+])
+def test_summarize_errors(chunk_list, error, message):
+    """Tests empty and non-finite input."""
+    with pytest.raises(error, match=message):
+        summarize(chunk_list)
+
+@pytest.mark.parametrize("kwargs, call, message", [
+    ({'relative_accuracy': 1.5}, None, "between 0 and 1"),
+    ({}, 1.5, "is not between 0 and 1"),
+])
+def test_sketch_invalid_arguments(kwargs, call, message):
+    """Tests invalid accuracies and quantiles."""
+    with pytest.raises(ValueError, match=message):
+        sketch = QuantileSketch(**kwargs)
+        sketch.quantile(call)